@@ -12,11 +12,203 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import fcntl
+import os
 import subprocess
+import tempfile
+import threading
+from contextlib import contextmanager
 
+from fuelweb_test import logger
 from fuelweb_test import logwrap
 
 
+def rule_key(rule):
+    """Return the match and the target of the rule without its chain, with
+    MAC addresses normalized like ebtables-save prints them.
+    """
+    tokens = rule.split()[2:]
+    for i, token in enumerate(tokens[:-1]):
+        if token in ('-s', '-d') and ':' in tokens[i + 1]:
+            tokens[i + 1] = ':'.join(
+                '{0:x}'.format(int(octet, 16))
+                for octet in tokens[i + 1].split(':'))
+    return tuple(tokens)
+
+
+class EbtablesRules(object):
+    """DROP rules for VLANs and MACs applied in batches.
+
+    The rules are kept in the dedicated 'chain' of broute (VLANs) and
+    filter (MACs) tables, the chains are called from BROUTING and FORWARD.
+    Every change is read from one ebtables-save dump, only the given rules
+    are added or deleted, and the result is applied with one
+    ebtables-restore call, which replaces the tables atomically. Changes
+    are serialized between the processes of the host with 'lock_path'
+    flock, so the rules of the other jobs are kept.
+    """
+
+    chain = 'FUEL_QA'
+    tables = {'broute': 'BROUTING', 'filter': 'FORWARD'}
+    lock_path = os.path.join(tempfile.gettempdir(), 'fuel-qa-ebtables.lock')
+
+    def rules(self, vlans=(), macs=()):
+        return {
+            'broute': ['-A {0} -p 802_1Q -i {1} --vlan-id {2} -j DROP'.format(
+                self.chain, target_dev, vlan)
+                for target_dev, vlan in vlans],
+            'filter': ['-A {0} -s {1} -j DROP'.format(self.chain, mac)
+                       for mac in macs],
+        }
+
+    def render(self, saved, block_rules, restore_rules):
+        """Return ebtables-restore input for the managed tables: the saved
+        tables with 'block_rules' added to 'chain' and 'restore_rules'
+        deleted. Rules equal to the restored ones are deleted from the
+        builtin chains too, they could be added there by the former
+        versions of this module.
+        """
+        sections = {}
+        table = None
+        for saved_line in saved.splitlines():
+            saved_line = saved_line.strip()
+            if not saved_line or saved_line.startswith('#'):
+                continue
+            if saved_line.startswith('*'):
+                table = saved_line[1:]
+                sections[table] = []
+            elif table in self.tables:
+                sections[table].append(saved_line)
+
+        lines = []
+        for table, builtin_chain in sorted(self.tables.items()):
+            saved_lines = sections.get(table, [])
+            chains = [declaration for declaration in saved_lines
+                      if declaration.startswith(':') and
+                      declaration.split()[0] != ':{0}'.format(self.chain)]
+            if not any(chain.split()[0] == ':{0}'.format(builtin_chain)
+                       for chain in chains):
+                chains.insert(0, ':{0} ACCEPT'.format(builtin_chain))
+            restore_keys = set(rule_key(rule)
+                               for rule in restore_rules[table])
+            rules = [saved_rule for saved_rule in saved_lines
+                     if saved_rule.startswith('-A') and
+                     not (saved_rule.split()[1] in (builtin_chain,
+                                                    self.chain) and
+                          rule_key(saved_rule) in restore_keys)]
+            jump = '-A {0} -j {1}'.format(builtin_chain, self.chain)
+            if jump not in rules:
+                # Our rules go first, so they can't be bypassed
+                rules.insert(0, jump)
+            chain_keys = set(rule_key(rule) for rule in rules
+                             if rule.split()[1] == self.chain)
+            for rule in block_rules[table]:
+                if rule_key(rule) not in chain_keys:
+                    chain_keys.add(rule_key(rule))
+                    rules.append(rule)
+            lines.append('*{0}'.format(table))
+            lines.extend(chains)
+            lines.append(':{0} RETURN'.format(self.chain))
+            lines.extend(rules)
+        return '\n'.join(lines) + '\n'
+
+    @contextmanager
+    def lock(self):
+        with open(self.lock_path, 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    @staticmethod
+    def save():
+        return subprocess.check_output(['sudo', 'ebtables-save'],
+                                       stderr=subprocess.STDOUT)
+
+    @staticmethod
+    def restore(rules):
+        process = subprocess.Popen(['sudo', 'ebtables-restore'],
+                                   stdin=subprocess.PIPE,
+                                   stdout=subprocess.PIPE,
+                                   stderr=subprocess.STDOUT)
+        output = process.communicate(rules)[0]
+        if process.returncode:
+            raise subprocess.CalledProcessError(process.returncode,
+                                                'ebtables-restore', output)
+        return output
+
+    @logwrap
+    def apply(self, block_vlans=(), restore_vlans=(), block_macs=(),
+              restore_macs=()):
+        """Add and delete the rules in one transaction.
+
+        :param block_vlans: (target_dev, vlan) pairs to block
+        :param restore_vlans: (target_dev, vlan) pairs to unblock
+        :param block_macs: source MACs to block
+        :param restore_macs: source MACs to unblock
+        """
+        with self.lock():
+            self.restore(self.render(
+                self.save(),
+                self.rules(block_vlans, block_macs),
+                self.rules(restore_vlans, restore_macs)))
+
+    @logwrap
+    def partition(self, duration, vlans=(), macs=(), wait=True):
+        """Block the VLANs and MACs for 'duration' seconds.
+
+        Both rules sets are prepared in advance and are switched by one
+        root shell with 'sleep' between the two ebtables-restore calls, so
+        the blackout window doesn't depend on this process and the network
+        is restored even if the test is interrupted. The lock is held till
+        the shell exits, so apply() calls made meanwhile wait for the
+        partition to end instead of being reverted by it.
+
+        :param wait: wait till the network is restored, otherwise return
+                     the Popen object of the running shell
+        """
+        lock = self.lock()
+        lock.__enter__()
+        try:
+            saved = self.save()
+            rules = self.rules(vlans, macs)
+            paths = []
+            # The network is restored to the state saved before the
+            # partition, nothing else changes it while the lock is held
+            for block_rules in (rules, self.rules()):
+                fd, path = tempfile.mkstemp(prefix='ebtables-')
+                with os.fdopen(fd, 'w') as f:
+                    f.write(self.render(saved, block_rules, self.rules()))
+                paths.append(path)
+            cmd = ('ebtables-restore < {0} && sleep {1:.3f}; '
+                   'ebtables-restore < {2}; rc=$?; rm -f {0} {2}; '
+                   'exit $rc'.format(paths[0], duration, paths[1]))
+            logger.info('Blocking VLANs {0} and MACs {1} for {2:.3f} '
+                        'sec'.format(sorted(vlans), sorted(macs), duration))
+            process = subprocess.Popen(['sudo', 'sh', '-c', cmd])
+        except Exception:
+            lock.__exit__(None, None, None)
+            raise
+
+        def wait_partition():
+            try:
+                return process.wait()
+            finally:
+                lock.__exit__(None, None, None)
+
+        if not wait:
+            waiter = threading.Thread(target=wait_partition)
+            waiter.daemon = True
+            waiter.start()
+            return process
+        if wait_partition():
+            raise subprocess.CalledProcessError(process.returncode, cmd)
+
+
+ebtables_rules = EbtablesRules()
+
+
 class Ebtables(object):
     """Ebtables."""  # TODO documentation
 
@@ -25,60 +217,54 @@ class Ebtables(object):
         self.target_devs = target_devs
         self.vlans = vlans
 
+    def _vlans(self, vlans):
+        return [(target_dev, vlan) for vlan in vlans
+                for target_dev in self.target_devs]
+
     @logwrap
     def restore_vlans(self):
-        for vlan in self.vlans:
-            for target_dev in self.target_devs:
-                Ebtables.restore_vlan(target_dev, vlan)
+        ebtables_rules.apply(restore_vlans=self._vlans(self.vlans))
 
     @logwrap
     def restore_first_vlan(self):
-        for target_dev in self.target_devs:
-            Ebtables.restore_vlan(target_dev, self.vlans[0])
+        ebtables_rules.apply(restore_vlans=self._vlans(self.vlans[:1]))
 
     @logwrap
     def block_first_vlan(self):
-        for target_dev in self.target_devs:
-            Ebtables.block_vlan(target_dev, self.vlans[0])
+        ebtables_rules.apply(block_vlans=self._vlans(self.vlans[:1]))
+
+    @logwrap
+    def partition_first_vlan(self, duration, wait=True):
+        """Block the first VLAN for 'duration' seconds."""
+        return ebtables_rules.partition(
+            duration, vlans=self._vlans(self.vlans[:1]), wait=wait)
+
+    @staticmethod
+    @logwrap
+    def block_macs(macs):
+        ebtables_rules.apply(block_macs=macs)
+
+    @staticmethod
+    @logwrap
+    def restore_macs(macs):
+        ebtables_rules.apply(restore_macs=macs)
 
     @staticmethod
     @logwrap
     def block_mac(mac):
-        return subprocess.check_output(
-            ['sudo', 'ebtables', '-t', 'filter', '-A', 'FORWARD', '-s',
-             mac, '-j', 'DROP'],
-            stderr=subprocess.STDOUT
-        )
+        ebtables_rules.apply(block_macs=[mac])
 
     @staticmethod
     @logwrap
     def restore_mac(mac):
-        return subprocess.call(
-            [
-                'sudo', 'ebtables', '-t', 'filter',
-                '-D', 'FORWARD', '-s', mac, '-j', 'DROP'
-            ],
-            stderr=subprocess.STDOUT,
-        )
+        ebtables_rules.apply(restore_macs=[mac])
 
     @staticmethod
     @logwrap
     def restore_vlan(target_dev, vlan):
-        return subprocess.call(
-            [
-                'sudo', 'ebtables', '-t', 'broute', '-D', 'BROUTING', '-i',
-                target_dev, '-p', '8021Q', '--vlan-id', str(vlan), '-j', 'DROP'
-            ],
-            stderr=subprocess.STDOUT,
-        )
+        ebtables_rules.apply(restore_vlans=[(target_dev, vlan)])
 
     @staticmethod
     @logwrap
     def block_vlan(target_dev, vlan):
-        return subprocess.check_output(
-            [
-                'sudo', 'ebtables', '-t', 'broute', '-A', 'BROUTING', '-i',
-                target_dev, '-p', '8021Q', '--vlan-id', str(vlan), '-j', 'DROP'
-            ],
-            stderr=subprocess.STDOUT
-        )
+        ebtables_rules.apply(block_vlans=[(target_dev, vlan)])
@@ -12,17 +12,178 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import calendar
+import httplib
 import json
+import re
+import socket
+import threading
+import time
 import traceback
+import urllib
 import urllib2
+from StringIO import StringIO
 
 from keystoneclient.v2_0 import Client as keystoneclient
 from keystoneclient import exceptions
 from fuelweb_test import logger
 
 
+class ConnectionPool(object):
+    """Keeps idle keep-alive HTTP connections grouped by 'host:port'."""
+
+    def __init__(self, maxsize=10, timeout=None):
+        self.maxsize = maxsize
+        self.timeout = timeout
+        self._idle = {}
+        self._lock = threading.Lock()
+
+    def connect(self, host):
+        if self.timeout is not None:
+            return httplib.HTTPConnection(host, timeout=self.timeout)
+        return httplib.HTTPConnection(host)
+
+    def acquire(self, host):
+        """Return (connection, reused) pair for the host."""
+        with self._lock:
+            connections = self._idle.get(host)
+            if connections:
+                return connections.pop(), True
+        return self.connect(host), False
+
+    def release(self, host, conn):
+        with self._lock:
+            connections = self._idle.setdefault(host, [])
+            if len(connections) < self.maxsize:
+                connections.append(conn)
+                return
+        conn.close()
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for connections in idle.values():
+            for conn in connections:
+                conn.close()
+
+
+class KeepAliveHandler(urllib2.HTTPHandler):
+    """urllib2 handler which reuses TCP connections from ConnectionPool.
+
+    Response body is read completely before the connection is returned
+    to the pool, so the object passed to the caller behaves exactly like
+    the one returned by the default HTTPHandler (read(), code, msg,
+    headers), and non-2xx answers are still turned into urllib2.HTTPError
+    by the standard processors of the opener.
+    """
+
+    def __init__(self, pool=None, debuglevel=0):
+        urllib2.HTTPHandler.__init__(self, debuglevel=debuglevel)
+        self.pool = pool or ConnectionPool()
+
+    def http_open(self, req):
+        host = req.get_host()
+        if not host:
+            raise urllib2.URLError('no host given')
+        headers = dict(req.unredirected_hdrs)
+        headers.update(req.headers)
+        headers['Connection'] = 'keep-alive'
+        headers = dict(
+            (name.title(), value) for name, value in headers.items())
+
+        conn, reused = self.pool.acquire(host)
+        try:
+            response = self._request(conn, req, headers)
+        except (socket.error, httplib.HTTPException) as e:
+            conn.close()
+            if not reused:
+                raise urllib2.URLError(e)
+            # Server could drop an idle connection, try once more
+            # with a fresh one.
+            logger.debug('Reconnecting to {0}: {1}'.format(host, e))
+            conn = self.pool.connect(host)
+            try:
+                response = self._request(conn, req, headers)
+            except (socket.error, httplib.HTTPException) as e:
+                conn.close()
+                raise urllib2.URLError(e)
+
+        body = response.read()
+        if response.will_close:
+            conn.close()
+        else:
+            self.pool.release(host, conn)
+
+        resp = urllib.addinfourl(StringIO(body), response.msg,
+                                 req.get_full_url(), code=response.status)
+        resp.msg = response.reason
+        return resp
+
+    def _request(self, conn, req, headers):
+        conn.set_debuglevel(self._debuglevel)
+        conn.request(req.get_method(), req.get_selector(),
+                     req.get_data(), headers)
+        return conn.getresponse()
+
+
+class LatencyCounters(object):
+    """Per-endpoint counters of HTTP requests latency.
+
+    Numeric path segments and query values are collapsed, so
+    '/api/nodes/12/' and '/api/nodes/13/' are accounted together
+    as 'GET /api/nodes/{id}/'.
+    """
+
+    _id_re = re.compile(r'(?<=/)\d+(?=/|$|\?)|(?<==)[^&]*')
+
+    def __init__(self):
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def endpoint_key(self, method, endpoint):
+        return '{0} {1}'.format(method, self._id_re.sub('{id}', endpoint))
+
+    def add(self, method, endpoint, elapsed):
+        key = self.endpoint_key(method, endpoint)
+        with self._lock:
+            counter = self._counters.setdefault(
+                key, {'count': 0, 'total': 0.0, 'max': 0.0})
+            counter['count'] += 1
+            counter['total'] += elapsed
+            counter['max'] = max(counter['max'], elapsed)
+
+    def stats(self):
+        """Return {endpoint: {'count', 'total', 'avg', 'max'}} dict."""
+        with self._lock:
+            return dict(
+                (key, dict(counter, avg=counter['total'] / counter['count']))
+                for key, counter in self._counters.items())
+
+    def log(self):
+        for key, counter in sorted(self.stats().items(),
+                                   key=lambda item: -item[1]['total']):
+            logger.info('{0}: count={1[count]} total={1[total]:.3f}s '
+                        'avg={1[avg]:.3f}s max={1[max]:.3f}s'
+                        .format(key, counter))
+
+    def reset(self):
+        with self._lock:
+            self._counters = {}
+
+
 class HTTPClient(object):
-    """HTTPClient."""  # TODO documentation
+    """HTTPClient.
+
+    Requests are sent through a pool of keep-alive connections. Keystone
+    token is cached until it is about to expire (see TOKEN_EXPIRY_MARGIN),
+    so polling loops do not touch keystone on every call. Latency of each
+    request is accounted in 'latency' per endpoint. Callables appended to
+    'write_hooks' are called after every request other than GET, even a
+    failed one.
+    """
+
+    # Refresh the token this number of seconds before its expiration
+    TOKEN_EXPIRY_MARGIN = 60
 
     def __init__(self, url, keystone_url, credentials, **kwargs):
         logger.info('Initiate HTTPClient with url %s', url)
@@ -30,28 +191,60 @@ class HTTPClient(object):
         self.keystone_url = keystone_url
         self.creds = dict(credentials, **kwargs)
         self.keystone = None
-        self.opener = urllib2.build_opener(urllib2.HTTPHandler)
+        self.pool = ConnectionPool()
+        self.opener = urllib2.build_opener(KeepAliveHandler(self.pool))
+        self.latency = LatencyCounters()
+        self.write_hooks = []
+        self._token = None
+        self._token_expires = 0
+        self._token_lock = threading.RLock()
 
     def authenticate(self):
-        try:
-            logger.info('Initialize keystoneclient with url %s',
-                        self.keystone_url)
-            self.keystone = keystoneclient(
-                auth_url=self.keystone_url, **self.creds)
-            # it depends on keystone version, some versions doing auth
-            # explicitly some dont, but we are making it explicitly always
-            self.keystone.authenticate()
-            logger.debug('Authorization token is successfully updated')
-        except exceptions.AuthorizationFailure:
-            logger.warning(
-                'Cant establish connection to keystone with url %s',
-                self.keystone_url)
+        with self._token_lock:
+            self._token = None
+            self._token_expires = 0
+            try:
+                logger.info('Initialize keystoneclient with url %s',
+                            self.keystone_url)
+                self.keystone = keystoneclient(
+                    auth_url=self.keystone_url, **self.creds)
+                # it depends on keystone version, some versions doing auth
+                # explicitly some dont, but we are making it explicitly always
+                self.keystone.authenticate()
+                self._cache_token()
+                logger.debug('Authorization token is successfully updated')
+            except exceptions.AuthorizationFailure:
+                logger.warning(
+                    'Cant establish connection to keystone with url %s',
+                    self.keystone_url)
+
+    def _cache_token(self):
+        self._token = self.keystone.auth_token
+        auth_ref = getattr(self.keystone, 'auth_ref', None)
+        expires = getattr(auth_ref, 'expires', None)
+        if expires is not None:
+            self._token_expires = calendar.timegm(expires.utctimetuple())
+        else:
+            # Unknown expiration, ask keystoneclient on every request
+            self._token_expires = 0
 
     @property
     def token(self):
-        if self.keystone is not None:
+        if self.keystone is None:
+            return None
+        with self._token_lock:
+            expiring = (time.time() >
+                        self._token_expires - self.TOKEN_EXPIRY_MARGIN)
+            if self._token is not None and not expiring:
+                return self._token
             try:
-                return self.keystone.auth_token
+                if self._token is not None and self._token_expires:
+                    logger.debug('Authorization token is about to expire, '
+                                 'refreshing it')
+                    self.authenticate()
+                else:
+                    self._cache_token()
+                return self._token
             except exceptions.AuthorizationFailure:
                 logger.warning(
                     'Cant establish connection to keystone with url %s',
@@ -60,12 +253,12 @@ class HTTPClient(object):
                 logger.warning("Keystone returned unauthorized error, trying "
                                "to pass authentication.")
                 self.authenticate()
-                return self.keystone.auth_token
+                return self._token
         return None
 
     def get(self, endpoint):
         req = urllib2.Request(self.url + endpoint)
-        return self._open(req)
+        return self._open(req, endpoint)
 
     def post(self, endpoint, data=None, content_type="application/json"):
         if not data:
@@ -73,7 +266,7 @@ class HTTPClient(object):
         logger.info('self url is %s' % self.url)
         req = urllib2.Request(self.url + endpoint, data=json.dumps(data))
         req.add_header('Content-Type', content_type)
-        return self._open(req)
+        return self._open(req, endpoint)
 
     def put(self, endpoint, data=None, content_type="application/json"):
         if not data:
@@ -81,33 +274,46 @@ class HTTPClient(object):
         req = urllib2.Request(self.url + endpoint, data=json.dumps(data))
         req.add_header('Content-Type', content_type)
         req.get_method = lambda: 'PUT'
-        return self._open(req)
+        return self._open(req, endpoint)
 
     def delete(self, endpoint):
         req = urllib2.Request(self.url + endpoint)
         req.get_method = lambda: 'DELETE'
-        return self._open(req)
+        return self._open(req, endpoint)
 
-    def _open(self, req):
+    def _open(self, req, endpoint=''):
         try:
-            return self._get_response(req)
+            return self._get_response(req, endpoint)
         except urllib2.HTTPError as e:
             if e.code == 401:
                 logger.warning('Authorization failure: {0}'.format(e.read()))
                 self.authenticate()
-                return self._get_response(req)
+                return self._get_response(req, endpoint)
             else:
                 raise
+        finally:
+            if req.get_method() != 'GET':
+                for hook in self.write_hooks:
+                    hook()
 
-    def _get_response(self, req):
-        if self.token is not None:
+    def _get_response(self, req, endpoint=''):
+        token = self.token
+        if token is not None:
             try:
-                logger.debug('Set X-Auth-Token to {0}'.format(self.token))
-                req.add_header("X-Auth-Token", self.token)
+                logger.debug('Set X-Auth-Token to {0}'.format(token))
+                req.add_header("X-Auth-Token", token)
             except exceptions.AuthorizationFailure:
                 logger.warning('Failed with auth in http _get_response')
                 logger.warning(traceback.format_exc())
-        return self.opener.open(req)
+        start = time.time()
+        try:
+            return self.opener.open(req)
+        finally:
+            self.latency.add(req.get_method(), endpoint,
+                             time.time() - start)
+
+    def close(self):
+        self.pool.close()
 
 
 class HTTPClientZabbix(object):
@@ -115,13 +321,15 @@ class HTTPClientZabbix(object):
 
     def __init__(self, url):
         self.url = url
-        self.opener = urllib2.build_opener(urllib2.HTTPHandler)
+        self.pool = ConnectionPool()
+        self.opener = urllib2.build_opener(KeepAliveHandler(self.pool))
+        self.latency = LatencyCounters()
 
     def get(self, endpoint=None, cookie=None):
         req = urllib2.Request(self.url + endpoint)
         if cookie:
             req.add_header('cookie', cookie)
-        return self.opener.open(req)
+        return self._open(req, endpoint)
 
     def post(self, endpoint=None, data=None, content_type="text/css",
              cookie=None):
@@ -131,4 +339,15 @@ class HTTPClientZabbix(object):
         req.add_header('Content-Type', content_type)
         if cookie:
             req.add_header('cookie', cookie)
-        return self.opener.open(req)
+        return self._open(req, endpoint)
+
+    def _open(self, req, endpoint):
+        start = time.time()
+        try:
+            return self.opener.open(req)
+        finally:
+            self.latency.add(req.get_method(), endpoint,
+                             time.time() - start)
+
+    def close(self):
+        self.pool.close()
@@ -0,0 +1,129 @@
+#    Copyright 2015 Mirantis, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import copy
+import threading
+import time
+
+from fuelweb_test import logger
+
+
+class NodesIndex(object):
+    """Snapshot of nailgun nodes with hash lookups by MAC, FQDN and name.
+
+    The snapshot is built from a single list_nodes() call and is reused
+    for 'ttl' seconds, so lookups made in loops over many nodes cost one
+    API request instead of one request per node. The snapshot must be
+    invalidated whenever nodes state is changed; FuelWebClient does it
+    after every write request to Nailgun.
+    """
+
+    def __init__(self, fetch_nodes, ttl=5):
+        """
+        :param fetch_nodes: callable which returns the list of nailgun nodes
+        :param ttl: seconds during which the snapshot is considered fresh
+        """
+        self.fetch_nodes = fetch_nodes
+        self.ttl = ttl
+        self._nodes = None
+        self._updated = 0
+        self._by_mac = {}
+        self._by_fqdn = {}
+        self._by_name = {}
+        self._lock = threading.RLock()
+
+    def invalidate(self):
+        with self._lock:
+            self._nodes = None
+
+    def refresh(self):
+        nodes = self.fetch_nodes()
+        by_mac, by_fqdn, by_name = {}, {}, {}
+        for node in nodes:
+            for iface in node['meta']['interfaces']:
+                by_mac[iface['mac'].upper()] = node
+            by_mac.setdefault(node['mac'].upper(), node)
+            fqdn = node['meta'].get('system', {}).get('fqdn')
+            if fqdn:
+                by_fqdn[fqdn] = node
+            if node.get('name'):
+                by_name[node['name']] = node
+        with self._lock:
+            self._nodes = nodes
+            self._by_mac = by_mac
+            self._by_fqdn = by_fqdn
+            self._by_name = by_name
+            self._updated = time.time()
+        logger.debug('Nodes index is refreshed: {0} nodes'.format(len(nodes)))
+
+    def _actual(self):
+        with self._lock:
+            if self._nodes is None or time.time() - self._updated > self.ttl:
+                self.refresh()
+
+    @property
+    def nodes(self):
+        self._actual()
+        return copy.deepcopy(self._nodes)
+
+    def get_by_mac(self, mac):
+        self._actual()
+        return copy.deepcopy(self._by_mac.get(mac.upper()))
+
+    def get_by_macs(self, macs):
+        """Return node which has all the given MACs on its interfaces."""
+        self._actual()
+        macs = {mac.upper() for mac in macs}
+        if not macs:
+            return None
+        node = self._by_mac.get(next(iter(macs)))
+        if node is None:
+            return None
+        node_macs = {i['mac'].upper() for i in node['meta']['interfaces']}
+        # Because our HAproxy may create some interfaces
+        if macs.issubset(node_macs):
+            return copy.deepcopy(node)
+        return None
+
+    def get_by_fqdn(self, fqdn):
+        self._actual()
+        return copy.deepcopy(self._by_fqdn.get(fqdn))
+
+    def get_by_name(self, name):
+        self._actual()
+        return copy.deepcopy(self._by_name.get(name))
+
+
+class DevopsNodesIndex(object):
+    """MAC address -> devops node map built with a single walk over
+    the devops environment interfaces.
+    """
+
+    def __init__(self, get_nodes):
+        self.get_nodes = get_nodes
+        self._by_mac = None
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        with self._lock:
+            self._by_mac = None
+
+    def get_by_mac(self, mac):
+        with self._lock:
+            if self._by_mac is None:
+                self._by_mac = {
+                    iface.mac_address.lower(): node
+                    for node in self.get_nodes()
+                    for iface in node.interfaces}
+            return self._by_mac.get(mac.lower())
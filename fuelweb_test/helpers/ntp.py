@@ -13,6 +13,7 @@
 #    under the License.
 
 import time
+from multiprocessing.pool import ThreadPool
 
 from devops.error import TimeoutError
 from devops.helpers.helpers import wait
@@ -20,10 +21,31 @@ from proboscis.asserts import assert_true
 
 from fuelweb_test import logger
 from fuelweb_test import logwrap
+from fuelweb_test.settings import SSH_FANOUT_WORKERS
+
+
+def _parallel_map(func, items):
+    """Call func for each item in threads, return results in items order.
+
+    An exception raised for any item is re-raised after all the calls
+    are completed.
+    """
+    if len(items) < 2:
+        return map(func, items)
+    pool = ThreadPool(min(len(items), SSH_FANOUT_WORKERS))
+    try:
+        return pool.map(func, items)
+    finally:
+        pool.close()
 
 
 class GroupNtpSync(object):
-    """Synchronize a group of nodes."""
+    """Synchronize a group of nodes.
+
+    Each step of the synchronization is done on all the nodes of the group
+    simultaneously, the next step starts when the previous one is completed
+    on every node.
+    """
 
     ntps = []
 
@@ -36,10 +58,13 @@ class GroupNtpSync(object):
                             " connections to {0}".format(nailgun_nodes))
 
         # 1. Create a list of 'Ntp' connections to the nodes
-        self.ntps = [Ntp.get_ntp(env.d_env.get_ssh_to_remote(node['ip']),
-                                 'node-{0}'.format(node['id']),
-                                 env.get_admin_node_ip())
-                     for node in nailgun_nodes]
+        admin_ip = env.get_admin_node_ip() if env else None
+        self.ntps = _parallel_map(
+            lambda node: Ntp.get_ntp(env.d_env.get_ssh_to_remote(node['ip']),
+                                     'node-{0}'.format(node['id']),
+                                     admin_ip),
+            nailgun_nodes)
+        self.timings = {}
 
     @property
     def is_synchronized(self):
@@ -57,28 +82,56 @@ class GroupNtpSync(object):
         return [(ntp.node_name, ntp.peers)
                 for ntp in self.ntps if not ntp.is_connected]
 
+    def run_step(self, step):
+        """Call Ntp method 'step' on all the nodes at once and store
+        the time it took on every node.
+        """
+        def _timed(ntp):
+            start = time.time()
+            try:
+                return getattr(ntp, step)()
+            finally:
+                self.timings.setdefault(ntp.node_name, []).append(
+                    (step, time.time() - start))
+
+        return _parallel_map(_timed, self.ntps)
+
+    def report_timings(self):
+        for ntp in self.ntps:
+            steps = self.timings.get(ntp.node_name, [])
+            logger.info("Time sync on '{0}' took {1:.1f}s: {2}".format(
+                ntp.node_name, sum(took for _, took in steps),
+                ', '.join('{0} {1:.1f}s'.format(step, took)
+                          for step, took in steps)))
+
     def do_sync_time(self, ntps=[]):
         # 0. 'ntps' can be filled by __init__() or outside the class
         self.ntps = ntps or self.ntps
+        self.timings = {}
 
-        # 1. Set actual time on all nodes via 'ntpdate'
-        [ntp.set_actual_time() for ntp in self.ntps]
-        assert_true(self.is_synchronized, "Time on nodes was not set:"
-                    " \n{0}".format(self.report_not_synchronized()))
-
-        # 2. Restart NTPD service
-        [ntp.stop() for ntp in self.ntps]
-        [ntp.start() for ntp in self.ntps]
-
-        # 3. Wait for established peers
-        [ntp.wait_peer() for ntp in self.ntps]
-        assert_true(self.is_connected, "Time on nodes was not synchronized:"
-                    " \n{0}".format(self.report_not_connected()))
+        try:
+            # 1. Set actual time on all nodes via 'ntpdate'
+            self.run_step('set_actual_time')
+            assert_true(self.is_synchronized, "Time on nodes was not set:"
+                        " \n{0}".format(self.report_not_synchronized()))
+
+            # 2. Restart NTPD service
+            self.run_step('stop')
+            self.run_step('start')
+
+            # 3. Wait for established peers
+            self.run_step('wait_peer')
+            assert_true(self.is_connected,
+                        "Time on nodes was not synchronized:"
+                        " \n{0}".format(self.report_not_connected()))
+        finally:
+            self.report_timings()
 
         # 4. Report time on nodes
-        for ntp in self.ntps:
+        dates = self.run_step('date')
+        for ntp, date in zip(self.ntps, dates):
             logger.info("Time on '{0}' = {1}".format(ntp.node_name,
-                                                     ntp.date()[0].rstrip()))
+                                                     date[0].rstrip()))
 
 
 class Ntp(object):
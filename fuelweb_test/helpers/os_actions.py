@@ -12,16 +12,52 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
-import paramiko
+import collections
+import math
 from proboscis import asserts
 import random
 import time
+from multiprocessing.pool import ThreadPool
 
 from devops.error import TimeoutError
 from devops.helpers import helpers
 from fuelweb_test.helpers import common
 from fuelweb_test import logger
 from fuelweb_test.helpers.decorators import retry
+from fuelweb_test.helpers.vm_sessions import vm_sessions
+from fuelweb_test.settings import OPENSTACK_API_WORKERS
+
+
+def percentiles(values, points=(50, 90, 95, 99)):
+    """Return {point: value} of the nearest-rank percentiles."""
+    values = sorted(values)
+    if not values:
+        return {}
+    return {point: values[max(int(math.ceil(point / 100.0 * len(values))),
+                              1) - 1]
+            for point in points}
+
+
+class BatchResult(object):
+    """Resources created by a batch operation and time spent till each of
+    them became ready.
+
+    resources - list of the resources in the order of creation requests
+    latencies - {resource id: seconds from create request till ready}
+    """
+
+    def __init__(self, resources, latencies):
+        self.resources = resources
+        self.latencies = latencies
+
+    def percentiles(self, points=(50, 90, 95, 99)):
+        return percentiles(self.latencies.values(), points)
+
+    def log(self, action):
+        logger.info('{0} {1} resource(s), latency percentiles (sec): '
+                    '{2}'.format(action, len(self.resources), ', '.join(
+                        'p{0}={1:.1f}'.format(point, value) for point, value
+                        in sorted(self.percentiles().items()))))
 
 
 class OpenStackActions(common.Common):
@@ -192,6 +228,133 @@ class OpenStackActions(common.Common):
         server = self.get_instance_detail(server.id)
         return server
 
+    def _send_batch(self, func, items):
+        """Call func(item) for all the items with up to OPENSTACK_API_WORKERS
+        simultaneous requests.
+
+        :return: list of (result, time the request was sent) pairs in
+                 the order of items
+        """
+        def _call(item):
+            started = time.time()
+            return func(item), started
+
+        items = list(items)
+        if not items:
+            return []
+        pool = ThreadPool(min(OPENSTACK_API_WORKERS, len(items)))
+        try:
+            return pool.map(_call, items)
+        finally:
+            pool.close()
+            pool.join()
+
+    @staticmethod
+    def _wait_batch(list_resources, started, ready_status, timeout,
+                    interval=2, error_statuses=('error', 'ERROR')):
+        """Wait till all the resources reach ready_status, getting all of
+        them with one list_resources() call per tick.
+
+        :param started: {resource id: time of its create request}
+        :rtype: BatchResult with the resources from the last list call
+        """
+        latencies = {}
+        deadline = time.time() + timeout
+        while True:
+            now = time.time()
+            resources = {resource.id: resource
+                         for resource in list_resources()}
+            statuses = {resource_id: resource.status
+                        for resource_id, resource in resources.items()}
+            for resource_id in started:
+                if resource_id in latencies:
+                    continue
+                status = statuses.get(resource_id)
+                asserts.assert_false(
+                    status in error_statuses,
+                    "Resource {0} is in {1} status".format(resource_id,
+                                                           status))
+                if status == ready_status:
+                    latencies[resource_id] = now - started[resource_id]
+            pending = [resource_id for resource_id in started
+                       if resource_id not in latencies]
+            if not pending:
+                return BatchResult([resources[resource_id]
+                                    for resource_id in started], latencies)
+            if now > deadline:
+                raise TimeoutError(
+                    "Resources {0} didn't reach {1} status in {2} sec: "
+                    "{3}".format(pending, ready_status, timeout,
+                                 {r: statuses.get(r) for r in pending}))
+            time.sleep(interval)
+
+    def create_servers(self, count, neutron=False, timeout=300,
+                       flavor=1, image=None, key_name=None,
+                       security_groups=None):
+        """Boot count servers at once and wait till all of them are ACTIVE.
+
+        :rtype: BatchResult, latencies are the boot times
+        """
+        prefix = "test-serv" + str(random.randint(1, 0x7fffffff))
+        image_id = image or self._get_cirros_image().id
+        if security_groups is None:
+            security_groups = [self.create_sec_group_for_ssh().name]
+        kwargs = {'security_groups': security_groups,
+                  'key_name': key_name}
+        if neutron:
+            network = [net.id for net in self.nova.networks.list()
+                       if net.label == 'net04']
+            kwargs['nics'] = [{'net-id': network[0]}]
+
+        created = self._send_batch(
+            lambda number: self.nova.servers.create(
+                name='{0}-{1}'.format(prefix, number),
+                image=image_id, flavor=flavor, **kwargs),
+            range(count))
+        started = collections.OrderedDict(
+            (server.id, start) for server, start in created)
+        result = self._wait_batch(
+            lambda: self.nova.servers.list(
+                detailed=True, search_opts={'name': prefix}),
+            started, 'ACTIVE', timeout)
+        result.log('Booted')
+        return result
+
+    def create_volumes(self, count, size=1, timeout=300):
+        """Create count volumes at once and wait till all of them are
+        available.
+
+        :rtype: BatchResult, latencies are the creation times
+        """
+        created = self._send_batch(
+            lambda _: self.cinder.volumes.create(size), range(count))
+        started = collections.OrderedDict(
+            (volume.id, start) for volume, start in created)
+        result = self._wait_batch(self.cinder.volumes.list, started,
+                                  'available', timeout)
+        result.log('Created')
+        return result
+
+    def attach_volumes(self, volumes_servers, mount='/dev/vdb', timeout=300):
+        """Attach volumes to servers at once and wait till all of them are
+        in-use.
+
+        :param volumes_servers: list of (volume, server) pairs
+        :rtype: BatchResult, latencies are the attach times
+        """
+        volumes_servers = list(volumes_servers)
+        attached = self._send_batch(
+            lambda pair: self.cinder.volumes.attach(pair[0], pair[1].id,
+                                                    mount),
+            volumes_servers)
+        started = collections.OrderedDict(
+            (volume.id, start) for (_, start), (volume, _)
+            in zip(attached, volumes_servers))
+        result = self._wait_batch(self.cinder.volumes.list, started,
+                                  'in-use', timeout)
+        result.log('Attached')
+        return result
+
     def create_volume(self, size=1):
         volume = self.cinder.volumes.create(size)
         helpers.wait(
@@ -237,30 +400,8 @@ class OpenStackActions(common.Common):
 
     @retry(count=6, delay=10)
     def _execute_through_host_retry(self, ssh, vm_host, cmd, creds):
-        logger.debug("Making intermediate transport")
-        interm_transp = ssh._ssh.get_transport()
-        logger.debug("Opening channel to VM")
-        interm_chan = interm_transp.open_channel('direct-tcpip',
-                                                 (vm_host, 22),
-                                                 (ssh.host, 0))
-        logger.debug("Opening paramiko transport")
-        transport = paramiko.Transport(interm_chan)
-        logger.debug("Starting client")
-        transport.start_client()
-        logger.info("Passing authentication to VM: {}".format(creds))
-        if not creds:
-            creds = ('cirros', 'cubswin:)')
-        transport.auth_password(creds[0], creds[1])
-
-        logger.debug("Opening session")
-        channel = transport.open_session()
-        logger.info("Executing command: {}".format(cmd))
-        channel.exec_command(cmd)
-        logger.debug("Getting exit status")
-        output = channel.recv(1024)
-        logger.debug("Sending shutdown write signal")
-        channel.shutdown_write()
-        return output
+        result = vm_sessions.execute(ssh, vm_host, cmd, creds)
+        return ''.join(result['stdout'])
 
     def execute_through_host(self, ssh, vm_host, cmd, creds=()):
         try:
@@ -269,6 +410,14 @@ class OpenStackActions(common.Common):
             logger.error("An exception occurred: %s" % exc)
             return ''
 
+    def execute_on_vms(self, ssh, vm_hosts, cmd, creds=(), timeout=None):
+        """Run the command on many VMs at once through the controller.
+
+        :rtype: FanOutResult with {'exit_code', 'stdout', 'stderr'} results
+        """
+        return vm_sessions.execute_many(ssh, vm_hosts, cmd, creds,
+                                        timeout=timeout)
+
     def get_tenant(self, tenant_name):
         tenant_list = self.keystone.tenants.list()
         for ten in tenant_list:
@@ -0,0 +1,139 @@
+#    Copyright 2015 Mirantis, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import hashlib
+import json
+import os
+import threading
+import yaml
+
+from fuelweb_test import logger
+from fuelweb_test import settings
+
+
+TESTS_FILE = 'test.yaml'
+PACKAGES_FILE = 'packages.yaml'
+
+
+def get_tree_mtimes(path):
+    """Return {relative path: mtime} of all the YAML files of the tree."""
+    mtimes = {}
+    for root, _, files in os.walk(path):
+        for name in files:
+            if name.endswith('.yaml'):
+                file_path = os.path.join(root, name)
+                mtimes[os.path.relpath(file_path, path)] = \
+                    os.path.getmtime(file_path)
+    return mtimes
+
+
+def load_tags(path):
+    if not os.path.isfile(path):
+        return []
+    with open(path) as f:
+        test = yaml.load(f.read())
+    if test and 'system_tests' in test.keys():
+        return test['system_tests']['tags']
+    return []
+
+
+def build_index(path):
+    """Walk packages tests tree of one packages type (deb or rpm) and
+    return {package: {'target': ..., 'project': ..., 'tags': [...]}}.
+
+    Tags of the package are the tags of its installation target, its
+    project and its own ones.
+    """
+    with open(os.path.join(path, PACKAGES_FILE)) as f:
+        all_packages = yaml.load(f.read())
+    index = {}
+    for target, target_data in all_packages.items():
+        target_tags = load_tags(os.path.join(path, target, TESTS_FILE))
+        for project in target_data['projects']:
+            project_tags = target_tags + load_tags(
+                os.path.join(path, target, project['name'], TESTS_FILE))
+            for package in project['packages']:
+                if package in index:
+                    continue
+                tags = project_tags + load_tags(os.path.join(
+                    path, target, project['name'], package, TESTS_FILE))
+                index[package] = {'target': target,
+                                  'project': project['name'],
+                                  'tags': sorted(set(tags))}
+    return index
+
+
+class PackagesTestsIndex(object):
+    """Package -> (target, project, tests tags) map of packages tests tree.
+
+    The map is compiled once and saved to 'cache_path' directory together
+    with the modification times of the tree files; it's compiled again
+    when any YAML file of the tree is added, removed or changed.
+    """
+
+    def __init__(self, cache_path=settings.PATCHING_METADATA_CACHE):
+        self.cache_path = cache_path
+        self._indexes = {}
+        self._lock = threading.Lock()
+
+    def _artifact_path(self, path):
+        return os.path.join(self.cache_path, 'packages_tests_{0}.json'.format(
+            hashlib.sha1(path).hexdigest()))
+
+    def _load_artifact(self, path, mtimes):
+        if not self.cache_path:
+            return None
+        try:
+            with open(self._artifact_path(path)) as f:
+                artifact = json.load(f)
+        except (IOError, ValueError):
+            return None
+        if artifact['mtimes'] != mtimes:
+            return None
+        return artifact['index']
+
+    def _save_artifact(self, path, mtimes, index):
+        if not self.cache_path:
+            return
+        artifact_path = self._artifact_path(path)
+        tmp_path = '{0}.{1}'.format(artifact_path, os.getpid())
+        try:
+            if not os.path.isdir(self.cache_path):
+                os.makedirs(self.cache_path)
+            with open(tmp_path, 'w') as f:
+                json.dump({'path': path, 'mtimes': mtimes, 'index': index}, f)
+            os.rename(tmp_path, artifact_path)
+        except (IOError, OSError) as e:
+            logger.warning("Can't save packages tests index {0}: {1}".format(
+                artifact_path, e))
+
+    def get_index(self, tests_path, pkg_type):
+        """Return {package: {'target', 'project', 'tags'}} map."""
+        path = os.path.abspath(os.path.join(tests_path, pkg_type))
+        with self._lock:
+            mtimes = get_tree_mtimes(path)
+            cached = self._indexes.get(path)
+            if cached is not None and cached[0] == mtimes:
+                return cached[1]
+            index = self._load_artifact(path, mtimes)
+            if index is None:
+                logger.debug('Building packages tests index for '
+                             '"{0}"'.format(path))
+                index = build_index(path)
+                self._save_artifact(path, mtimes, index)
+            self._indexes[path] = (mtimes, index)
+            return index
+
+
+packages_tests_index = PackagesTestsIndex()
@@ -12,15 +12,14 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import functools
 import os
 import re
 import sys
 import yaml
-import zlib
 from urllib2 import HTTPError
 from urllib2 import urlopen
 from urlparse import urlparse
-from xml.dom.minidom import parseString
 
 from proboscis import register
 from proboscis import TestProgram
@@ -31,6 +30,8 @@ from proboscis.asserts import assert_true
 
 from fuelweb_test import logger
 from fuelweb_test import settings
+from fuelweb_test.helpers.packages_tests_index import packages_tests_index
+from fuelweb_test.helpers.repo_metadata import repo_metadata
 
 
 patching_validation_schema = {
@@ -102,12 +103,10 @@ def map_test(target):
             settings.PATCHING_PKGS = set(
                 [re.split('=|<|>', package)[0] for package
                  in errata['fixed-pkgs'][distro.lower()]])
-        available_packages = set()
-        logger.debug('{0}'.format(settings.PATCHING_MIRRORS))
-        for repo in settings.PATCHING_MIRRORS:
-            logger.debug(
-                'Checking packages from "{0}" repository'.format(repo))
-            available_packages.update(get_repository_packages(repo, distro))
+        logger.debug('Checking packages from "{0}" repositories'.format(
+            settings.PATCHING_MIRRORS))
+        available_packages = repo_metadata.get_mirrors_packages(
+            settings.PATCHING_MIRRORS, distro)
         if not settings.PATCHING_PKGS:
             settings.PATCHING_PKGS = available_packages
         else:
@@ -143,23 +142,7 @@ def map_test(target):
 
 
 def get_repository_packages(remote_repo_url, repo_type):
-    repo_url = urlparse(remote_repo_url)
-    packages = []
-    if repo_type == settings.OPENSTACK_RELEASE_UBUNTU:
-        packages_url = '{0}/Packages'.format(repo_url.geturl())
-        pkgs_raw = urlopen(packages_url).read()
-        for pkg in pkgs_raw.split('\n'):
-            match = re.search(r'^Package: (\S+)\s*$', pkg)
-            if match:
-                packages.append(match.group(1))
-    else:
-        packages_url = '{0}/repodata/primary.xml.gz'.format(repo_url.geturl())
-        pkgs_xml = parseString(zlib.decompressobj(zlib.MAX_WBITS | 32).
-                               decompress(urlopen(packages_url).read()))
-        for pkg in pkgs_xml.getElementsByTagName('package'):
-            packages.append(
-                pkg.getElementsByTagName('name')[0].firstChild.nodeValue)
-    return packages
+    return repo_metadata.get_packages(remote_repo_url, repo_type)
 
 
 def _get_target_and_project(_pkg, _all_pkgs):
@@ -173,7 +156,7 @@ def get_package_test_info_remote(package, pkg_type, tests_url, patch_target):
     packages_url = "{0}/{1}/packages.yaml".format(tests_url, pkg_type)
     tests = set()
     tests_file = 'test.yaml'
-    all_packages = yaml.load(urlopen(packages_url).read())
+    all_packages = repo_metadata.load_yaml(packages_url)
     assert_is_not_none(_get_target_and_project(package, all_packages),
                        "Package '{0}' doesn't belong to any installation "
                        "target / project".format(package))
@@ -191,7 +174,7 @@ def get_package_test_info_remote(package, pkg_type, tests_url, patch_target):
                                   package, tests_file))
     for url in (target_tests_url, project_tests_url, package_tests_url):
         try:
-            test = yaml.load(urlopen(url).read())
+            test = repo_metadata.load_yaml(url)
             if 'system_tests' in test.keys():
                 tests.update(test['system_tests']['tags'])
         except HTTPError:
@@ -199,52 +182,47 @@ def get_package_test_info_remote(package, pkg_type, tests_url, patch_target):
     return tests
 
 
-def get_package_test_info_local(package, pkg_type, tests_path, patch_target):
-    packages_path = "{0}/{1}/packages.yaml".format(tests_path, pkg_type)
-    tests = set()
-    tests_file = 'test.yaml'
-    all_packages = yaml.load(open(packages_path).read())
-    assert_is_not_none(_get_target_and_project(package, all_packages),
+def get_package_test_info_local(package, pkg_type, tests_path, patch_target,
+                                index=None):
+    if index is None:
+        index = packages_tests_index.get_index(tests_path, pkg_type)
+    package_info = index.get(package)
+    assert_is_not_none(package_info,
                        "Package '{0}' doesn't belong to any installation "
                        "target / project".format(package))
-    target, project = _get_target_and_project(package, all_packages)
+    target = package_info['target']
     if patch_target == 'master':
         if target not in ['master', 'bootstrap']:
             return set([None])
     if patch_target == 'environment':
         if target not in ['deployment', 'provisioning']:
             return set([None])
-    target_tests_path = "/".join((tests_path, pkg_type, target, tests_file))
-    project_tests_path = "/".join((tests_path, pkg_type, target, project,
-                                   tests_file))
-    package_tests_path = "/".join((tests_path, pkg_type, target, project,
-                                   package, tests_file))
-    for path in (target_tests_path, project_tests_path, package_tests_path):
-        try:
-            test = yaml.load(open(path).read())
-            if 'system_tests' in test.keys():
-                tests.update(test['system_tests']['tags'])
-        except IOError:
-            pass
-    return tests
+    return set(package_info['tags'])
 
 
 def get_packages_tests(packages, distro, target):
+    if distro == settings.OPENSTACK_RELEASE_UBUNTU:
+        pkg_type = 'deb'
+    else:
+        pkg_type = 'rpm'
     if 'http' in urlparse(settings.PATCHING_PKGS_TESTS):
         get_method = get_package_test_info_remote
+        map_method = repo_metadata.map
     elif os.path.isdir(settings.PATCHING_PKGS_TESTS):
-        get_method = get_package_test_info_local
+        get_method = functools.partial(
+            get_package_test_info_local,
+            index=packages_tests_index.get_index(
+                settings.PATCHING_PKGS_TESTS, pkg_type))
+        map_method = map
     else:
         raise Exception("Path for packages tests doesn't look like URL or loca"
                         "l folder: '{0}'".format(settings.PATCHING_PKGS_TESTS))
-    if distro == settings.OPENSTACK_RELEASE_UBUNTU:
-        pkg_type = 'deb'
-    else:
-        pkg_type = 'rpm'
+    packages = sorted(packages)
     packages_tests = set()
-    for package in packages:
-        tests = get_method(package, pkg_type, settings.PATCHING_PKGS_TESTS,
-                           target)
+    for package, tests in zip(packages, map_method(
+            lambda pkg: get_method(pkg, pkg_type,
+                                   settings.PATCHING_PKGS_TESTS, target),
+            packages)):
         assert_true(len(tests) > 0,
                     "Tests for package {0} not found".format(package))
         if None in tests:
@@ -220,18 +220,20 @@ class CustomRepo(object):
         # Process the packages list:
         total_pkgs = len(self.pkgs_list)
         logger.info('Found {0} custom package(s)'.format(total_pkgs))
+        if not total_pkgs:
+            return
 
-        for npkg, pkg in enumerate(self.pkgs_list):
-            # TODO: Previous versions of the updating packages must be removed
-            # to avoid unwanted packet manager dependences resolution
-            # (when some package still depends on other package which
-            # is not going to be installed)
-
-            logger.info('({0}/{1}) Downloading package: {2}/{3}'
-                        .format(npkg + 1, total_pkgs,
-                                self.custom_pkgs_mirror,
-                                pkg["filename:"]))
+        # TODO: Previous versions of the updating packages must be removed
+        # to avoid unwanted packet manager dependences resolution
+        # (when some package still depends on other package which
+        # is not going to be installed)
 
+        # The whole list is sent to the admin node at once and the packages
+        # are downloaded there by 'xargs', several 'wget' at a time
+        pkgs_list_path = '{0}/custom_pkgs.list'.format(
+            self.remote_path_scripts)
+        pkgs_list = self.remote.open(pkgs_list_path, 'w')
+        for pkg in self.pkgs_list:
             pkg_ext = pkg["filename:"].split('.')[-1]
             if pkg_ext == 'deb':
                 path_suff = 'main/'
@@ -239,40 +241,86 @@ class CustomRepo(object):
                 path_suff = 'debian-installer/'
             else:
                 path_suff = ''
-
-            wget_cmd = "wget --no-verbose --directory-prefix {0} {1}/{2}"\
-                       .format(pkgs_local_path + path_suff,
-                               self.custom_pkgs_mirror,
-                               pkg["filename:"])
-            wget_result = self.remote.execute(wget_cmd)
-            assert_equal(0, wget_result['exit_code'],
-                         self.assert_msg(wget_cmd, wget_result['stderr']))
+            pkgs_list.write('{0} {1}/{2}\n'.format(pkgs_local_path + path_suff,
+                                                   self.custom_pkgs_mirror,
+                                                   pkg["filename:"]))
+        pkgs_list.close()
+
+        # Every line of the output is 'OK <size> <start> <end> <url>' or
+        # 'FAILED <exit code> <start> <end> <url>: <error>'
+        wget_cmd = (
+            'xargs -P {0} -L 1 sh -c \''
+            'start=$(date +%s.%N); '
+            'out=$(wget --no-verbose --directory-prefix "$1" "$2" 2>&1); '
+            'rc=$?; end=$(date +%s.%N); '
+            'if [ $rc -eq 0 ]; then '
+            'echo "OK $(stat -c %s "$1/${{2##*/}}") $start $end $2"; '
+            'else echo "FAILED $rc $start $end $2: $(echo "$out" | tail -1)"; '
+            'fi\' _ < {1}'.format(
+                settings.CUSTOM_PKGS_DOWNLOAD_WORKERS, pkgs_list_path))
+        wget_result = self.remote.execute(wget_cmd)
+        self.remote.execute('rm -f {0}'.format(pkgs_list_path))
+        assert_equal(0, wget_result['exit_code'],
+                     self.assert_msg(wget_cmd, wget_result['stderr']))
+
+        failed = []
+        total_size = 0
+        for npkg, line in enumerate(wget_result['stdout']):
+            status, value, start, end, url = line.strip().split(' ', 4)
+            if status != 'OK':
+                failed.append(url)
+                continue
+            if not value.isdigit():
+                # wget has saved the package under another name
+                failed.append('{0}: downloaded file is not found'.format(url))
+                continue
+            size = int(value)
+            spent = max(float(end) - float(start), 0.001)
+            total_size += size
+            logger.info('({0}/{1}) Downloaded package: {2} ({3:.1f} KB in '
+                        '{4:.2f} sec, {5:.1f} KB/s)'
+                        .format(npkg + 1, total_pkgs, url, size / 1024.0,
+                                spent, size / 1024.0 / spent))
+        logger.info('Downloaded {0:.1f} MB of custom packages'
+                    .format(total_size / 1024.0 / 1024))
+        assert_equal([], failed,
+                     'Could not download package(s) from the custom mirror:'
+                     '\n{0}'.format('\n'.join(failed)))
+        assert_equal(total_pkgs, len(wget_result['stdout']),
+                     'Some of the packages were not downloaded: {0}'
+                     .format(''.join(wget_result['stdout'])))
 
     # Update yaml (pacth_to_yaml)
     def update_yaml(self, yaml_versions):
-            # Update the corresponding .yaml with the new package version.
+        # Update the corresponding .yaml with the new package versions,
+        # the file is read and written back once
+        versions = {}
         for pkg in self.pkgs_list:
-            result = self.remote.execute(
-                'grep -e "^{0}: " {1}'.format(pkg["package:"], yaml_versions))
-            if result['exit_code'] == 0:
-                sed_cmd = ('sed -i \'s/^{0}: .*/{0}: "{1}"/\' {2}'
-                           .format(pkg["package:"],
-                                   pkg["version:"],
-                                   yaml_versions))
-                sed_result = self.remote.execute(sed_cmd)
-                assert_equal(0, sed_result['exit_code'],
-                             self.assert_msg(sed_cmd, sed_result['stderr']))
-            else:
-                assert_equal(1, result['exit_code'], 'Error updating {0}\n{1}'
-                             .format(yaml_versions, traceback.format_exc()))
-                echo_cmd = ('echo "{0}: \\"{1}\\"" >> {2}'
-                            .format(pkg["package:"],
-                                    pkg["version:"],
-                                    yaml_versions))
-                echo_result = self.remote.execute(echo_cmd)
-                assert_equal(0, echo_result['exit_code'],
-                             self.assert_msg(echo_cmd,
-                                             echo_result['stderr']))
+            versions[pkg["package:"]] = pkg["version:"]
+
+        yaml_file = self.remote.open(yaml_versions, 'r')
+        lines = yaml_file.readlines()
+        yaml_file.close()
+
+        updated = set()
+        for nline, line in enumerate(lines):
+            name = line.split(': ', 1)[0]
+            if ': ' in line and name in versions:
+                lines[nline] = '{0}: "{1}"\n'.format(name, versions[name])
+                updated.add(name)
+        if lines and not lines[-1].endswith('\n'):
+            lines[-1] += '\n'
+        added = [pkg["package:"] for pkg in self.pkgs_list
+                 if pkg["package:"] not in updated]
+        for name in sorted(set(added), key=added.index):
+            lines.append('{0}: "{1}"\n'.format(name, versions[name]))
+
+        yaml_file = self.remote.open(yaml_versions, 'w')
+        yaml_file.write(''.join(lines))
+        yaml_file.close()
+        logger.info('{0}: {1} package version(s) updated, {2} added'
+                    .format(yaml_versions, len(updated),
+                            len(set(added))))
 
     # Upload regenerate* script to masternode (script name)
     def regenerate_repo(self, regenerate_script, local_mirror_path):
@@ -0,0 +1,261 @@
+#    Copyright 2015 Mirantis, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import hashlib
+import json
+import os
+import threading
+import urllib2
+import yaml
+import zlib
+from multiprocessing.pool import ThreadPool
+from xml.etree import cElementTree
+
+from fuelweb_test import logger
+from fuelweb_test import settings
+from fuelweb_test.helpers.http import ConnectionPool
+from fuelweb_test.helpers.http import KeepAliveHandler
+
+
+CHUNK_SIZE = 64 * 1024
+
+
+class CachingStream(object):
+    """Response body reader which writes the read data to the cache.
+
+    The cached file and its validators are saved only when the body is
+    read till the end, so an interrupted download never gets to the cache.
+    """
+
+    def __init__(self, response, path, meta_path, meta):
+        self.response = response
+        self.path = path
+        self.meta_path = meta_path
+        self.meta = meta
+        self.tmp_path = '{0}.{1}.{2}'.format(
+            path, os.getpid(), threading.current_thread().ident)
+        self._file = open(self.tmp_path, 'wb')
+
+    def read(self, size=-1):
+        data = self.response.read(size)
+        if self._file is None:
+            return data
+        if data:
+            self._file.write(data)
+        if not data or size < 0:
+            self._file.close()
+            self._file = None
+            os.rename(self.tmp_path, self.path)
+            with open(self.meta_path, 'w') as f:
+                json.dump(self.meta, f)
+        return data
+
+    def close(self):
+        self.response.close()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            os.unlink(self.tmp_path)
+
+
+class MetadataCache(object):
+    """Files downloaded with conditional GET requests.
+
+    Files are kept under 'path' together with their ETag and Last-Modified
+    validators, the cached copy is used while the server answers
+    "304 Not Modified".
+    """
+
+    def __init__(self, path=settings.PATCHING_METADATA_CACHE):
+        self.path = path
+
+    def _paths(self, url):
+        name = hashlib.sha1(url).hexdigest()
+        return (os.path.join(self.path, name),
+                os.path.join(self.path, '{0}.json'.format(name)))
+
+    def open(self, url, opener):
+        """Return file-like object with the body of the url."""
+        if not self.path:
+            return opener.open(url)
+        path, meta_path = self._paths(url)
+        request = urllib2.Request(url)
+        if os.path.isfile(path) and os.path.isfile(meta_path):
+            with open(meta_path) as f:
+                meta = json.load(f)
+            if meta.get('etag'):
+                request.add_header('If-None-Match', meta['etag'])
+            if meta.get('last_modified'):
+                request.add_header('If-Modified-Since', meta['last_modified'])
+        try:
+            response = opener.open(request)
+        except urllib2.HTTPError as e:
+            if e.code != 304:
+                raise
+            logger.debug('"{0}" is not modified, using cached copy'.format(
+                url))
+            return open(path, 'rb')
+        if not os.path.isdir(self.path):
+            os.makedirs(self.path)
+        meta = {'url': url,
+                'etag': response.info().getheader('ETag'),
+                'last_modified': response.info().getheader('Last-Modified')}
+        if not meta['etag'] and not meta['last_modified']:
+            return response
+        return CachingStream(response, path, meta_path, meta)
+
+
+class Decompressor(object):
+    """Streaming reader of gzip or zlib compressed data."""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self._decompressor = zlib.decompressobj(zlib.MAX_WBITS | 32)
+        self._buffer = ''
+
+    def read(self, size=-1):
+        while size < 0 or len(self._buffer) < size:
+            chunk = self.stream.read(CHUNK_SIZE)
+            if not chunk:
+                self._buffer += self._decompressor.flush()
+                break
+            self._buffer += self._decompressor.decompress(chunk)
+        if size < 0:
+            size = len(self._buffer)
+        data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+    def close(self):
+        self.stream.close()
+
+
+def iter_lines(stream):
+    rest = ''
+    while True:
+        chunk = stream.read(CHUNK_SIZE)
+        if not chunk:
+            break
+        lines = (rest + chunk).split('\n')
+        rest = lines.pop()
+        for line in lines:
+            yield line
+    if rest:
+        yield rest
+
+
+def iter_deb_packages(stream):
+    """Yield names of the packages listed in Debian 'Packages' file."""
+    for line in iter_lines(stream):
+        if line.startswith('Package:'):
+            yield line.split(':', 1)[1].strip()
+
+
+def iter_rpm_packages(stream):
+    """Yield names of the packages listed in 'primary.xml'."""
+    root = None
+    for event, elem in cElementTree.iterparse(stream,
+                                              events=('start', 'end')):
+        if root is None:
+            root = elem
+        if event != 'end' or elem.tag.split('}')[-1] != 'package':
+            continue
+        for child in elem:
+            if child.tag.split('}')[-1] == 'name':
+                yield child.text
+                break
+        root.clear()
+
+
+class RepoMetadata(object):
+    """Packages lists of the repositories and packages tests files.
+
+    Mirrors are fetched in parallel, metadata is decompressed and parsed
+    while it's downloaded. YAML files are loaded once per instance.
+    """
+
+    def __init__(self, cache=None, workers=settings.PATCHING_METADATA_WORKERS):
+        self.cache = cache or MetadataCache()
+        self.workers = workers
+        self.opener = urllib2.build_opener()
+        self.files_opener = urllib2.build_opener(
+            KeepAliveHandler(pool=ConnectionPool(maxsize=workers)))
+        self._yaml = {}
+        self._lock = threading.Lock()
+
+    def map(self, func, items):
+        """Call func for every item in parallel, keeping the order."""
+        items = list(items)
+        if len(items) < 2:
+            return [func(item) for item in items]
+        pool = ThreadPool(min(self.workers, len(items)))
+        try:
+            return pool.map(func, items)
+        finally:
+            pool.close()
+            pool.join()
+
+    def get_packages(self, repo_url, repo_type):
+        repo_url = repo_url.rstrip('/')
+        if repo_type == settings.OPENSTACK_RELEASE_UBUNTU:
+            stream = self.cache.open('{0}/Packages'.format(repo_url),
+                                     self.opener)
+            parse = iter_deb_packages
+        else:
+            stream = Decompressor(self.cache.open(
+                '{0}/repodata/primary.xml.gz'.format(repo_url), self.opener))
+            parse = iter_rpm_packages
+        try:
+            packages = list(parse(stream))
+        finally:
+            stream.close()
+        logger.debug('Found {0} packages in "{1}" repository'.format(
+            len(packages), repo_url))
+        return packages
+
+    def get_mirrors_packages(self, mirrors, repo_type):
+        """Return set of the packages available in all the mirrors."""
+        packages = set()
+        for mirror_packages in self.map(
+                lambda mirror: self.get_packages(mirror, repo_type),
+                mirrors):
+            packages.update(mirror_packages)
+        return packages
+
+    def load_yaml(self, url):
+        """Return parsed YAML file, urllib2.HTTPError of the failed request
+        is raised every time the url is requested.
+        """
+        with self._lock:
+            if url in self._yaml:
+                data, error = self._yaml[url]
+                if error is not None:
+                    raise error
+                return data
+        data, error = None, None
+        try:
+            stream = self.cache.open(url, self.files_opener)
+            try:
+                data = yaml.load(stream.read())
+            finally:
+                stream.close()
+        except urllib2.HTTPError as e:
+            error = e
+        with self._lock:
+            self._yaml[url] = (data, error)
+        if error is not None:
+            raise error
+        return data
+
+
+repo_metadata = RepoMetadata()
@@ -19,6 +19,7 @@ from random import randrange
 from fuelweb_test import logwrap
 from fuelweb_test import logger
 from fuelweb_test.helpers.decorators import retry
+from fuelweb_test.helpers.ssh_fanout import SSHFanOut
 from fuelweb_test.settings import OPENSTACK_RELEASE
 from fuelweb_test.settings import OPENSTACK_RELEASE_UBUNTU
 
@@ -86,7 +87,6 @@ class SecurityChecks(object):
     @retry()
     @logwrap
     def verify_firewall(self, cluster_id):
-        admin_remote = self.environment.d_env.get_admin_remote()
         # Install NetCat
         if not self.environment.admin_install_pkg('nc') == 0:
             raise Exception('Can not install package "nc".')
@@ -95,7 +95,8 @@ class SecurityChecks(object):
         tmp_file_path = '/var/tmp/iptables_check_file'
         check_string = 'FirewallHole'
 
-        for node in cluster_nodes:
+        def _check_node(remote, node):
+            admin_remote = self.environment.d_env.get_admin_remote()
             protocols_to_check = ['tcp', 'udp']
             for protocol in protocols_to_check:
                 port = self._listen_random_port(ip_address=node['ip'],
@@ -109,7 +110,6 @@ class SecurityChecks(object):
                     format(opts=nc_opts, string=check_string, ip=node['ip'],
                            port=port)
                 admin_remote.execute(cmd)
-                remote = self.environment.d_env.get_ssh_to_remote(node['ip'])
                 cmd = 'cat {0}; mv {0}{{,.old}}'.format(tmp_file_path)
                 result = remote.execute(cmd)
                 if ''.join(result['stdout']).strip() == check_string:
@@ -119,4 +119,8 @@ class SecurityChecks(object):
                            'details'.format(port, protocol, node['name'],
                                             node['id'], tmp_file_path))
                     raise Exception(msg)
+
+        SSHFanOut(self.environment.d_env.get_ssh_to_remote).map(
+            _check_node, [node['ip'] for node in cluster_nodes],
+            items=cluster_nodes).check()
         logger.info('Firewall test passed')
@@ -0,0 +1,144 @@
+#    Copyright 2015 Mirantis, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import sys
+import time
+import traceback
+from multiprocessing.pool import ThreadPool
+
+from devops.error import TimeoutError
+
+from fuelweb_test import logger
+from fuelweb_test.settings import SSH_FANOUT_WORKERS
+
+
+class FanOutResult(object):
+    """Per-host results of SSHFanOut run.
+
+    results - {host: value returned for the host}
+    errors - {host: sys.exc_info() of the exception raised for the host}
+    """
+
+    def __init__(self, hosts):
+        self.hosts = hosts
+        self.results = {}
+        self.errors = {}
+        self.durations = {}
+
+    @property
+    def ok(self):
+        return not self.errors
+
+    @property
+    def failed_hosts(self):
+        return [host for host in self.hosts if host in self.errors]
+
+    def log_errors(self):
+        for host in self.failed_hosts:
+            logger.error('Failed on {0}: {1}'.format(
+                host, ''.join(traceback.format_exception(
+                    *self.errors[host]))))
+
+    def check(self):
+        """Re-raise the exception of the first failed host (in the order
+        of hosts), after all the failures are logged.
+        """
+        if self.ok:
+            return self
+        self.log_errors()
+        exc_type, exc_value, exc_trace = self.errors[self.failed_hosts[0]]
+        raise exc_type, exc_value, exc_trace
+
+
+class SSHFanOut(object):
+    """Runs a callable or a command on many nodes over SSH in parallel.
+
+    Usage:
+        fanout = SSHFanOut(env.d_env.get_ssh_to_remote)
+        result = fanout.execute('uptime', ['10.109.0.3', '10.109.0.4'])
+        result.check()
+    """
+
+    def __init__(self, get_remote, max_workers=SSH_FANOUT_WORKERS):
+        """
+        :param get_remote: callable which returns SSHClient for an IP
+        :param max_workers: maximal number of simultaneous SSH sessions
+        """
+        self.get_remote = get_remote
+        self.max_workers = max_workers
+
+    def map(self, func, hosts, timeout=None, items=None):
+        """Call func(remote, item) for every host in parallel.
+
+        :param func: callable, gets SSHClient to the host and the item
+        :param hosts: list of IP addresses
+        :param timeout: seconds given to each host, counted from the moment
+                        its job is started
+        :param items: objects passed to func instead of host IPs
+        :rtype: FanOutResult
+        """
+        hosts = list(hosts)
+        items = hosts if items is None else list(items)
+        result = FanOutResult(hosts)
+        if not hosts:
+            return result
+        started = {}
+
+        def _job(host, item):
+            started[host] = time.time()
+            try:
+                return True, func(self.get_remote(host), item)
+            except Exception:
+                return False, sys.exc_info()
+            finally:
+                result.durations[host] = time.time() - started[host]
+
+        pool = ThreadPool(min(self.max_workers, len(hosts)))
+        try:
+            jobs = [(host, pool.apply_async(_job, (host, item)))
+                    for host, item in zip(hosts, items)]
+            for host, job in jobs:
+                while not job.ready():
+                    job.wait(0.5)
+                    if (timeout is not None and host in started and
+                            not job.ready() and
+                            time.time() - started[host] > timeout):
+                        break
+                if job.ready():
+                    success, value = job.get()
+                    if success:
+                        result.results[host] = value
+                    else:
+                        result.errors[host] = value
+                else:
+                    try:
+                        raise TimeoutError(
+                            'Execution on {0} exceeded timeout {1} sec'
+                            .format(host, timeout))
+                    except TimeoutError:
+                        result.errors[host] = sys.exc_info()
+        finally:
+            # Do not wait for the jobs which exceeded timeout
+            pool.close()
+        logger.debug('Fan-out on {0} hosts finished, {1} failed: {2}'.format(
+            len(hosts), len(result.errors), result.failed_hosts))
+        return result
+
+    def execute(self, cmd, hosts, timeout=None):
+        """Run the shell command on every host in parallel.
+
+        :rtype: FanOutResult with remote.execute() dicts as results
+        """
+        return self.map(lambda remote, _: remote.execute(cmd), hosts,
+                        timeout=timeout)
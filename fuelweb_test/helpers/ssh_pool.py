@@ -0,0 +1,142 @@
+#    Copyright 2015 Mirantis, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import threading
+
+from fuelweb_test import logger
+from fuelweb_test.settings import SSH_CREDENTIALS
+from fuelweb_test.settings import SSH_POOL_CHECK_TIMEOUT
+
+
+class PooledRemote(object):
+    """SSH client taken from SSHPool.
+
+    The client is shared by the callers of the thread, so it's closed
+    by the pool only: clear() and leaving 'with' block do nothing.
+    """
+
+    def __init__(self, remote):
+        self._remote = remote
+
+    def __getattr__(self, name):
+        return getattr(self._remote, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def clear(self):
+        pass
+
+
+class SSHPool(object):
+    """Cache of authenticated SSH clients.
+
+    Clients are cached per thread, so a client is never used by two
+    threads at once. A client is reused while its transport answers
+    a channel open request within 'check_timeout' seconds; broken clients
+    are reconnected. Clients of the finished threads are closed by the
+    next get(), the rest ones by close_all().
+    """
+
+    def __init__(self, check_timeout=SSH_POOL_CHECK_TIMEOUT):
+        self.check_timeout = check_timeout
+        self._remotes = {}
+        self._lock = threading.Lock()
+
+    def is_alive(self, remote):
+        transport = remote._ssh.get_transport()
+        if transport is None or not transport.is_active():
+            return False
+        try:
+            # Cheap round trip over the existing transport, no key
+            # exchange and authentication are needed
+            transport.open_session(timeout=self.check_timeout).close()
+            return True
+        except Exception as e:
+            logger.debug('SSH connection to {0} is broken: {1}'.format(
+                remote.host, e))
+            return False
+
+    def get(self, key, connect):
+        """Return client of the current thread cached for the key or a new
+        one from connect().
+
+        :rtype: PooledRemote
+        """
+        self.evict_finished()
+        thread = threading.current_thread()
+        key = (thread.ident, key)
+        with self._lock:
+            remote, _ = self._remotes.pop(key, (None, None))
+        if remote is not None and not self.is_alive(remote):
+            self._close(remote)
+            remote = None
+        if remote is None:
+            remote = connect()
+        with self._lock:
+            self._remotes[key] = (remote, thread)
+        return PooledRemote(remote)
+
+    def evict_finished(self):
+        """Close clients of the finished threads. Clients of the running
+        threads can be held by the callers, so they are left alone.
+        """
+        with self._lock:
+            finished = [key for key, (_, thread) in self._remotes.items()
+                        if not thread.is_alive()]
+            remotes = [self._remotes.pop(key)[0] for key in finished]
+        for remote in remotes:
+            self._close(remote)
+
+    def close_all(self):
+        with self._lock:
+            remotes = [remote for remote, _ in self._remotes.values()]
+            self._remotes = {}
+        for remote in remotes:
+            self._close(remote)
+
+    @staticmethod
+    def _close(remote):
+        try:
+            remote.clear()
+        except Exception:
+            logger.debug('Failed to close SSH connection to {0}'.format(
+                remote.host))
+
+
+ssh_pool = SSHPool()
+
+
+class PooledEnvironment(object):
+    """Devops environment proxy which takes SSH clients from ssh_pool."""
+
+    def __init__(self, environment, pool=ssh_pool):
+        self._environment = environment
+        self._pool = pool
+
+    def __getattr__(self, name):
+        return getattr(self._environment, name)
+
+    def get_ssh_to_remote(self, ip):
+        return self._pool.get(
+            (ip, SSH_CREDENTIALS['login']),
+            lambda: self._environment.get_ssh_to_remote(ip))
+
+    def get_admin_remote(self, *args, **kwargs):
+        return self._pool.get(
+            ('admin', args, tuple(sorted(kwargs.items()))),
+            lambda: self._environment.get_admin_remote(*args, **kwargs))
@@ -0,0 +1,129 @@
+#    Copyright 2015 Mirantis, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import time
+
+from devops.error import TimeoutError
+
+from fuelweb_test import logger
+
+
+def task_finished(task):
+    return task['status'] != 'running'
+
+
+class TaskFuture(object):
+    """Result of waiting for a single nailgun task."""
+
+    def __init__(self, task, condition):
+        self.task = task
+        self.condition = condition
+        self._done = False
+        self._callbacks = []
+
+    @property
+    def id(self):
+        return self.task['id']
+
+    def done(self):
+        return self._done
+
+    def result(self):
+        """Return the last known state of the task."""
+        return self.task
+
+    def add_done_callback(self, callback):
+        if self._done:
+            callback(self)
+        else:
+            self._callbacks.append(callback)
+
+    def update(self, task):
+        self.task = task
+        if self.condition(task):
+            self._done = True
+            for callback in self._callbacks:
+                callback(self)
+
+
+class TaskWatcher(object):
+    """Waits for several nailgun tasks at once.
+
+    All the watched tasks are refreshed by one get_tasks() request per
+    tick, a single pending task is refreshed by get_task(). Tasks are
+    checked every 'interval' seconds.
+    """
+
+    def __init__(self, client, interval=5):
+        self.client = client
+        self.interval = interval
+        self.futures = []
+
+    def watch(self, task, condition=task_finished, callback=None):
+        """Add task to the watch list.
+
+        :param task: dict with task description, at least 'id' and 'name'
+        :param condition: predicate for the task dict, task is done once it
+                          returns True
+        :param callback: called with TaskFuture when the task is done
+        :rtype: TaskFuture
+        """
+        future = TaskFuture(task, condition)
+        if callback is not None:
+            future.add_done_callback(callback)
+        self.futures.append(future)
+        return future
+
+    @property
+    def pending(self):
+        return [f for f in self.futures if not f.done()]
+
+    def poll(self):
+        """Refresh all pending tasks with a single API request."""
+        pending = self.pending
+        if not pending:
+            return
+        if len(pending) == 1:
+            pending[0].update(self.client.get_task(pending[0].id))
+            return
+        tasks = {t['id']: t for t in self.client.get_tasks()}
+        for future in pending:
+            task = tasks.get(future.id)
+            if task is None:
+                # Task is not listed anymore, ask for it directly
+                task = self.client.get_task(future.id)
+            future.update(task)
+
+    def wait(self, timeout):
+        """Block until all the watched tasks are done.
+
+        :rtype: list of TaskFuture
+        """
+        start = time.time()
+        while True:
+            self.poll()
+            pending = self.pending
+            if not pending:
+                return self.futures
+            spent = time.time() - start
+            if spent >= timeout:
+                raise TimeoutError(
+                    "Waiting tasks {tasks} timeout {timeout} sec "
+                    "was exceeded: ".format(
+                        tasks=', '.join('"{0}"'.format(f.task['name'])
+                                        for f in pending),
+                        timeout=timeout))
+            logger.debug('Tasks {0} are in progress, next check in {1:.0f} '
+                         'sec'.format([f.id for f in pending], self.interval))
+            time.sleep(min(self.interval, timeout - spent))
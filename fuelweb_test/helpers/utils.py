@@ -26,6 +26,7 @@ from proboscis import asserts
 from fuelweb_test import logger
 from fuelweb_test import logwrap
 from fuelweb_test import settings
+from fuelweb_test.helpers.ssh_fanout import SSHFanOut
 
 
 @logwrap
@@ -97,20 +98,22 @@ def pull_out_logs_via_ssh(admin_remote, name,
 @logwrap
 def store_astute_yaml(env):
     func_name = get_test_method_name()
+    nodes = {}
     for node in env.d_env.nodes().slaves:
         nailgun_node = env.fuel_web.get_nailgun_node_by_devops_node(node)
         if node.driver.node_active(node) and nailgun_node['roles']:
-            try:
-                _ip = env.fuel_web.get_nailgun_node_by_name(node.name)['ip']
-                remote = env.d_env.get_ssh_to_remote(_ip)
-                filename = '{0}/{1}-{2}.yaml'.format(settings.LOGS_DIR,
-                                                     func_name, node.name)
-                logger.info("Storing {0}".format(filename))
-                if not remote.download('/etc/astute.yaml', filename):
-                    logger.error("Downloading 'astute.yaml' from the node "
-                                 "{0} failed.".format(node.name))
-            except Exception:
-                logger.error(traceback.format_exc())
+            nodes[nailgun_node['ip']] = node.name
+
+    def _store(remote, node_name):
+        filename = '{0}/{1}-{2}.yaml'.format(settings.LOGS_DIR,
+                                             func_name, node_name)
+        logger.info("Storing {0}".format(filename))
+        if not remote.download('/etc/astute.yaml', filename):
+            logger.error("Downloading 'astute.yaml' from the node "
+                         "{0} failed.".format(node_name))
+
+    SSHFanOut(env.d_env.get_ssh_to_remote).map(
+        _store, nodes.keys(), items=nodes.values()).log_errors()
 
 
 @logwrap
@@ -134,11 +137,20 @@ def store_packages_json(env):
     func_name = "".join(get_test_method_name())
     packages = {func_name: {}}
     cluster_id = env.fuel_web.get_last_created_cluster()
-    for nailgun_node in env.fuel_web.client.list_cluster_nodes(cluster_id):
-        remote = env.d_env.get_ssh_to_remote(nailgun_node['ip'])
+    nailgun_nodes = env.fuel_web.client.list_cluster_nodes(cluster_id)
+
+    def _get_packages(remote, nailgun_node):
         role = '_'.join(nailgun_node['roles'])
         logger.debug('role is {0}'.format(role))
-        packages = get_node_packages(remote, func_name, role, packages)
+        return get_node_packages(remote, func_name, role, {func_name: {}})
+
+    result = SSHFanOut(env.d_env.get_ssh_to_remote).map(
+        _get_packages, [n['ip'] for n in nailgun_nodes], items=nailgun_nodes)
+    result.check()
+    for node_packages in result.results.values():
+        for role, role_packages in node_packages[func_name].items():
+            packages[func_name][role] = list(
+                set(packages[func_name].get(role, [])) | set(role_packages))
     packages_file = '{0}/packages.json'.format(settings.LOGS_DIR)
     if os.path.isfile(packages_file):
         with open(packages_file, 'r') as outfile:
@@ -0,0 +1,216 @@
+#    Copyright 2015 Mirantis, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import threading
+import time
+
+import paramiko
+from devops.error import TimeoutError
+
+from fuelweb_test import logger
+from fuelweb_test.helpers.ssh_fanout import SSHFanOut
+from fuelweb_test.settings import SSH_POOL_IDLE_TIMEOUT
+
+CIRROS_CREDENTIALS = ('cirros', 'cubswin:)')
+
+
+class VMSession(object):
+    """Authenticated SSH transport to a VM tunnelled through the transport
+    of the controller SSH client. Commands are run in separate channels of
+    the transport, so one session serves any number of commands, also
+    simultaneous ones.
+    """
+
+    CHUNK_SIZE = 32 * 1024
+
+    def __init__(self, controller_ssh, vm_host, creds):
+        self.host = vm_host
+        logger.debug('Opening channel to VM {0} through {1}'.format(
+            vm_host, controller_ssh.host))
+        channel = controller_ssh._ssh.get_transport().open_channel(
+            'direct-tcpip', (vm_host, 22), (controller_ssh.host, 0))
+        self.transport = paramiko.Transport(channel)
+        try:
+            self.transport.start_client()
+            logger.info('Passing authentication to VM {0}: {1}'.format(
+                vm_host, creds))
+            self.transport.auth_password(creds[0], creds[1])
+        except Exception:
+            self.transport.close()
+            raise
+        self.used = time.time()
+        self.active = 0
+        self._lock = threading.Lock()
+
+    def is_alive(self):
+        return self.transport.is_active() and self.transport.is_authenticated()
+
+    def is_idle(self, idle_timeout):
+        """Session is idle if no command runs in it for 'idle_timeout'."""
+        with self._lock:
+            return not self.active and time.time() - self.used > idle_timeout
+
+    def execute(self, cmd, timeout=None):
+        """Run the command and read its whole output.
+
+        :rtype: dict with 'exit_code', 'stdout' and 'stderr' (lists of
+                lines), like SSHClient.execute() returns
+        """
+        with self._lock:
+            self.active += 1
+            started = self.used = time.time()
+        try:
+            return self._execute(cmd, timeout, started)
+        finally:
+            with self._lock:
+                self.active -= 1
+                self.used = time.time()
+
+    def _execute(self, cmd, timeout, started):
+        logger.info('Executing command on VM {0}: {1}'.format(self.host, cmd))
+        channel = self.transport.open_session()
+        try:
+            channel.settimeout(timeout)
+            channel.exec_command(cmd)
+            channel.shutdown_write()
+            stdout, stderr = [], []
+            while True:
+                received = False
+                if channel.recv_ready():
+                    stdout.append(channel.recv(self.CHUNK_SIZE))
+                    received = True
+                if channel.recv_stderr_ready():
+                    stderr.append(channel.recv_stderr(self.CHUNK_SIZE))
+                    received = True
+                if received:
+                    continue
+                if channel.exit_status_ready():
+                    break
+                if timeout is not None and time.time() - started > timeout:
+                    raise TimeoutError(
+                        'Command "{0}" on VM {1} exceeded timeout {2} '
+                        'sec'.format(cmd, self.host, timeout))
+                channel.status_event.wait(0.1)
+            # Output sent right before the exit status could still be
+            # in flight: read stdout till EOF and then the rest of stderr
+            for data in iter(lambda: channel.recv(self.CHUNK_SIZE), ''):
+                stdout.append(data)
+            while channel.recv_stderr_ready():
+                stderr.append(channel.recv_stderr(self.CHUNK_SIZE))
+            return {'exit_code': channel.recv_exit_status(),
+                    'stdout': ''.join(stdout).splitlines(True),
+                    'stderr': ''.join(stderr).splitlines(True)}
+        finally:
+            channel.close()
+
+    def close(self):
+        try:
+            self.transport.close()
+        except Exception:
+            logger.debug('Failed to close SSH session to VM {0}'.format(
+                self.host))
+
+
+class VMSessionManager(object):
+    """Cache of VMSession objects, one per VM and user.
+
+    Broken sessions are reopened, sessions with no commands running for
+    'idle_timeout' seconds are closed.
+
+    Usage:
+        result = vm_sessions.execute_many(controller_ssh, vms_ips, 'uptime')
+        result.check()
+    """
+
+    def __init__(self, idle_timeout=SSH_POOL_IDLE_TIMEOUT):
+        self.idle_timeout = idle_timeout
+        self._sessions = {}
+        self._connecting = {}
+        self._lock = threading.Lock()
+
+    def _key_lock(self, key):
+        with self._lock:
+            return self._connecting.setdefault(key, threading.Lock())
+
+    def get(self, controller_ssh, vm_host, creds=()):
+        """Return open session to the VM, opening it if needed."""
+        creds = tuple(creds) or CIRROS_CREDENTIALS
+        key = (controller_ssh.host, vm_host, creds[0])
+        self.evict_idle()
+        # Only one handshake per VM at a time, other threads wait for it
+        with self._key_lock(key):
+            with self._lock:
+                session = self._sessions.get(key)
+            if session is not None and not session.is_alive():
+                logger.debug('SSH session to VM {0} is broken'.format(
+                    vm_host))
+                self.evict(controller_ssh, vm_host, creds)
+                session = None
+            if session is None:
+                session = VMSession(controller_ssh, vm_host, creds)
+                with self._lock:
+                    self._sessions[key] = session
+            return session
+
+    def evict(self, controller_ssh, vm_host, creds=()):
+        creds = tuple(creds) or CIRROS_CREDENTIALS
+        with self._lock:
+            session = self._sessions.pop(
+                (controller_ssh.host, vm_host, creds[0]), None)
+        if session is not None:
+            session.close()
+
+    def evict_idle(self):
+        with self._lock:
+            idle = [key for key, session in self._sessions.items()
+                    if session.is_idle(self.idle_timeout)]
+            sessions = [self._sessions.pop(key) for key in idle]
+        for session in sessions:
+            session.close()
+
+    def close_all(self):
+        with self._lock:
+            sessions = self._sessions.values()
+            self._sessions = {}
+        for session in sessions:
+            session.close()
+
+    def execute(self, controller_ssh, vm_host, cmd, creds=(), timeout=None):
+        """Run the command on the VM, session is reopened once if the
+        cached one turns out to be broken.
+        """
+        session = self.get(controller_ssh, vm_host, creds)
+        try:
+            return session.execute(cmd, timeout=timeout)
+        except (paramiko.SSHException, EOFError) as e:
+            logger.debug('Reopening SSH session to VM {0}: {1}'.format(
+                vm_host, e))
+            self.evict(controller_ssh, vm_host, creds)
+            return self.get(controller_ssh, vm_host, creds).execute(
+                cmd, timeout=timeout)
+
+    def execute_many(self, controller_ssh, vm_hosts, cmd, creds=(),
+                     timeout=None):
+        """Run the command on all the VMs in parallel.
+
+        :rtype: FanOutResult with execute() dicts as results
+        """
+        # Sessions are taken by execute(), so broken ones are reopened
+        return SSHFanOut(lambda vm_host: vm_host).map(
+            lambda vm_host, _: self.execute(controller_ssh, vm_host, cmd,
+                                            creds, timeout),
+            vm_hosts, timeout=timeout)
+
+
+vm_sessions = VMSessionManager()
@@ -12,10 +12,17 @@ parser.add_argument("-k", "--keep_tests",
                     action='store_true',
                     help="Keep previous test files",
                     default=False)
+parser.add_argument("-f", "--force",
+                    action='store_true',
+                    help="Regenerate tests of unchanged modules too",
+                    default=False)
+parser.add_argument("-j", "--workers", type=int,
+                    help="Number of threads generating tests",
+                    default=None)
 
 args = parser.parse_args()
-generator = PuppetTestGenerator(args.tests, args.modules)
+generator = PuppetTestGenerator(args.tests, args.modules, args.workers)
 if not args.keep_tests:
-    generator.remove_all_tests()
+    generator.remove_stale_tests()
 
-generator.make_all_scripts()
+generator.make_all_scripts(force=args.force)
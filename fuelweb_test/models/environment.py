@@ -14,6 +14,8 @@
 
 import time
 import yaml
+from multiprocessing.pool import ThreadPool
+
 from devops.error import TimeoutError
 
 from devops.helpers.helpers import _tcp_ping
@@ -37,7 +39,10 @@ from fuelweb_test.helpers.fuel_actions import NailgunActions
 from fuelweb_test.helpers.fuel_actions import PostgresActions
 from fuelweb_test.helpers.ntp import Ntp
 from fuelweb_test.helpers.ntp import GroupNtpSync
+from fuelweb_test.helpers.ssh_pool import PooledEnvironment
+from fuelweb_test.helpers.ssh_pool import ssh_pool
 from fuelweb_test.helpers.utils import timestat
+from fuelweb_test.helpers.vm_sessions import vm_sessions
 from fuelweb_test.helpers import multiple_networks_hacks
 from fuelweb_test.models.fuel_web_client import FuelWebClient
 from fuelweb_test.models.collector_client import CollectorClient
@@ -86,6 +91,31 @@ class EnvironmentModel(object):
         self.fuel_web.add_syslog_server(
             cluster_id, self.d_env.router(), port)
 
+    def start_nodes(self, devops_nodes,
+                    concurrency=settings.BOOTSTRAP_CONCURRENCY):
+        """Power on vms in batches of 'concurrency' nodes.
+        :rtype : Dict with start time of every node by its name
+        """
+        devops_nodes = list(devops_nodes)
+        started = {}
+
+        def _start(node):
+            logger.info("Bootstrapping node: {}".format(node.name))
+            node.start()
+            started[node.name] = time.time()
+
+        concurrency = max(1, concurrency)
+        pool = ThreadPool(min(concurrency, len(devops_nodes)) or 1)
+        try:
+            for i in range(0, len(devops_nodes), concurrency):
+                pool.map(_start, devops_nodes[i:i + concurrency])
+                # TODO(aglarendil): LP#1317213 temporary sleep
+                # remove after better fix is applied
+                time.sleep(2)
+        finally:
+            pool.close()
+        return started
+
     def bootstrap_nodes(self, devops_nodes, timeout=600, skip_timesync=False):
         """Lists registered nailgun nodes
         Start vms and wait until they are registered on nailgun.
@@ -93,15 +123,31 @@ class EnvironmentModel(object):
         """
         # self.dhcrelay_check()
 
-        for node in devops_nodes:
-            logger.info("Bootstrapping node: {}".format(node.name))
-            node.start()
-            # TODO(aglarendil): LP#1317213 temporary sleep
-            # remove after better fix is applied
-            time.sleep(2)
+        started = self.start_nodes(devops_nodes)
+        registered = {}
+
+        def _all_registered():
+            # One list_nodes() request per check for all the nodes
+            self.fuel_web.nodes_index.refresh()
+            for node in devops_nodes:
+                if node.name in registered:
+                    continue
+                if self.fuel_web.get_nailgun_node_by_devops_node(node):
+                    registered[node.name] = time.time() - started[node.name]
+            return len(registered) == len(devops_nodes)
 
         with timestat("wait_for_nodes_to_start_and_register_in_nailgun"):
-            wait(lambda: all(self.nailgun_nodes(devops_nodes)), 15, timeout)
+            try:
+                wait(_all_registered, 15, timeout)
+            finally:
+                for node in devops_nodes:
+                    if node.name in registered:
+                        logger.info("Node {0} registered in nailgun in "
+                                    "{1:.0f} seconds".format(
+                                        node.name, registered[node.name]))
+                    else:
+                        logger.error("Node {0} is not registered in "
+                                     "nailgun".format(node.name))
 
         if not skip_timesync:
             self.sync_time([node for node in self.nailgun_nodes(devops_nodes)])
@@ -186,12 +232,13 @@ class EnvironmentModel(object):
     def d_env(self):
         if self._virtual_environment is None:
             try:
-                return Environment.get(name=settings.ENV_NAME)
+                return PooledEnvironment(
+                    Environment.get(name=settings.ENV_NAME))
             except Exception:
                 self._virtual_environment = Environment.describe_environment(
                     boot_from=settings.ADMIN_BOOT_DEVICE)
                 self._virtual_environment.define()
-        return self._virtual_environment
+        return PooledEnvironment(self._virtual_environment)
 
     def resume_environment(self):
         self.d_env.resume()
@@ -268,6 +315,10 @@ class EnvironmentModel(object):
 
         logger.info("Reverting the snapshot '{0}' ....".format(name))
         self.d_env.revert(name)
+        vm_sessions.close_all()
+        ssh_pool.close_all()
+        self.fuel_web.nodes_index.invalidate()
+        self.fuel_web.devops_nodes_index.invalidate()
 
         logger.info("Resuming the snapshot '{0}' ....".format(name))
         self.resume_environment()
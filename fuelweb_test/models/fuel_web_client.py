@@ -12,10 +12,12 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import copy
 import re
 import time
 import traceback
 import yaml
+from multiprocessing.pool import ThreadPool
 
 from devops.error import DevopsCalledProcessError
 from devops.error import TimeoutError
@@ -40,7 +42,11 @@ from fuelweb_test.helpers.decorators import retry
 from fuelweb_test.helpers.decorators import update_ostf
 from fuelweb_test.helpers.decorators import update_fuel
 from fuelweb_test.helpers.decorators import upload_manifests
+from fuelweb_test.helpers.nodes_index import DevopsNodesIndex
+from fuelweb_test.helpers.nodes_index import NodesIndex
 from fuelweb_test.helpers.security import SecurityChecks
+from fuelweb_test.helpers.ssh_fanout import SSHFanOut
+from fuelweb_test.helpers.task_watcher import TaskWatcher
 from fuelweb_test.models.nailgun_client import NailgunClient
 from fuelweb_test import ostf_test_mapping as map_ostf
 from fuelweb_test.settings import ATTEMPTS
@@ -49,9 +55,11 @@ from fuelweb_test.settings import DEPLOYMENT_MODE_SIMPLE
 from fuelweb_test.settings import DEPLOYMENT_MODE_HA
 from fuelweb_test.settings import KVM_USE
 from fuelweb_test.settings import MULTIPLE_NETWORKS
+from fuelweb_test.settings import NAILGUN_API_WORKERS
 from fuelweb_test.settings import NEUTRON
 from fuelweb_test.settings import NEUTRON_SEGMENT
 from fuelweb_test.settings import NODEGROUPS
+from fuelweb_test.settings import NODES_INDEX_TTL
 from fuelweb_test.settings import OPENSTACK_RELEASE
 from fuelweb_test.settings import OPENSTACK_RELEASE_UBUNTU
 from fuelweb_test.settings import OSTF_TEST_NAME
@@ -69,6 +77,12 @@ class FuelWebClient(object):
         self.client = NailgunClient(admin_node_ip)
         self._environment = environment
         self.security = SecurityChecks(self.client, self._environment)
+        self.nodes_index = NodesIndex(self._list_nodes, ttl=NODES_INDEX_TTL)
+        self.devops_nodes_index = DevopsNodesIndex(
+            lambda: self.environment.d_env.nodes())
+        # Any write to Nailgun can change nodes: deletion, cluster reset,
+        # interfaces and disks updates, deployment
+        self.client.client.write_hooks.append(self.nodes_index.invalidate)
         super(FuelWebClient, self).__init__()
 
     @property
@@ -97,8 +111,17 @@ class FuelWebClient(object):
         return self.client.get_ostf_test_run(cluster_id)
 
     @logwrap
-    def _tasks_wait(self, tasks, timeout):
-        return [self.task_wait(task, timeout) for task in tasks]
+    def _tasks_wait(self, tasks, timeout, interval=5):
+        logger.info('Wait for tasks %s %s seconds', tasks, timeout)
+        start = time.time()
+        watcher = TaskWatcher(self.client, interval=interval)
+        for task in tasks:
+            watcher.watch(task)
+        futures = watcher.wait(timeout)
+        took = time.time() - start
+        tasks = [future.result() for future in futures]
+        logger.info('Tasks %s finished. Took %d seconds', tasks, took)
+        return tasks
 
     @logwrap
     def add_syslog_server(self, cluster_id, host, port):
@@ -822,13 +845,7 @@ class FuelWebClient(object):
         return self.get_nailgun_node_by_devops_node(
             self.environment.d_env.get_node(name=node_name))
 
-    @logwrap
-    def get_nailgun_node_by_devops_node(self, devops_node):
-        """Return slave node description.
-        Returns dict with nailgun slave node description if node is
-        registered. Otherwise return None.
-        """
-        d_macs = {i.mac_address.upper() for i in devops_node.interfaces}
+    def _list_nodes(self):
         logger.debug('Verify that nailgun api is running')
         attempts = ATTEMPTS
         nodes = []
@@ -844,15 +861,20 @@ class FuelWebClient(object):
                 logger.debug(traceback.format_exc())
                 attempts -= 1
                 time.sleep(TIMEOUT)
+        return nodes
+
+    @logwrap
+    def get_nailgun_node_by_devops_node(self, devops_node):
+        """Return slave node description.
+        Returns dict with nailgun slave node description if node is
+        registered. Otherwise return None.
+        """
+        d_macs = {i.mac_address.upper() for i in devops_node.interfaces}
         logger.debug('Look for nailgun node by macs %s', d_macs)
-        for nailgun_node in nodes:
-            macs = {i['mac'] for i in nailgun_node['meta']['interfaces']}
-            logger.debug('Look for macs returned by nailgun {0}'.format(macs))
-            # Because our HAproxy may create some interfaces
-            if d_macs.issubset(macs):
-                nailgun_node['devops_name'] = devops_node.name
-                return nailgun_node
-        return None
+        nailgun_node = self.nodes_index.get_by_macs(d_macs)
+        if nailgun_node is not None:
+            nailgun_node['devops_name'] = devops_node.name
+        return nailgun_node
 
     @logwrap
     def get_nailgun_node_by_fqdn(self, fqdn):
@@ -861,9 +883,7 @@ class FuelWebClient(object):
         :type fqdn: String
             :rtype: Dict
         """
-        for nailgun_node in self.client.list_nodes():
-            if nailgun_node['meta']['system']['fqdn'] == fqdn:
-                return nailgun_node
+        return self.nodes_index.get_by_fqdn(fqdn)
 
     @logwrap
     def find_devops_node_by_nailgun_fqdn(self, fqdn, devops_nodes):
@@ -888,10 +908,7 @@ class FuelWebClient(object):
         :type mac_address: String
             :rtype: Node or None
         """
-        for node in self.environment.d_env.nodes():
-            for iface in node.interfaces:
-                if iface.mac_address.lower() == mac_address.lower():
-                    return node
+        return self.devops_nodes_index.get_by_mac(mac_address)
 
     @logwrap
     def get_devops_nodes_by_nailgun_nodes(self, nailgun_nodes):
@@ -951,9 +968,9 @@ class FuelWebClient(object):
 
     @logwrap
     def is_node_discovered(self, nailgun_node):
-        return any(
-            map(lambda node: node['mac'] == nailgun_node['mac']
-                and node['status'] == 'discover', self.client.list_nodes()))
+        node = self.nodes_index.get_by_mac(nailgun_node['mac'])
+        return (node is not None and node['mac'] == nailgun_node['mac'] and
+                node['status'] == 'discover')
 
     @logwrap
     def run_network_verify(self, cluster_id):
@@ -1007,19 +1024,16 @@ class FuelWebClient(object):
     def task_wait(self, task, timeout, interval=5):
         logger.info('Wait for task %s %s seconds', task, timeout)
         start = time.time()
+        watcher = TaskWatcher(self.client, interval=interval)
+        future = watcher.watch(task)
         try:
-            wait(
-                lambda: self.client.get_task(
-                    task['id'])['status'] != 'running',
-                interval=interval,
-                timeout=timeout
-            )
+            watcher.wait(timeout)
         except TimeoutError:
             raise TimeoutError(
                 "Waiting task \"{task}\" timeout {timeout} sec "
                 "was exceeded: ".format(task=task["name"], timeout=timeout))
         took = time.time() - start
-        task = self.client.get_task(task['id'])
+        task = future.result()
         logger.info('Task %s finished. Took %d seconds', task, took)
         return task
 
@@ -1029,18 +1043,16 @@ class FuelWebClient(object):
             logger.info(
                 'start to wait with timeout {0} '
                 'interval {1}'.format(timeout, interval))
-            wait(
-                lambda: self.client.get_task(
-                    task['id'])['progress'] >= progress,
-                interval=interval,
-                timeout=timeout
-            )
+            watcher = TaskWatcher(self.client, interval=interval)
+            future = watcher.watch(
+                task, condition=lambda t: t['progress'] >= progress)
+            watcher.wait(timeout)
         except TimeoutError:
             raise TimeoutError(
                 "Waiting task \"{task}\" timeout {timeout} sec "
                 "was exceeded: ".format(task=task["name"], timeout=timeout))
 
-        return self.client.get_task(task['id'])
+        return future.result()
 
     @logwrap
     def update_nodes(self, cluster_id, nodes_dict,
@@ -1105,15 +1117,30 @@ class FuelWebClient(object):
 
         return nailgun_nodes
 
-    @logwrap
-    def update_node_networks(self, node_id, interfaces_dict, raw_data=None):
+    def map_nodes(self, func, nodes_ids):
+        """Call func(node_id) for every node with up to NAILGUN_API_WORKERS
+        simultaneous calls, results are returned in the order of nodes_ids.
+        """
+        nodes_ids = list(nodes_ids)
+        if len(nodes_ids) < 2:
+            return [func(node_id) for node_id in nodes_ids]
+        pool = ThreadPool(min(NAILGUN_API_WORKERS, len(nodes_ids)))
+        try:
+            return pool.map(func, nodes_ids)
+        finally:
+            pool.close()
+            pool.join()
+
+    @staticmethod
+    def assign_networks(interfaces, interfaces_dict, raw_data=None):
+        """Assign networks to the node interfaces according to
+        interfaces_dict ({interface name: [network names]}).
+        """
         # fuelweb_admin is always on eth0
         interfaces_dict['eth0'] = interfaces_dict.get('eth0', [])
         if 'fuelweb_admin' not in interfaces_dict['eth0']:
             interfaces_dict['eth0'].append('fuelweb_admin')
 
-        interfaces = self.client.get_node_interfaces(node_id)
-
         if raw_data:
             interfaces.append(raw_data)
 
@@ -1127,13 +1154,33 @@ class FuelWebClient(object):
             interface['assigned_networks'] = \
                 [all_networks[i] for i in interfaces_dict.get(name, []) if
                  i in all_networks.keys()]
+        return interfaces
 
-        self.client.put_node_interfaces(
-            [{'id': node_id, 'interfaces': interfaces}])
+    @logwrap
+    def update_node_networks(self, node_id, interfaces_dict, raw_data=None):
+        self.update_nodes_networks([node_id], interfaces_dict,
+                                   raw_data=raw_data)
 
     @logwrap
-    def update_node_disk(self, node_id, disks_dict):
-        disks = self.client.get_node_disks(node_id)
+    def update_nodes_networks(self, nodes_ids, interfaces_dict,
+                              raw_data=None):
+        """Assign networks to the interfaces of many nodes: interfaces are
+        requested in parallel and saved with a single request.
+        """
+        nodes_ids = list(nodes_ids)
+        if not nodes_ids:
+            return
+        nodes_interfaces = self.map_nodes(self.client.get_node_interfaces,
+                                          nodes_ids)
+        self.client.put_node_interfaces(
+            [{'id': node_id,
+              'interfaces': self.assign_networks(
+                  interfaces, interfaces_dict,
+                  raw_data=copy.deepcopy(raw_data))}
+             for node_id, interfaces in zip(nodes_ids, nodes_interfaces)])
+
+    @staticmethod
+    def set_disks_volumes(disks, disks_dict):
         for disk in disks:
             dname = disk['name']
             if dname not in disks_dict:
@@ -1142,8 +1189,23 @@ class FuelWebClient(object):
                 vname = volume['name']
                 if vname in disks_dict[dname]:
                     volume['size'] = disks_dict[dname][vname]
+        return disks
+
+    @logwrap
+    def update_node_disk(self, node_id, disks_dict):
+        self.update_nodes_disks([node_id], disks_dict)
+
+    @logwrap
+    def update_nodes_disks(self, nodes_ids, disks_dict):
+        """Set volumes sizes of many nodes. Nailgun has no bulk disks API,
+        so the nodes are processed in parallel.
+        """
+        def _update(node_id):
+            disks = self.client.get_node_disks(node_id)
+            self.client.put_node_disks(
+                node_id, self.set_disks_volumes(disks, disks_dict))
 
-        self.client.put_node_disks(node_id, disks)
+        self.map_nodes(_update, nodes_ids)
 
     @logwrap
     def get_node_disk_size(self, node_id, disk_name):
@@ -1251,8 +1313,8 @@ class FuelWebClient(object):
 
         if not nailgun_nodes:
             nailgun_nodes = self.client.list_cluster_nodes(cluster_id)
-        for node in nailgun_nodes:
-            self.update_node_networks(node['id'], assigned_networks)
+        self.update_nodes_networks([node['id'] for node in nailgun_nodes],
+                                   assigned_networks)
 
     @logwrap
     def update_network_configuration(self, cluster_id, nodegroup=None):
@@ -1580,9 +1642,7 @@ class FuelWebClient(object):
             else:
                 return ''.join(result['stderr']).strip()
 
-        for node_name in node_names:
-            _ip = self.get_nailgun_node_by_name(node_name)['ip']
-            remote = self.environment.d_env.get_ssh_to_remote(_ip)
+        def _wait_galera(remote, node_name):
             try:
                 wait(lambda: _get_galera_status(remote) == 'ON',
                      timeout=timeout)
@@ -1594,14 +1654,18 @@ class FuelWebClient(object):
                 raise TimeoutError(
                     "MySQL Galera isn't ready on {0}: {1}".format(
                         node_name, _get_galera_status(remote)))
+
+        ips = [self.get_nailgun_node_by_name(node_name)['ip']
+               for node_name in node_names]
+        SSHFanOut(self.environment.d_env.get_ssh_to_remote).map(
+            _wait_galera, ips, items=node_names).check()
         return True
 
     @logwrap
     def wait_cinder_is_up(self, node_names):
         logger.info("Waiting for all Cinder services up.")
-        for node_name in node_names:
-            _ip = self.get_nailgun_node_by_name(node_name)['ip']
-            remote = self.environment.d_env.get_ssh_to_remote(_ip)
+
+        def _wait_cinder(remote, node_name):
             try:
                 wait(lambda: checkers.check_cinder_status(remote),
                      timeout=300)
@@ -1610,6 +1674,11 @@ class FuelWebClient(object):
                 logger.error("Cinder services not ready.")
                 raise TimeoutError(
                     "Cinder services not ready. ")
+
+        ips = [self.get_nailgun_node_by_name(node_name)['ip']
+               for node_name in node_names]
+        SSHFanOut(self.environment.d_env.get_ssh_to_remote).map(
+            _wait_cinder, ips, items=node_names).check()
         return True
 
     def run_ostf_repeatably(self, cluster_id, test_name=None,
@@ -1714,8 +1783,8 @@ class FuelWebClient(object):
             n for n in ceph_nodes if n['id'] not in offline_nodes]
 
         logger.info('Waiting until Ceph service become up...')
-        for node in online_ceph_nodes:
-            remote = self.environment.d_env.get_ssh_to_remote(node['ip'])
+
+        def _wait_ceph_service(remote, node):
             try:
                 wait(lambda: ceph.check_service_ready(remote) is True,
                      interval=20, timeout=600)
@@ -1725,6 +1794,10 @@ class FuelWebClient(object):
                 logger.error(error_msg)
                 raise TimeoutError(error_msg)
 
+        SSHFanOut(self.environment.d_env.get_ssh_to_remote).map(
+            _wait_ceph_service, [n['ip'] for n in online_ceph_nodes],
+            items=online_ceph_nodes).check()
+
         logger.info('Ceph service is ready. Checking Ceph Health...')
         self.check_ceph_time_skew(cluster_id, offline_nodes)
 
@@ -12,8 +12,11 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import json
 import logging
 import os
+from multiprocessing import cpu_count
+from multiprocessing.pool import ThreadPool
 
 import jinja2
 
@@ -29,10 +32,17 @@ class PuppetTestGenerator:
         - local_modules_path* Path to puppet modules which will be scanned for
         test files
         - tests_directory_path* Output directory where files will be written
-        - debug level
+        - workers Number of threads scanning modules and writing scripts
+
+    Discovered modules are saved to the manifest file in the tests
+    directory together with the modification times of their tests
+    directories, so only the modules changed since the last run are
+    scanned and have their scripts generated again.
     """
 
-    def __init__(self, tests_directory_path, modules_path):
+    manifest_file = '.puppet_tests_manifest.json'
+
+    def __init__(self, tests_directory_path, modules_path, workers=None):
         """Constructor
         Constructor
         """
@@ -51,12 +61,14 @@ class PuppetTestGenerator:
         self.modules = []
         self.module_templates = {}
         self.make_tests_dir = os.path.dirname(os.path.abspath(__file__))
+        self.workers = workers or cpu_count()
 
-        if not os.path.isdir('puppet_tests/templates'):
-            logging.error("No such directory: puppet_tests/templates")
-        self.template_directory = 'puppet_tests/templates'
+        self.template_directory = os.path.join(self.make_tests_dir,
+                                               'templates')
+        if not os.path.isdir(self.template_directory):
+            logging.error('No such directory: ' + self.template_directory)
         self.template_loader = jinja2.FileSystemLoader(
-            searchpath='puppet_tests/templates')
+            searchpath=self.template_directory)
         self.template_environment = jinja2.Environment(
             loader=self.template_loader,
         )
@@ -64,22 +76,85 @@ class PuppetTestGenerator:
         self.internal_modules_path = '/etc/puppet/modules'
         self.internal_manifests_path = '/etc/puppet/manifests'
 
+        self.manifest = self.load_manifest()
         self.find_modules()
 
+    def map(self, func, items):
+        """Call func for every item in parallel, keeping the order."""
+        items = list(items)
+        if len(items) < 2:
+            return [func(item) for item in items]
+        pool = ThreadPool(min(self.workers, len(items)))
+        try:
+            return pool.map(func, items)
+        finally:
+            pool.close()
+            pool.join()
+
+    @property
+    def manifest_path(self):
+        return os.path.join(self.tests_directory, self.manifest_file)
+
+    @property
+    def context(self):
+        """Everything, except modules, the test scripts depend on."""
+        templates = sorted(set(self.module_templates.values() +
+                               [self.default_template]))
+        return {
+            'local_modules_path': self.modules_path,
+            'internal_modules_path': self.internal_modules_path,
+            'internal_manifests_path': self.internal_manifests_path,
+            'tests_directory_path': self.tests_directory,
+            'templates': dict(
+                (template, os.path.getmtime(
+                    os.path.join(self.template_directory, template)))
+                for template in templates),
+        }
+
+    def load_manifest(self):
+        """Load manifest of the previous run
+        Return {'context': ..., 'modules': {name: PuppetModule.to_dict()}}
+        """
+        try:
+            with open(self.manifest_path) as manifest_file:
+                manifest = json.load(manifest_file)
+        except (IOError, ValueError):
+            return {'context': None, 'modules': {}}
+        if manifest.get('modules_path') != self.modules_path:
+            return {'context': None, 'modules': {}}
+        return manifest
+
+    def save_manifest(self):
+        """Save manifest of the generated scripts"""
+        manifest = {
+            'modules_path': self.modules_path,
+            'context': self.context,
+            'modules': dict((module.name, module.to_dict())
+                            for module in self.modules),
+        }
+        tmp_path = '%s.%d' % (self.manifest_path, os.getpid())
+        with open(tmp_path, 'w') as manifest_file:
+            json.dump(manifest, manifest_file)
+        os.rename(tmp_path, self.manifest_path)
+
+    def find_module(self, module_dir):
+        full_module_path = os.path.join(self.modules_path, module_dir)
+        full_tests_path = os.path.join(full_module_path, 'tests')
+        if not os.path.isdir(full_tests_path):
+            return None
+        logging.debug('Found Puppet module: "%s"' % full_module_path)
+        return PuppetModule(full_module_path,
+                            self.manifest['modules'].get(module_dir))
+
     def find_modules(self):
         """Find modules in library path
         Find all Puppet modules in module_library_path
         and create array of PuppetModule objects
         """
         logging.debug('Starting find modules in "%s"' % self.modules_path)
-        for module_dir in os.listdir(self.modules_path):
-            full_module_path = os.path.join(self.modules_path, module_dir)
-            full_tests_path = os.path.join(full_module_path, 'tests')
-            if not os.path.isdir(full_tests_path):
-                continue
-            logging.debug('Found Puppet module: "%s"' % full_module_path)
-            puppet_module = PuppetModule(full_module_path)
-            self.modules.append(puppet_module)
+        modules = self.map(self.find_module,
+                           sorted(os.listdir(self.modules_path)))
+        self.modules = [module for module in modules if module is not None]
 
     def compile_script(self, module):
         """Compile script template
@@ -97,25 +172,54 @@ class PuppetTestGenerator:
         compiled_template = template.render(module=module, **general)
         return compiled_template
 
+    def script_path(self, module):
+        file_name = self.test_file_prefix + module.name.title() + '.py'
+        return os.path.join(self.tests_directory, file_name)
+
     def save_script(self, module):
         """Save compiled script
         Saves compiled script to a file
         """
-        file_name = self.test_file_prefix + module.name.title() + '.py'
-        full_file_path = os.path.join(self.tests_directory, file_name)
+        logging.debug('Processing module: "%s"' % module.name)
         script_content = self.compile_script(module)
-        script_file = open(full_file_path, 'w+')
+        script_file = open(self.script_path(module), 'w+')
         script_file.write(script_content)
         script_file.close()
 
-    def make_all_scripts(self):
+    def make_all_scripts(self, force=False):
         """Compile and save all scripts
         Compile and save to tests_directory_path all the test scripts.
+        Only scripts of the modules changed since the last run and
+        the missing scripts are written unless force is set.
         Main function.
         """
-        for module in self.modules:
-            logging.debug('Processing module: "%s"' % module.name)
-            self.save_script(module)
+        if force or self.manifest['context'] != self.context:
+            modules = self.modules
+        else:
+            modules = [module for module in self.modules
+                       if module.changed or
+                       not os.path.isfile(self.script_path(module))]
+        logging.debug('Generating %d of %d test scripts' %
+                      (len(modules), len(self.modules)))
+        self.map(self.save_script, modules)
+        self.save_manifest()
+
+    def remove_stale_tests(self):
+        """Remove stale tests
+        Remove test files of the modules which are not found anymore
+        """
+        scripts = set(os.path.basename(self.script_path(module))
+                      for module in self.modules)
+        for test_file in os.listdir(self.tests_directory):
+            if not test_file.endswith('.py'):
+                continue
+            if not test_file.startswith(self.test_file_prefix):
+                continue
+            if test_file in scripts:
+                continue
+            full_file_path = os.path.join(self.tests_directory, test_file)
+            logging.debug('Removing stale test file: "%s"' % full_file_path)
+            os.remove(full_file_path)
 
     def remove_all_tests(self):
         """Remove all tests
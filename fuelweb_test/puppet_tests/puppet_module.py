@@ -27,26 +27,67 @@ sys.path.insert(0, path)
 class PuppetModule:
     """This class represents Puppet module."""
 
-    def __init__(self, local_module_path):
-        """You should give this constructor the full path to the module."""
+    def __init__(self, local_module_path, manifest=None):
+        """You should give this constructor the full path to the module.
+
+        :param manifest: to_dict() of the module discovered before, it is
+                         used instead of scanning the module if the module
+                         has not changed since then
+        """
         self.local_module_path = local_module_path
         self.module_name = os.path.basename(self.local_module_path)
 
         self.__tests = []
         self.__dependencies = []
+        self.mtimes = {}
 
         self.comment_regexp = re.compile(r'^\s*#')
         self.dependency_regexp = \
             re.compile(r'^\s*dependency\s*[\'\"]*([^\'\"]+)[\'\"]*')
 
-        self.find_tests()
-        self.find_dependencies()
+        self.changed = not self.load(manifest)
+        if self.changed:
+            logging.debug('Scanning Puppet module: "%s"' %
+                          self.local_module_path)
+            self.find_tests()
+            self.find_dependencies()
+
+    def get_mtime(self, path):
+        try:
+            return os.path.getmtime(os.path.join(self.local_module_path, path))
+        except OSError:
+            return None
+
+    def load(self, manifest):
+        """Take tests and dependencies from the manifest if modification
+        times of Modulefile and of all the tests directories are the same.
+        Directories mtimes change when tests are added, removed or renamed.
+        """
+        if not manifest:
+            return False
+        mtimes = manifest['mtimes']
+        if any(self.get_mtime(path) != mtime
+               for path, mtime in mtimes.items()):
+            return False
+        self.mtimes = mtimes
+        self.__dependencies = manifest['dependencies']
+        self.__tests = [PuppetTest(test['file_path'],
+                                   module_path=self.local_module_path,
+                                   verify_file=test['verify_file'])
+                        for test in manifest['tests']]
+        return True
+
+    def to_dict(self):
+        return {'mtimes': self.mtimes,
+                'dependencies': self.__dependencies,
+                'tests': [test.to_dict() for test in self.__tests]}
 
     def find_dependencies(self):
         """Get dependencies of this module from Modulefile if present."""
         module_file = 'Modulefile'
         dependencies = []
         module_file_path = os.path.join(self.local_module_path, module_file)
+        self.mtimes[module_file] = self.get_mtime(module_file)
         if not os.path.isfile(module_file_path):
             self.__dependencies = dependencies
             return False
@@ -66,29 +107,27 @@ class PuppetModule:
     def find_tests(self):
         """Find all tests.
         Find all tests in this module and fill tests array
-        with PuppetTest objects.
+        with PuppetTest objects. Tests directory is walked once,
+        verify files are found in the listed files.
         """
-        current_path = os.path.abspath(os.curdir)
-        try:
-            os.chdir(self.local_module_path)
-        except OSError as error:
-            logging.error("Cannot change directory to %s: %s" %
-                          (self.local_module_path, error.message))
-        else:
-            for root, dirs, files in os.walk('tests'):
-                for test_file in files:
-                    if not test_file[-3:] == '.pp':
-                        continue
-                    test_file_path = os.path.join(root, test_file)
-                    puppet_test = PuppetTest(test_file_path)
-                    self.__tests.append(puppet_test)
-        finally:
-            # try to restore original folder on exit
-            try:
-                os.chdir(current_path)
-            except OSError as error:
-                logging.error("Cannot change directory to %s: %s" %
-                              (self.local_module_path, error.message), 1)
+        def log_error(error):
+            logging.error("Cannot list directory %s: %s" %
+                          (error.filename, error.strerror))
+
+        self.__tests = []
+        for root, dirs, files in os.walk(
+                os.path.join(self.local_module_path, 'tests'),
+                onerror=log_error):
+            dirs.sort()
+            tests_path = os.path.relpath(root, self.local_module_path)
+            self.mtimes[tests_path] = self.get_mtime(tests_path)
+            for test_file in sorted(files):
+                if not test_file[-3:] == '.pp':
+                    continue
+                test_file_path = os.path.join(tests_path, test_file)
+                puppet_test = PuppetTest(test_file_path, files=files,
+                                         module_path=self.local_module_path)
+                self.__tests.append(puppet_test)
 
     @property
     def tests(self):
@@ -12,7 +12,6 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
-from glob import glob
 import os
 import stat
 
@@ -20,21 +19,35 @@ import stat
 class PuppetTest:
     """This class represents single test of the Puppet module."""
 
-    def __init__(self, test_file_path):
-        """You should give this constructor path to test file."""
+    def __init__(self, test_file_path, files=None, module_path='',
+                 verify_file=False):
+        """You should give this constructor path to test file.
+
+        :param test_file_path: path to the test relative to the module
+        :param files: names of the files in the test directory, the
+                      directory is listed if they are not given
+        :param module_path: path to the module
+        :param verify_file: known verify file name or None, it is searched
+                            if not given
+        """
         self.test_file_path = test_file_path
+        self.module_path = module_path
         self.tests_path = os.path.dirname(self.test_file_path)
         self.test_file_name = os.path.basename(self.test_file_path)
         self.test_name = self.test_file_name.replace('.pp', '')
-        self.find_verify_file()
+        if verify_file is False:
+            self.find_verify_file(files)
+        else:
+            self.__verify_file = verify_file
 
-    def find_verify_file(self):
+    def find_verify_file(self, files=None):
         """Get verify script for this test if there is one."""
-        pattern = os.path.join(self.tests_path, self.test_name) + '*'
-        verify_files = glob(pattern)
-        verify_files = [os.path.basename(verify_file)
-                        for verify_file in verify_files
-                        if not verify_file.endswith('.pp')]
+        if files is None:
+            files = os.listdir(
+                os.path.join(self.module_path, self.tests_path))
+        verify_files = [file_name for file_name in sorted(files)
+                        if file_name.startswith(self.test_name) and
+                        not file_name.endswith('.pp')]
         if verify_files:
             self.__verify_file = verify_files[0]
             self.make_verify_executable()
@@ -43,7 +56,8 @@ class PuppetTest:
 
     def make_verify_executable(self):
         """Set executable bit for a file."""
-        file_path = os.path.join(self.tests_path, self.__verify_file)
+        file_path = os.path.join(self.module_path, self.tests_path,
+                                 self.__verify_file)
         if not os.path.isfile(file_path):
             return False
         file_stat = os.stat(file_path)
@@ -75,6 +89,10 @@ class PuppetTest:
         """Property returns verify file name."""
         return self.__verify_file
 
+    def to_dict(self):
+        return {'file_path': self.test_file_path,
+                'verify_file': self.__verify_file}
+
     def __repr__(self):
         """String representation of PuppetTest."""
         return "PuppetTest(name=%s, path=%s, file=%s)" % \
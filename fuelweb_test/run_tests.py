@@ -19,13 +19,17 @@ import sys
 from nose.plugins import Plugin
 from paramiko.transport import _join_lingering_threads
 
+from fuelweb_test.helpers.ssh_pool import ssh_pool
+from fuelweb_test.helpers.vm_sessions import vm_sessions
+
 
 class CloseSSHConnectionsPlugin(Plugin):
     """Closes all paramiko's ssh connections after each test case
 
     Plugin fixes proboscis disability to run cleanup of any kind.
-    'afterTest' calls _join_lingering_threads function from paramiko,
-    which stops all threads (set the state to inactive and joins for 10s)
+    'afterTest' closes the connections cached in vm_sessions and ssh_pool
+    and calls _join_lingering_threads function from paramiko, which stops
+    all threads (set the state to inactive and joins for 10s)
     """
     name = 'closesshconnections'
 
@@ -37,6 +41,8 @@ class CloseSSHConnectionsPlugin(Plugin):
         self.enabled = True
 
     def afterTest(self, *args, **kwargs):
+        vm_sessions.close_all()
+        ssh_pool.close_all()
         _join_lingering_threads()
 
 
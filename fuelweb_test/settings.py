@@ -60,6 +60,9 @@ HARDWARE["slave_node_memory"] = int(
     os.environ.get("SLAVE_NODE_MEMORY", slave_mem_default))
 NODE_VOLUME_SIZE = int(os.environ.get('NODE_VOLUME_SIZE', 50))
 NODES_COUNT = os.environ.get('NODES_COUNT', 10)
+# Number of slave nodes powered on simultaneously by bootstrap_nodes(),
+# batches are started with 2 sec delay (LP#1317213)
+BOOTSTRAP_CONCURRENCY = int(os.environ.get('BOOTSTRAP_CONCURRENCY', 1))
 
 MULTIPLE_NETWORKS = os.environ.get('MULTIPLE_NETWORKS', False) == 'true'
 
@@ -300,6 +303,19 @@ DEPLOYMENT_NAME = os.environ.get('DEPLOYMENT_NAME')
 TIMEOUT = int(os.environ.get('TIMEOUT', 60))
 ATTEMPTS = int(os.environ.get('ATTEMPTS', 5))
 
+# Seconds during which the nailgun nodes list fetched for lookups by MAC,
+# FQDN or name is reused
+NODES_INDEX_TTL = int(os.environ.get('NODES_INDEX_TTL', 5))
+
+# Maximal number of nodes processed simultaneously by SSHFanOut
+SSH_FANOUT_WORKERS = int(os.environ.get('SSH_FANOUT_WORKERS', 10))
+# Maximal number of simultaneous requests to Nailgun API made by
+# the bulk operations on many nodes
+NAILGUN_API_WORKERS = int(os.environ.get('NAILGUN_API_WORKERS', 10))
+# Maximal number of simultaneous create requests sent to OpenStack APIs
+# by the batch operations of OpenStackActions
+OPENSTACK_API_WORKERS = int(os.environ.get('OPENSTACK_API_WORKERS', 10))
+
 # Create snapshots as last step in test-case
 MAKE_SNAPSHOT = os.environ.get('MAKE_SNAPSHOT', 'false') == 'true'
 
@@ -325,6 +341,9 @@ RELEASE_VERSION = os.environ.get('RELEASE_VERSION', "2014.2.2-6.1")
 # CentOS: http://osci-obs.vm.mirantis.net:82/centos-fuel-master-20921/centos/
 # Ubuntu: http://osci-obs.vm.mirantis.net:82/ubuntu-fuel-master-20921/ubuntu/
 CUSTOM_PKGS_MIRROR = os.environ.get('CUSTOM_PKGS_MIRROR', '')
+# Number of packages downloaded from the custom mirror at once
+CUSTOM_PKGS_DOWNLOAD_WORKERS = int(os.environ.get(
+    'CUSTOM_PKGS_DOWNLOAD_WORKERS', 10))
 
 # Location of local mirrors on master node.
 LOCAL_MIRROR_UBUNTU = os.environ.get('LOCAL_MIRROR_UBUNTU',
@@ -348,6 +367,11 @@ SSH_CREDENTIALS = {
     'login': os.environ.get('ENV_FUEL_LOGIN', 'root'),
     'password': os.environ.get('ENV_FUEL_PASSWORD', 'r00tme')}
 
+# SSH sessions to VMs unused for this number of seconds are closed
+SSH_POOL_IDLE_TIMEOUT = int(os.environ.get('SSH_POOL_IDLE_TIMEOUT', 300))
+# Timeout of the health check of a pooled SSH client
+SSH_POOL_CHECK_TIMEOUT = int(os.environ.get('SSH_POOL_CHECK_TIMEOUT', 10))
+
 # Plugin path for plugins tests
 
 CONTRAIL_PLUGIN_PATH = os.environ.get('CONTRAIL_PLUGIN_PATH')
@@ -421,6 +445,13 @@ PATCHING_APPLY_TESTS = os.environ.get("PATCHING_APPLY_TESTS",
 PATCHING_PKGS = os.environ.get("PATCHING_PKGS", None)
 PATCHING_SNAPSHOT = os.environ.get("PATCHING_SNAPSHOT", None)
 PATCHING_CUSTOM_TEST = os.environ.get("PATCHING_CUSTOM_TEST", None)
+# Repositories metadata and packages tests files are downloaded with
+# conditional GET and kept here between the runs, empty value disables it
+PATCHING_METADATA_CACHE = os.environ.get(
+    "PATCHING_METADATA_CACHE",
+    os.path.join(os.path.expanduser('~'), '.cache', 'fuel-qa', 'patching'))
+PATCHING_METADATA_WORKERS = int(os.environ.get("PATCHING_METADATA_WORKERS",
+                                               10))
 
 DOWNLOAD_LINK = os.environ.get(
     'DOWNLOAD_LINK', 'http://releases.ubuntu.com/14.04.2/'
@@ -12,24 +12,133 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import hashlib
+import httplib
 import json
+import os
 import re
+import socket
+import threading
+import urllib
 import urllib2
+import urlparse
+from multiprocessing.pool import ThreadPool
 
 from settings import JENKINS
 from settings import logger
 
 
+_connections = threading.local()
+
+
+def _get_connection(scheme, netloc, fresh=False):
+    """Return keep-alive connection to the host owned by the current
+    thread, so crawler workers never share a connection.
+    """
+    if not hasattr(_connections, 'pool'):
+        _connections.pool = {}
+    key = (scheme, netloc)
+    if fresh and key in _connections.pool:
+        _connections.pool.pop(key).close()
+    if key not in _connections.pool:
+        if scheme == 'https':
+            _connections.pool[key] = httplib.HTTPSConnection(netloc)
+        else:
+            _connections.pool[key] = httplib.HTTPConnection(netloc)
+    return _connections.pool[key]
+
+
+def fetch(url, max_redirects=5):
+    """Return body of the HTTP GET response, TCP connection to the host
+    is kept open and reused by the next requests of the thread.
+
+    Redirects are followed. Requests to the hosts which should be reached
+    through a proxy are sent with urllib2, which handles proxies.
+    """
+    parsed = urlparse.urlsplit(url)
+    if (parsed.scheme in urllib.getproxies() and
+            not urllib.proxy_bypass(parsed.hostname)):
+        return urllib2.urlopen(url).read()
+    selector = urlparse.urlunsplit(('', '', parsed.path or '/',
+                                    parsed.query, ''))
+    for attempt in range(2):
+        # The server could drop an idle connection, so the request is
+        # repeated once with a fresh one
+        conn = _get_connection(parsed.scheme, parsed.netloc,
+                               fresh=attempt > 0)
+        try:
+            conn.request('GET', selector,
+                         headers={'Connection': 'keep-alive'})
+            response = conn.getresponse()
+            body = response.read()
+            break
+        except (socket.error, httplib.HTTPException):
+            conn.close()
+            if attempt > 0:
+                raise
+    if response.will_close:
+        conn.close()
+    location = response.getheader('Location')
+    if response.status in (301, 302, 303, 307, 308) and location and \
+            max_redirects > 0:
+        return fetch(urlparse.urljoin(url, location), max_redirects - 1)
+    if response.status != 200:
+        raise urllib2.HTTPError(url, response.status, response.reason,
+                                response.msg, None)
+    return body
+
+
+def fetch_json(url):
+    return json.loads(fetch(url))
+
+
+class BuildsCache(object):
+    """On-disk storage of the Jenkins responses keyed by URL.
+
+    Only data of the completed builds is stored, it never changes.
+    """
+
+    def __init__(self, path=JENKINS['cache_dir']):
+        self.path = path
+
+    def _file(self, url):
+        return os.path.join(self.path, hashlib.sha1(url).hexdigest())
+
+    def get(self, url):
+        if not self.path:
+            return None
+        try:
+            with open(self._file(url)) as f:
+                return json.load(f)
+        except (IOError, ValueError):
+            return None
+
+    def put(self, url, data):
+        if not self.path:
+            return
+        try:
+            if not os.path.isdir(self.path):
+                os.makedirs(self.path)
+            # Write to the temporary file first, concurrent readers never
+            # see the partially written data
+            tmp_file = '{0}.{1}.{2}'.format(self._file(url), os.getpid(),
+                                            threading.current_thread().ident)
+            with open(tmp_file, 'w') as f:
+                json.dump(data, f)
+            os.rename(tmp_file, self._file(url))
+        except (IOError, OSError) as e:
+            logger.warning("Can't cache {0}: {1}".format(url, e))
+
+
+builds_cache = BuildsCache()
+
+
 def get_jobs_for_view(view):
     """Return list of jobs from specified view
     """
     view_url = "/".join([JENKINS["url"], 'view', view, 'api/json'])
     logger.debug("Request view data from {}".format(view_url))
-    req = urllib2.Request(view_url)
-    opener = urllib2.build_opener(urllib2.HTTPHandler)
-    s = opener.open(req).read()
-    opener.close()
-    view_data = json.loads(s)
+    view_data = fetch_json(view_url)
     jobs = [job["name"] for job in view_data["jobs"]]
     return jobs
 
@@ -39,17 +148,18 @@ def get_downstream_builds_from_html(url):
     """
     url = "/".join([url, 'downstreambuildview/'])
     logger.debug("Request downstream builds data from {}".format(url))
-    req = urllib2.Request(url)
-    opener = urllib2.build_opener(urllib2.HTTPHandler)
-    s = opener.open(req).read()
-    opener.close()
+    s = fetch(url)
     jobs = []
     raw_downstream_builds = re.findall(
         '.*downstream-buildview.*href="(/job/\S+/[0-9]+/).*', s)
-    for raw_build in raw_downstream_builds:
-        sub_job_name = raw_build.split('/')[2]
-        sub_job_build = raw_build.split('/')[3]
-        build = Build(name=sub_job_name, number=sub_job_build)
+    sub_builds = [{'name': raw_build.split('/')[2],
+                   'number': raw_build.split('/')[3]}
+                  for raw_build in raw_downstream_builds]
+    for sub_build, build in zip(sub_builds,
+                                crawl_builds(sub_builds, test_data=False)):
+        if build is None:
+            raise Exception("Failed to get '{0}' job build #{1}".format(
+                sub_build['name'], sub_build['number']))
         jobs.append(
             {
                 'name': build.name,
@@ -66,11 +176,41 @@ def get_build_artifact(url, artifact):
     """
     url = "/".join([url, 'artifact', artifact])
     logger.debug("Request artifact content from {}".format(url))
-    req = urllib2.Request(url)
-    opener = urllib2.build_opener(urllib2.HTTPHandler)
-    s = opener.open(req).read()
-    opener.close()
-    return s
+    return fetch(url)
+
+
+def crawl_builds(builds, test_data=True, workers=JENKINS['workers'],
+                 attempts=3):
+    """Fetch data of many builds in parallel.
+
+    :param builds: list of dicts with 'name' and 'number' of the builds
+    :param test_data: fetch test reports of the builds too
+    :param workers: maximal number of simultaneous requests
+    :param attempts: number of tries for every build
+    :return: list of Build objects in the order of builds, None for
+             the builds which could not be fetched
+    """
+    def _fetch(build):
+        for attempt in range(1, attempts + 1):
+            try:
+                jenkins_build = Build(build['name'], build['number'])
+                if test_data:
+                    jenkins_build.test_data()
+                return jenkins_build
+            except Exception as e:
+                logger.warning("Failed to get build {0} #{1} (attempt {2} "
+                               "of {3}): {4}".format(build['name'],
+                                                     build['number'],
+                                                     attempt, attempts, e))
+
+    if not builds:
+        return []
+    pool = ThreadPool(min(workers, len(builds)))
+    try:
+        return pool.map(_fetch, builds)
+    finally:
+        pool.close()
+        pool.join()
 
 
 class Build():
@@ -82,6 +222,7 @@ class Build():
         """
 
         self.name = name
+        self._test_data = None
 
         if number == 'latest':
             job_info = self.get_job_info(depth=0)
@@ -99,23 +240,36 @@ class Build():
         job_url = "/".join([JENKINS["url"], 'job', self.name,
                             'api/json?depth={depth}'.format(depth=depth)])
         logger.debug("Request job info from {}".format(job_url))
-        return json.load(urllib2.urlopen(job_url))
+        return fetch_json(job_url)
 
     def get_build_data(self, depth=1):
         build_url = "/".join([JENKINS["url"], 'job',
                               self.name,
                               str(self.number),
                               'api/json?depth={depth}'.format(depth=depth)])
+        data = builds_cache.get(build_url)
+        if data is not None:
+            return data
         logger.debug("Request build data from {}".format(build_url))
-        return json.load(urllib2.urlopen(build_url))
+        data = fetch_json(build_url)
+        if not data.get('building', True):
+            builds_cache.put(build_url, data)
+        return data
 
     def get_test_data(self, url):
         test_url = "/".join([url.rstrip("/"), 'testReport', 'api/json'])
+        data = builds_cache.get(test_url)
+        if data is not None:
+            return data
         logger.debug("Request test data from {}".format(test_url))
-        response = urllib2.urlopen(test_url)
-        return json.load(response)
+        data = fetch_json(test_url)
+        if not self.build_data.get('building', True):
+            builds_cache.put(test_url, data)
+        return data
 
     def test_data(self):
+        if self._test_data is not None:
+            return self._test_data
         try:
             data = self.get_test_data(self.url)
         except Exception as e:
@@ -140,6 +294,7 @@ class Build():
                 ]
             }
 
+        self._test_data = data
         return data
 
     def __str__(self):
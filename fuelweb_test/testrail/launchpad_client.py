@@ -12,16 +12,24 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import json
+import os
+import threading
+import time
+from multiprocessing.pool import ThreadPool
+
 from launchpadlib.launchpad import Launchpad
 
+from settings import LaunchpadSettings
+from settings import logger
+
 
 class LaunchpadBug(object):
     """LaunchpadBug."""  # TODO documentation
 
-    def __init__(self, bug_id):
-        self.launchpad = Launchpad.login_anonymously('just testing',
-                                                     'production',
-                                                     '.cache')
+    def __init__(self, bug_id, launchpad=None):
+        self.launchpad = launchpad or Launchpad.login_anonymously(
+            'just testing', 'production', '.cache')
         self.bug = self.launchpad.bugs[int(bug_id)]
 
     @property
@@ -36,7 +44,126 @@ class LaunchpadBug(object):
         while bug.duplicate_of and bug.id not in duplicates:
             duplicates.append(bug.id)
             bug = self.launchpad.load(str(bug.duplicate_of))
-        return LaunchpadBug(bug.id)
+        return LaunchpadBug(bug.id, launchpad=self.launchpad)
 
     def __getattr__(self, item):
         return self.bug.__getattr__(item)
+
+
+class LaunchpadBugsCache(object):
+    """Resolved Launchpad bugs shared by the report runs.
+
+    A bug is resolved to the bug it duplicates and its targets. Resolved
+    bugs are kept in memory and in 'path' file for 'ttl' seconds. Bugs
+    which are private or don't exist are cached as None.
+    """
+
+    def __init__(self, path=LaunchpadSettings.cache_file,
+                 ttl=LaunchpadSettings.cache_ttl,
+                 workers=LaunchpadSettings.workers):
+        self.path = path
+        self.ttl = ttl
+        self.workers = workers
+        self._bugs = None
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _load(self):
+        if self._bugs is not None:
+            return
+        self._bugs = {}
+        if not self.path or not os.path.isfile(self.path):
+            return
+        try:
+            with open(self.path) as f:
+                self._bugs = {int(bug_id): entry
+                              for bug_id, entry in json.load(f).items()}
+        except (IOError, ValueError) as e:
+            logger.warning("Can't read Launchpad bugs cache {0}: {1}".format(
+                self.path, e))
+
+    def save(self):
+        if not self.path or self._bugs is None:
+            return
+        try:
+            directory = os.path.dirname(self.path)
+            if directory and not os.path.isdir(directory):
+                os.makedirs(directory)
+            with self._lock:
+                now = time.time()
+                bugs = {bug_id: entry for bug_id, entry in self._bugs.items()
+                        if now - entry['time'] < self.ttl}
+            tmp_path = '{0}.{1}'.format(self.path, os.getpid())
+            with open(tmp_path, 'w') as f:
+                json.dump(bugs, f)
+            os.rename(tmp_path, self.path)
+        except (IOError, OSError) as e:
+            logger.warning("Can't save Launchpad bugs cache {0}: {1}".format(
+                self.path, e))
+
+    @property
+    def launchpad(self):
+        # launchpadlib objects are not shared between threads
+        if not hasattr(self._local, 'launchpad'):
+            self._local.launchpad = Launchpad.login_anonymously(
+                'just testing', 'production', '.cache')
+        return self._local.launchpad
+
+    def resolve(self, bug_id):
+        """Ask Launchpad for the bug and return the cache entry data."""
+        try:
+            bug = LaunchpadBug(bug_id,
+                               launchpad=self.launchpad).get_duplicate_of()
+            return {'id': bug.id, 'targets': bug.targets}
+        except KeyError:
+            logger.warning("Bug with id '{bug_id}' is private or "
+                           "doesn't exist.".format(bug_id=bug_id))
+            return None
+
+    def _fresh(self, bug_id):
+        entry = self._bugs.get(bug_id)
+        return entry is not None and time.time() - entry['time'] < self.ttl
+
+    def _resolve_and_store(self, bug_id):
+        bug = self.resolve(bug_id)
+        with self._lock:
+            self._bugs[bug_id] = {'time': time.time(), 'bug': bug}
+
+    def prefetch(self, bug_ids):
+        """Resolve all the bugs which are not cached yet in parallel."""
+        with self._lock:
+            self._load()
+            missing = sorted({int(bug_id) for bug_id in bug_ids
+                              if not self._fresh(int(bug_id))})
+        if not missing:
+            return
+        logger.debug('Resolving Launchpad bugs: {0}'.format(missing))
+
+        def _job(bug_id):
+            try:
+                self._resolve_and_store(bug_id)
+            except Exception:
+                logger.exception("Strange situation with '{bug_id}' "
+                                 "issue".format(bug_id=bug_id))
+
+        pool = ThreadPool(min(self.workers, len(missing)))
+        try:
+            pool.map(_job, missing)
+        finally:
+            pool.close()
+            pool.join()
+        self.save()
+
+    def get(self, bug_id):
+        """Return {'id': ..., 'targets': [...]} of the bug or None."""
+        bug_id = int(bug_id)
+        with self._lock:
+            self._load()
+            fresh = self._fresh(bug_id)
+        if not fresh:
+            self._resolve_and_store(bug_id)
+            self.save()
+        return self._bugs[bug_id]['bug']
+
+
+launchpad_bugs = LaunchpadBugsCache()
@@ -22,10 +22,11 @@ from logging import DEBUG
 from optparse import OptionParser
 
 from builds import Build
+from builds import crawl_builds
 from builds import get_build_artifact
 from builds import get_downstream_builds_from_html
 from builds import get_jobs_for_view
-from launchpad_client import LaunchpadBug
+from launchpad_client import launchpad_bugs
 from settings import JENKINS
 from settings import LaunchpadSettings
 from settings import logger
@@ -155,8 +156,12 @@ def get_version_from_artifacts(jenkins_build_data):
 
 @retry(count=3)
 def get_tests_results(systest_build):
-    tests_results = []
     test_build = Build(systest_build['name'], systest_build['number'])
+    return get_build_tests_results(test_build)
+
+
+def get_build_tests_results(test_build):
+    tests_results = []
     for test in test_build.test_data()['suites'][0]['cases']:
         test_result = TestResult(
             name=test['name'],
@@ -177,6 +182,13 @@ def get_tests_results(systest_build):
 
 def publish_results(project, milestone_id, test_plan,
                     suite_id, config_id, results):
+    with project.cache():
+        return _publish_results(project, milestone_id, test_plan,
+                                suite_id, config_id, results)
+
+
+def _publish_results(project, milestone_id, test_plan,
+                     suite_id, config_id, results):
     test_run_ids = [run['id'] for entry in test_plan['entries']
                     for run in entry['runs'] if suite_id == run['suite_id']
                     and config_id in run['config_ids']]
@@ -188,7 +200,9 @@ def publish_results(project, milestone_id, test_plan,
                                                     config_id=config_id)
     cases = project.get_cases(suite_id=suite_id)
     tests = project.get_tests(run_id=test_run_ids[0])
+    run_results = project.get_results_for_tests(run_id=test_run_ids[0])
     results_to_publish = []
+    previous_results = {}
 
     for result in results:
         test = project.get_test_by_group(run_id=test_run_ids[0],
@@ -199,7 +213,7 @@ def publish_results(project, milestone_id, test_plan,
                 result.group, result.url))
             continue
         existing_results_versions = [r['version'] for r in
-                                     project.get_results_for_test(test['id'])]
+                                     run_results.get(test['id'], [])]
         if result.version in existing_results_versions:
             continue
         if result.status != 'passed':
@@ -208,11 +222,17 @@ def publish_results(project, milestone_id, test_plan,
             case_id = project.get_case_by_group(suite_id=suite_id,
                                                 group=result.group,
                                                 cases=cases)['id']
-            previous_results = project.get_all_results_for_case(
+            previous_results[result] = project.get_all_results_for_case(
                 run_ids=run_ids,
                 case_id=case_id)
-            result.launchpad_bug = get_existing_bug_link(previous_results)
         results_to_publish.append(result)
+
+    # Resolve all the bugs linked to the previous results at once
+    launchpad_bugs.prefetch(
+        bug_id for results_list in previous_results.values()
+        for bug_id in get_bugs_ids(results_list))
+    for result, results_list in previous_results.items():
+        result.launchpad_bug = get_existing_bug_link(results_list)
     try:
         if len(results_to_publish) > 0:
             project.add_results_for_cases(run_id=test_run_ids[0],
@@ -226,6 +246,19 @@ def publish_results(project, milestone_id, test_plan,
     return results_to_publish
 
 
+def get_bug_id(link):
+    try:
+        return int(link.strip('/').split('/')[-1])
+    except ValueError:
+        logger.warning('Link "{0}" doesn\'t contain bug id.'.format(link))
+
+
+def get_bugs_ids(previous_results):
+    return {get_bug_id(result["custom_launchpad_bug"])
+            for result in previous_results
+            if result["custom_launchpad_bug"] is not None} - {None}
+
+
 @retry(count=3)
 def get_existing_bug_link(previous_results):
     results_with_bug = [result for result in previous_results if
@@ -235,23 +268,14 @@ def get_existing_bug_link(previous_results):
     for result in sorted(results_with_bug,
                          key=lambda k: k['created_on'],
                          reverse=True):
-        try:
-            bug_id = int(result["custom_launchpad_bug"].strip('/').split(
-                '/')[-1])
-        except ValueError:
-            logger.warning('Link "{0}" doesn\'t contain bug id.'.format(
-                result["custom_launchpad_bug"]))
+        bug_id = get_bug_id(result["custom_launchpad_bug"])
+        if bug_id is None:
+            continue
+        bug = launchpad_bugs.get(bug_id)
+        if bug is None:
             continue
-        try:
-            bug = LaunchpadBug(bug_id).get_duplicate_of()
-        except KeyError:
-            logger.warning("Bug with id '{bug_id}' is private or \
-                doesn't exist.".format(bug_id=bug_id))
-        except Exception:
-            logger.exception("Strange situation with '{bug_id}' \
-                issue".format(bug_id=bug_id))
-
-        for target in bug.targets:
+
+        for target in bug['targets']:
             if target['project'] == LaunchpadSettings.project and\
                target['milestone'] == LaunchpadSettings.milestone and\
                target['status'] not in LaunchpadSettings.closed_statuses:
@@ -320,6 +344,7 @@ def main():
                      " or Jenkins view with system tests jobs (-w). Exiting..")
         return
 
+    systest_builds = []
     for systest_build in tests_jobs:
         if options.job_name:
             if 'result' not in systest_build.keys():
@@ -333,9 +358,19 @@ def main():
                              "ll running...".format(systest_build['name'],
                                                     systest_build['number'],))
                 continue
+        if any(os in systest_build['name'].lower()
+               for os in tests_results.keys()):
+            systest_builds.append(systest_build)
+
+    # Build data and test reports of all the builds are fetched in parallel
+    test_builds = crawl_builds(systest_builds)
+    for systest_build, test_build in zip(systest_builds, test_builds):
+        if test_build is None:
+            raise Exception("Failed to get '{0}' job build #{1}".format(
+                systest_build['name'], systest_build['number']))
         for os in tests_results.keys():
             if os in systest_build['name'].lower():
-                tests_results[os].extend(get_tests_results(systest_build))
+                tests_results[os].extend(get_build_tests_results(test_build))
 
     # STEP #3
     # Create new TestPlan in TestRail (or get existing) and add TestRuns
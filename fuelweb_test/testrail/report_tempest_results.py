@@ -19,8 +19,6 @@ import time
 import urlparse
 from xml.etree import ElementTree
 
-import joblib
-
 import report
 from settings import JENKINS
 from settings import logger
@@ -32,14 +30,21 @@ LOG = logger
 
 
 def parse_xml_report(path_to_report):
-    """This function parses the Tempest XML report and returns the list with
-    TestResult objects. Each TestResult object corresponds to one of the tests
+    """This function parses the Tempest XML report and yields TestResult
+    objects. Each TestResult object corresponds to one of the tests
     and contains all the result information for the respective test.
+
+    The report is parsed incrementally and the parsed test cases are
+    dropped from the tree, so memory usage doesn't depend on its size.
     """
 
-    tree = ElementTree.parse(path_to_report)
-    test_results = []
-    for elem in tree.findall('testcase'):
+    root = None
+    for event, elem in ElementTree.iterparse(path_to_report,
+                                             events=('start', 'end')):
+        if root is None:
+            root = elem
+        if event != 'end' or elem.tag != 'testcase':
+            continue
         status = 'passed'
         description = None
         child_elem = elem.getchildren()
@@ -53,9 +58,9 @@ def parse_xml_report(path_to_report):
                                         if status == 'failure' else status,
                                         description=description,
                                         duration=1)
-        test_results.append(test_result)
-
-    return test_results
+        elem.clear()
+        root.clear()
+        yield test_result
 
 
 def mark_all_tests_as_failed(client, tests_suite):
@@ -97,21 +102,65 @@ def find_run_by_config_in_test_plan_entry(test_plan_entry, config):
             return run
 
 
-def upload_test_result(client, test_run, test_result):
-    """This function uploads the test result (parameter "test_result" contains
-    all the test result information) to TestRail for the specified test run.
+def get_cases_ids(test_result, tests_cases):
+    """This function returns the IDs of the test run cases which the test
+    result (parameter "test_result") belongs to. The result of "setUpClass"
+    belongs to all the tests of the class.
     """
 
     if 'setUpClass' in test_result.name:
         i = test_result.name.find('tempest')
         group = test_result.name[i:-1]
-        for t in client.get_tests_by_group(test_run['id'], group):
-            client.add_results_for_test(t['id'], test_result)
-    else:
-        test = client.get_test_by_name_and_group(
-            test_run['id'], test_result.name, test_result.group)
-        if test:
-            client.add_results_for_test(test['id'], test_result)
+        return tests_cases['groups'].get(group, [])
+    case_id = tests_cases['tests'].get((test_result.name, test_result.group))
+    return [case_id] if case_id is not None else []
+
+
+def upload_test_results(client, test_run, test_results,
+                        batch_size=TestRailSettings.results_batch_size,
+                        tries_count=10):
+    """This function uploads the test results to TestRail for the specified
+    test run. Results are sent by batches of "batch_size" tests, each batch
+    is one "add_results_for_cases" request.
+    """
+
+    statuses = client.get_statuses_ids()
+    tests_cases = {'tests': {}, 'groups': {}}
+    for test in client.get_tests(test_run['id']):
+        group = test['custom_test_group']
+        tests_cases['tests'][(test['title'], group)] = test['case_id']
+        tests_cases['groups'].setdefault(group, []).append(test['case_id'])
+
+    def _upload(batch):
+        for attempt in range(tries_count, 0, -1):
+            try:
+                client.add_results_for_case_ids(test_run['id'], batch,
+                                                statuses)
+                return
+            except Exception as e:
+                if attempt == 1:
+                    raise
+                msg = 'Can not upload Tempest results to TestRail, error: {0}'
+                LOG.info(msg.format(e))
+                # wait while TestRail will be ready for new iteration
+                time.sleep(10)
+
+    batch = []
+    uploaded = 0
+    for test_result in test_results:
+        cases_ids = get_cases_ids(test_result, tests_cases)
+        if not cases_ids:
+            LOG.debug('Test "{0}" not found in the test run.'.format(
+                test_result.name))
+        batch.extend((case_id, test_result) for case_id in cases_ids)
+        if len(batch) >= batch_size:
+            _upload(batch)
+            uploaded += len(batch)
+            batch = []
+    if batch:
+        _upload(batch)
+        uploaded += len(batch)
+    LOG.info('{0} test results have been uploaded.'.format(uploaded))
 
 
 def main():
@@ -127,8 +176,12 @@ def main():
     parser.add_option('-c', '--conf', dest='config', default='Centos 6.5',
                       help='The name of one of the configurations')
     parser.add_option('-m', '--multithreading', dest='threads_count',
-                      default=100, help='The count of threads '
-                                        'for uploading the test results')
+                      default=100, help='Deprecated, the test results are '
+                                        'uploaded by batches')
+    parser.add_option('-b', '--batch-size', dest='batch_size',
+                      default=TestRailSettings.results_batch_size,
+                      help='The count of the test results uploaded to '
+                           'TestRail with one request')
     parser.add_option('-f', '--fail-all-tests', dest='all_tests_failed',
                       action='store_true', help='Mark all Tempest tests as '
                                                 'failed regardless of genuine '
@@ -161,9 +214,8 @@ def main():
     if options.all_tests_failed:
         test_results = mark_all_tests_as_failed(client, tests_suite)
     else:
-        LOG.info('Parsing the test results...')
+        # The report is parsed while the results are uploaded
         test_results = parse_xml_report(options.path)
-        LOG.info('The test results have been parsed.')
 
     # STEP #3
     # Create new test plan (or find existing)
@@ -222,22 +274,9 @@ def main():
     # STEP #4
     # Upload the test results to TestRail for the specified test run
     LOG.info('Uploading the test results to TestRail...')
-    tries_count = 10
-    threads_count = options.threads_count
-    while tries_count > 0:
-        try:
-            joblib.Parallel(n_jobs=threads_count)(joblib.delayed(
-                upload_test_result)(client, run, r) for r in test_results)
-            break
-        except Exception as e:
-            tries_count -= 1
-            threads_count = int(threads_count * 3 / 4)
-
-            msg = 'Can not upload Tempest results to TestRail, error: {0}'
-            LOG.info(msg.format(e))
-
-            # wait while TestRail will be ready for new iteration
-            time.sleep(10)
+    with client.cache():
+        upload_test_results(client, run, test_results,
+                            batch_size=int(options.batch_size))
 
     LOG.info('The results of Tempest tests have been uploaded.')
     LOG.info('Report URL: {0}'.format(test_plan['url']))
@@ -26,7 +26,12 @@ logger.setLevel(logging.INFO)
 JENKINS = {
     'url': os.environ.get('JENKINS_URL', 'http://localhost/'),
     'version_artifact': os.environ.get('JENKINS_VERSION_ARTIFACT',
-                                       'version.yaml.txt')
+                                       'version.yaml.txt'),
+    # Number of builds fetched from Jenkins in parallel
+    'workers': int(os.environ.get('JENKINS_WORKERS', 10)),
+    # Data of the completed builds is kept here, empty value disables cache
+    'cache_dir': os.environ.get('JENKINS_CACHE_DIR', os.path.join(
+        os.path.expanduser('~'), '.cache', 'fuel-qa', 'jenkins')),
 }
 
 
@@ -39,6 +44,12 @@ class LaunchpadSettings(object):
         os.environ.get('LAUNCHPAD_RELEASED_STATUS', 'Fix Released'),
         os.environ.get('LAUNCHPAD_INVALID_STATUS', 'Invalid')
     ]
+    # Resolved bugs are kept in this file and reused by the next runs
+    # for 'cache_ttl' seconds, empty value disables the file
+    cache_file = os.environ.get('LAUNCHPAD_CACHE_FILE', os.path.join(
+        os.path.expanduser('~'), '.cache', 'fuel-qa', 'launchpad_bugs.json'))
+    cache_ttl = int(os.environ.get('LAUNCHPAD_CACHE_TTL', 3600))
+    workers = int(os.environ.get('LAUNCHPAD_WORKERS', 10))
 
 
 class TestRailSettings(object):
@@ -54,6 +65,8 @@ class TestRailSettings(object):
     tests_include = os.environ.get('TESTRAIL_TEST_INCLUDE', None)
     tests_exclude = os.environ.get('TESTRAIL_TEST_EXCLUDE', None)
     previous_results_depth = os.environ.get('TESTRAIL_TESTS_DEPTH', 5)
+    results_batch_size = int(os.environ.get('TESTRAIL_RESULTS_BATCH_SIZE',
+                                            250))
     operation_systems = [
         os.environ.get('TESTRAIL_CENTOS_RELEASE', 'Centos 6.5'),
         os.environ.get('TESTRAIL_UBUNTU_RELEASE', 'Ubuntu 14.04')
@@ -12,6 +12,9 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+from contextlib import contextmanager
+
+from settings import logger
 from testrail import APIClient
 
 
@@ -22,11 +25,49 @@ class TestRailProject():
         self.client = APIClient(base_url=url)
         self.client.user = user
         self.client.password = password
+        self._cache = None
+        self.requests_count = 0
         self.project = self._get_project(project)
 
+    @contextmanager
+    def cache(self):
+        """Reuse responses of GET requests inside the block.
+
+        Responses are cached by URI and the cache is dropped on any POST
+        request and when the block is left, so nested or repeated lookups
+        (e.g. get_plans_by_milestone, get_case_by_group, get_tests) cost one
+        HTTP call per URI.
+        """
+        enclosing = self._cache
+        if enclosing is None:
+            self._cache = {}
+        requests_count = self.requests_count
+        try:
+            yield self
+        finally:
+            if enclosing is None:
+                self._cache = None
+                logger.debug('TestRail requests made with cache: {0}'.format(
+                    self.requests_count - requests_count))
+
+    def _get(self, uri):
+        if self._cache is not None and uri in self._cache:
+            return self._cache[uri]
+        self.requests_count += 1
+        response = self.client.send_get(uri)
+        if self._cache is not None:
+            self._cache[uri] = response
+        return response
+
+    def _post(self, uri, data):
+        if self._cache:
+            self._cache.clear()
+        self.requests_count += 1
+        return self.client.send_post(uri, data)
+
     def _get_project(self, project_name):
         projects_uri = 'get_projects'
-        projects = self.client.send_get(uri=projects_uri)
+        projects = self._get(uri=projects_uri)
         for project in projects:
             if project['name'] == project_name:
                 return project
@@ -52,11 +93,11 @@ class TestRailProject():
 
     def get_users(self):
         users_uri = 'get_users'
-        return self.client.send_get(uri=users_uri)
+        return self._get(uri=users_uri)
 
     def get_user(self, user_id):
         user_uri = 'get_user/{user_id}'.format(user_id=user_id)
-        return self.client.send_get(uri=user_uri)
+        return self._get(uri=user_uri)
 
     def get_user_by_name(self, name):
         for user in self.get_users():
@@ -66,7 +107,7 @@ class TestRailProject():
     def get_configs(self):
         configs_uri = 'get_configs/{project_id}'.format(
             project_id=self.project['id'])
-        return self.client.send_get(configs_uri)
+        return self._get(configs_uri)
 
     def get_config(self, config_id):
         for configs in self.get_configs():
@@ -82,12 +123,12 @@ class TestRailProject():
     def get_milestones(self):
         milestones_uri = 'get_milestones/{project_id}'.format(
             project_id=self.project['id'])
-        return self.client.send_get(uri=milestones_uri)
+        return self._get(uri=milestones_uri)
 
     def get_milestone(self, milestone_id):
         milestone_uri = 'get_milestone/{milestone_id}'.format(
             milestone_id=milestone_id)
-        return self.client.send_get(uri=milestone_uri)
+        return self._get(uri=milestone_uri)
 
     def get_milestone_by_name(self, name):
         for milestone in self.get_milestones():
@@ -97,11 +138,11 @@ class TestRailProject():
     def get_suites(self):
         suites_uri = 'get_suites/{project_id}'.format(
             project_id=self.project['id'])
-        return self.client.send_get(uri=suites_uri)
+        return self._get(uri=suites_uri)
 
     def get_suite(self, suite_id):
         suite_uri = 'get_suite/{suite_id}'.format(suite_id=suite_id)
-        return self.client.send_get(uri=suite_uri)
+        return self._get(uri=suite_uri)
 
     def get_suite_by_name(self, name):
         for suite in self.get_suites():
@@ -113,11 +154,11 @@ class TestRailProject():
             project_id=self.project['id'],
             suite_id=suite_id
         )
-        return self.client.send_get(sections_uri)
+        return self._get(sections_uri)
 
     def get_section(self, section_id):
         section_uri = 'get_section/{section_id}'.format(section_id=section_id)
-        return self.client.send_get(section_uri)
+        return self._get(section_uri)
 
     def get_section_by_name(self, suite_id, section_name):
         for section in self.get_sections(suite_id=suite_id):
@@ -125,16 +166,16 @@ class TestRailProject():
                 return self.get_section(section_id=section['id'])
 
     def create_section(self, suite_id, name, parent_id=None):
-        return self.client.send_post('add_section/' + str(self.project['id']),
-                                     dict(suite_id=suite_id, name=name,
-                                          parent_id=parent_id))
+        return self._post('add_section/' + str(self.project['id']),
+                          dict(suite_id=suite_id, name=name,
+                               parent_id=parent_id))
 
     def delete_section(self, section_id):
-        return self.client.send_post('delete_section/' + str(section_id), {})
+        return self._post('delete_section/' + str(section_id), {})
 
     def create_suite(self, name, description=None):
-        return self.client.send_post('add_suite/' + str(self.project['id']),
-                                     dict(name=name, description=description))
+        return self._post('add_suite/' + str(self.project['id']),
+                          dict(name=name, description=description))
 
     def get_cases(self, suite_id, section_id=None):
         cases_uri = 'get_cases/{project_id}&suite_id={suite_id}'.format(
@@ -145,40 +186,44 @@ class TestRailProject():
             cases_uri = '{0}&section_id={section_id}'.format(
                 cases_uri, section_id=section_id
             )
-        return self.client.send_get(cases_uri)
+        return self._get(cases_uri)
 
     def get_case(self, case_id):
         case_uri = 'get_case/{case_id}'.format(case_id=case_id)
-        return self.client.send_get(case_uri)
+        return self._get(case_uri)
 
+    # get_cases() returns the same fields as get_case(), so the cases are
+    # taken from the list without additional requests
     def get_case_by_name(self, suite_id, name, cases=None):
         for case in cases or self.get_cases(suite_id):
             if case['title'] == name:
-                return self.get_case(case_id=case['id'])
+                return case
 
     def get_case_by_group(self, suite_id, group, cases=None):
         for case in cases or self.get_cases(suite_id):
             if case['custom_test_group'] == group:
-                return self.get_case(case_id=case['id'])
+                return case
 
     def add_case(self, section_id, case):
         add_case_uri = 'add_case/{section_id}'.format(section_id=section_id)
-        return self.client.send_post(add_case_uri, case)
+        return self._post(add_case_uri, case)
 
     def delete_case(self, case_id):
-        return self.client.send_post('delete_case/' + str(case_id), None)
+        return self._post('delete_case/' + str(case_id), None)
 
-    def get_plans(self):
+    def get_plans(self, milestone_id=None):
         plans_uri = 'get_plans/{project_id}'.format(
             project_id=self.project['id'])
-        return self.client.send_get(plans_uri)
+        if milestone_id:
+            plans_uri = '{0}&milestone_id={1}'.format(plans_uri, milestone_id)
+        return self._get(plans_uri)
 
     def get_plan(self, plan_id):
         plan_uri = 'get_plan/{plan_id}'.format(plan_id=plan_id)
-        return self.client.send_get(plan_uri)
+        return self._get(plan_uri)
 
     def get_plans_by_milestone(self, milestone_id):
-        plans = self.get_plans()
+        plans = self.get_plans(milestone_id=milestone_id)
         return [self.get_plan(plan['id']) for plan in plans
                 if plan['milestone_id'] == milestone_id]
 
@@ -196,7 +241,7 @@ class TestRailProject():
             'milestone_id': milestone_id,
             'entries': entries
         }
-        return self.client.send_post(add_plan_uri, new_plan)
+        return self._post(add_plan_uri, new_plan)
 
     def add_plan_entry(self, plan_id, suite_id, config_ids, runs, name=None):
         add_plan_entry_uri = 'add_plan_entry/{plan_id}'.format(plan_id=plan_id)
@@ -207,25 +252,25 @@ class TestRailProject():
         }
         if name:
             new_entry['name'] = name
-        return self.client.send_post(add_plan_entry_uri, new_entry)
+        return self._post(add_plan_entry_uri, new_entry)
 
     def delete_plan(self, plan_id):
         delete_plan_uri = 'delete_plan/{plan_id}'.format(plan_id=plan_id)
-        self.client.send_post(delete_plan_uri, {})
+        self._post(delete_plan_uri, {})
 
     def get_runs(self):
         runs_uri = 'get_runs/{project_id}'.format(
             project_id=self.project['id'])
-        return self.client.send_get(uri=runs_uri)
+        return self._get(uri=runs_uri)
 
     def get_run(self, run_id):
         run_uri = 'get_run/{run_id}'.format(run_id=run_id)
-        return self.client.send_get(uri=run_uri)
+        return self._get(uri=run_uri)
 
     def get_run_by_name(self, name):
         for run in self.get_runs():
             if run['name'] == name:
-                return self.get_run(run_id=run['id'])
+                return run
 
     def get_previous_runs(self, milestone_id, suite_id, config_id):
         all_runs = []
@@ -240,7 +285,7 @@ class TestRailProject():
     def add_run(self, new_run):
         add_run_uri = 'add_run/{project_id}'.format(
             project_id=self.project['id'])
-        return self.client.send_post(add_run_uri, new_run)
+        return self._post(add_run_uri, new_run)
 
     def update_run(self, name, milestone_id=None, description=None,
                    config_ids=None, include_all=None, case_ids=None):
@@ -257,7 +302,7 @@ class TestRailProject():
             update_run['case_ids'] = case_ids
         if config_ids:
             update_run['config_ids'] = config_ids
-        return self.client.send_post(update_run_uri, update_run)
+        return self._post(update_run_uri, update_run)
 
     def create_or_update_run(self, name, suite, milestone_id, description,
                              config_ids, include_all=True, assignedto=None,
@@ -278,7 +323,7 @@ class TestRailProject():
 
     def get_statuses(self):
         statuses_uri = 'get_statuses'
-        return self.client.send_get(statuses_uri)
+        return self._get(statuses_uri)
 
     def get_status(self, name):
         for status in self.get_statuses():
@@ -290,33 +335,31 @@ class TestRailProject():
         if status_id:
             tests_uri = '{0}&status_id={1}'.format(tests_uri,
                                                    ','.join(status_id))
-        return self.client.send_get(tests_uri)
+        return self._get(tests_uri)
 
     def get_test(self, test_id):
         test_uri = 'get_test/{test_id}'.format(test_id=test_id)
-        return self.client.send_get(test_uri)
+        return self._get(test_uri)
 
+    # get_tests() returns the same fields as get_test()
     def get_test_by_name(self, run_id, name):
         for test in self.get_tests(run_id):
             if test['title'] == name:
-                return self.get_test(test_id=test['id'])
+                return test
 
     def get_test_by_group(self, run_id, group, tests=None):
         for test in tests or self.get_tests(run_id):
             if test['custom_test_group'] == group:
-                return self.get_test(test_id=test['id'])
+                return test
 
     def get_test_by_name_and_group(self, run_id, name, group):
         for test in self.get_tests(run_id):
             if test['title'] == name and test['custom_test_group'] == group:
-                return self.get_test(test_id=test['id'])
+                return test
 
     def get_tests_by_group(self, run_id, group, tests=None):
-        test_list = []
-        for test in tests or self.get_tests(run_id):
-            if test['custom_test_group'] == group:
-                test_list.append(self.get_test(test_id=test['id']))
-        return test_list
+        return [test for test in tests or self.get_tests(run_id)
+                if test['custom_test_group'] == group]
 
     def get_results_for_test(self, test_id, run_results=None):
         if run_results:
@@ -324,22 +367,44 @@ class TestRailProject():
                 if results['test_id'] == test_id:
                     return results
         results_uri = 'get_results/{test_id}'.format(test_id=test_id)
-        return self.client.send_get(results_uri)
+        return self._get(results_uri)
 
     def get_results_for_run(self, run_id):
         results_run_uri = 'get_results_for_run/{run_id}'.format(run_id=run_id)
-        return self.client.send_get(results_run_uri)
+        return self._get(results_run_uri)
+
+    def get_results_for_tests(self, run_id):
+        """Return {test_id: [results]} for all tests of the run, fetched
+        with a single get_results_for_run request.
+        """
+        results = {}
+        for result in self.get_results_for_run(run_id):
+            results.setdefault(result['test_id'], []).append(result)
+        return results
+
+    def get_results_for_cases(self, run_id):
+        """Return {case_id: [results]} for all cases of the run, fetched
+        with get_tests and get_results_for_run requests.
+        """
+        results_for_tests = self.get_results_for_tests(run_id)
+        return {test['case_id']: results_for_tests.get(test['id'], [])
+                for test in self.get_tests(run_id)}
 
     def get_results_for_case(self, run_id, case_id):
         results_case_uri = 'get_results_for_case/{run_id}/{case_id}'.format(
             run_id=run_id, case_id=case_id)
-        return self.client.send_get(results_case_uri)
+        return self._get(results_case_uri)
 
     def get_all_results_for_case(self, run_ids, case_id):
         all_results = []
         for run_id in run_ids:
-            results = self.get_results_for_case(run_id=run_id,
-                                                case_id=case_id)
+            if self._cache is not None:
+                # Results of all cases of the run are fetched once and
+                # are reused for the next cases
+                results = self.get_results_for_cases(run_id).get(case_id, [])
+            else:
+                results = self.get_results_for_case(run_id=run_id,
+                                                    case_id=case_id)
             all_results.extend(results)
         return all_results
 
@@ -351,23 +416,43 @@ class TestRailProject():
             'elapsed': test_results.duration,
             'version': test_results.version
         }
-        return self.client.send_post(add_results_test_uri, new_results)
+        return self._post(add_results_test_uri, new_results)
 
     def add_results_for_cases(self, run_id, suite_id, tests_results):
+        tests_cases = self.get_cases(suite_id)
+        return self.add_results_for_case_ids(
+            run_id=run_id,
+            cases_results=[
+                (self.get_case_by_group(suite_id=suite_id,
+                                        group=results.group,
+                                        cases=tests_cases)['id'], results)
+                for results in tests_results])
+
+    def get_statuses_ids(self):
+        """Return {status name: status id} map."""
+        return dict((status['name'], status['id'])
+                    for status in self.get_statuses())
+
+    def add_results_for_case_ids(self, run_id, cases_results, statuses=None):
+        """Add results for many cases of the run with one request.
+
+        :param cases_results: list of (case_id, TestResult) pairs
+        :param statuses: get_statuses_ids() map, it is requested once per
+                         call if not given
+        """
+        if statuses is None:
+            statuses = self.get_statuses_ids()
         add_results_test_uri = 'add_results_for_cases/{run_id}'.format(
             run_id=run_id)
         new_results = {'results': []}
-        tests_cases = self.get_cases(suite_id)
-        for results in tests_results:
+        for case_id, results in cases_results:
             new_result = {
-                'case_id': self.get_case_by_group(suite_id=suite_id,
-                                                  group=results.group,
-                                                  cases=tests_cases)['id'],
-                'status_id': self.get_status(results.status)['id'],
-                'comment': results.url,
+                'case_id': case_id,
+                'status_id': statuses[results.status],
+                'comment': results.url or results.description,
                 'elapsed': results.duration,
                 'version': results.version,
                 'custom_launchpad_bug': results.launchpad_bug
             }
             new_results['results'].append(new_result)
-        return self.client.send_post(add_results_test_uri, new_results)
+        return self._post(add_results_test_uri, new_results)
@@ -165,9 +165,9 @@ class ContrailPlugin(TestBasic):
                 "os": base_os_disk, }
         }
 
-        for node in nailgun_nodes:
-            if node.get('pending_roles') == ['base-os']:
-                self.fuel_web.update_node_disk(node.get('id'), disk_part)
+        self.fuel_web.update_nodes_disks(
+            [node.get('id') for node in nailgun_nodes
+             if node.get('pending_roles') == ['base-os']], disk_part)
 
     @test(depends_on=[SetupEnvironment.prepare_slaves_5],
           groups=["install_contrail"])
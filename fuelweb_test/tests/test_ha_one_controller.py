@@ -664,8 +664,8 @@ class NodeMultipleInterfaces(TestBasic):
             }
         )
         nailgun_nodes = self.fuel_web.client.list_cluster_nodes(cluster_id)
-        for node in nailgun_nodes:
-            self.fuel_web.update_node_networks(node['id'], interfaces_dict)
+        self.fuel_web.update_nodes_networks(
+            [node['id'] for node in nailgun_nodes], interfaces_dict)
 
         self.fuel_web.deploy_cluster_wait(cluster_id)
         for node in ['slave-01', 'slave-02', 'slave-03']:
@@ -798,8 +798,7 @@ class MultinicBootstrap(TestBasic):
         mac_addresses = [interface.mac_address for interface in
                          slave.interfaces.filter(network__name='internal')]
         try:
-            for mac in mac_addresses:
-                Ebtables.block_mac(mac)
+            Ebtables.block_macs(mac_addresses)
             for mac in mac_addresses:
                 Ebtables.restore_mac(mac)
                 slave.destroy(verbose=False)
@@ -808,8 +807,7 @@ class MultinicBootstrap(TestBasic):
                 assert_equal(mac.upper(), nailgun_slave['mac'].upper())
                 Ebtables.block_mac(mac)
         finally:
-            for mac in mac_addresses:
-                Ebtables.restore_mac(mac)
+            Ebtables.restore_macs(mac_addresses)
 
 
 @test(groups=["thread_2", "test"])
@@ -897,8 +895,8 @@ class UntaggedNetworksNegative(TestBasic):
 
         nets = self.fuel_web.client.get_networks(cluster_id)['networks']
         nailgun_nodes = self.fuel_web.client.list_cluster_nodes(cluster_id)
-        for node in nailgun_nodes:
-            self.fuel_web.update_node_networks(node['id'], interfaces)
+        self.fuel_web.update_nodes_networks(
+            [node['id'] for node in nailgun_nodes], interfaces)
 
         # select networks that will be untagged:
         [net.update(vlan_turn_off) for net in nets]
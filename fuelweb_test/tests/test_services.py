@@ -536,9 +536,9 @@ class CeilometerHAOneControllerMongo(OSTFCeilometerHelper):
             }
         }
 
-        for node in nailgun_nodes:
-            if node.get('pending_roles') == ['mongo']:
-                self.fuel_web.update_node_disk(node.get('id'), disk_part)
+        self.fuel_web.update_nodes_disks(
+            [node.get('id') for node in nailgun_nodes
+             if node.get('pending_roles') == ['mongo']], disk_part)
 
         self.fuel_web.deploy_cluster_wait(cluster_id)
 
@@ -477,8 +477,8 @@ class VcenterDeploy(TestBasic):
         }
 
         slave_nodes = self.fuel_web.client.list_cluster_nodes(cluster_id)
-        for node in slave_nodes:
-            self.fuel_web.update_node_networks(node['id'], interfaces)
+        self.fuel_web.update_nodes_networks(
+            [node['id'] for node in slave_nodes], interfaces)
 
         # Configure Nova-Network VLanManager.
         self.fuel_web.update_vlan_network_fixed(
@@ -563,8 +563,8 @@ class VcenterDeploy(TestBasic):
         }
 
         slave_nodes = self.fuel_web.client.list_cluster_nodes(cluster_id)
-        for node in slave_nodes:
-            self.fuel_web.update_node_networks(node['id'], interfaces)
+        self.fuel_web.update_nodes_networks(
+            [node['id'] for node in slave_nodes], interfaces)
 
         # Configure Nova-Network VLanManager.
         self.fuel_web.update_vlan_network_fixed(
@@ -651,8 +651,8 @@ class VcenterDeploy(TestBasic):
         }
 
         slave_nodes = self.fuel_web.client.list_cluster_nodes(cluster_id)
-        for node in slave_nodes:
-            self.fuel_web.update_node_networks(node['id'], interfaces)
+        self.fuel_web.update_nodes_networks(
+            [node['id'] for node in slave_nodes], interfaces)
 
         # Configure Nova-Network VLanManager.
         self.fuel_web.update_vlan_network_fixed(
@@ -821,8 +821,8 @@ class VcenterDeploy(TestBasic):
         )
 
         slave_nodes = self.fuel_web.client.list_cluster_nodes(cluster_id)
-        for node in slave_nodes:
-            self.fuel_web.update_node_networks(node['id'], interfaces)
+        self.fuel_web.update_nodes_networks(
+            [node['id'] for node in slave_nodes], interfaces)
 
         # Configure Nova-Network VLanManager.
         self.fuel_web.update_vlan_network_fixed(
@@ -1192,8 +1192,8 @@ class VcenterDeploy(TestBasic):
              'slave-08': ['cinder-vmware'], })
 
         slave_nodes = self.fuel_web.client.list_cluster_nodes(cluster_id)
-        for node in slave_nodes:
-            self.fuel_web.update_node_networks(node['id'], interfaces)
+        self.fuel_web.update_nodes_networks(
+            [node['id'] for node in slave_nodes], interfaces)
 
         # Configure Nova-Network VLanManager.
         self.fuel_web.update_vlan_network_fixed(
@@ -18,7 +18,11 @@ This tool can extract the useful lines from Astute and Puppet logs
 within the Fuel log snapshot or on the live Fuel Master node.
 
 usage: fuel_logs [-h] [--astute] [--puppet] [--clear] [--sort] [--evals]
-                 [--mcagent] [--less]
+                 [--mcagent] [--less] [--jobs N] [--profile]
+                 [--profile-format FORMAT] [--timeline]
+                 [--timeline-format FORMAT] [--top N] [--index FILE]
+                 [--node NODE] [--type TYPE] [--task TASK] [--grep GREP]
+                 [--order COLUMN] [--count-by COLUMN] [--limit LIMIT]
                  [SNAPSHOT [SNAPSHOT ...]]
 
 positional arguments:
@@ -33,6 +37,19 @@ optional arguments:
   --evals, -e    Show Puppet evaltrace lines
   --mcagent, -m  Show Astute MCAgent calls debug
   --less, -l     Redirect data to the "less" pager
+  --jobs, -j N   Number of worker processes
+  --profile      Profile Puppet resource evaluation
+  --profile-format {text,json,flamegraph}
+                 Output format of the profile
+  --timeline     Show Astute deployment tasks timeline
+  --timeline-format {text,chrome}
+                 Output format of the timeline
+  --top N        Number of the slowest resources and tasks in the profile
+                 and the timeline
+  --index, -i FILE
+                 Ingest the snapshots into this SQLite index and query it
+  --node, --type, --task, --grep, --order, --count-by, --limit
+                 Filter, sort and aggregate the index query
 
 Using anywhere to view Fuel snapshot data:
 
@@ -52,14 +69,45 @@ fuel_logs.py -c Truncates Astute and Puppet logs. Respects -a and -p options.
 It you are running and debugging many deployments on a single Fuel Master
 node, you may want to truncate the logs from the previous deployments.
 Using -l option is also recommended for interactive use.
+
+fuel_logs.py -j 8 *.tar.gz Processes the snapshots in 8 worker processes.
+With a single snapshot or on the live node the Puppet logs of the nodes are
+parsed in parallel instead. The output is the same as without -j.
+
+fuel_logs.py -p --profile Shows the slowest Puppet resources and modular
+tasks and the critical path of the modular tasks across the nodes. Puppet
+has to be run with --evaltrace. "--profile-format json" makes the JSON report
+and "--profile-format flamegraph" makes the input for flamegraph.pl.
+
+fuel_logs.py -a --timeline Rebuilds the timeline of the deployment tasks on
+every node from the Astute log and shows the slowest tasks, the longest idle
+gaps between the tasks on the nodes and the critical path of the deployment.
+"--timeline-format chrome" makes the JSON for chrome://tracing.
+
+fuel_logs.py -i index.db *.tar.gz Parses the snapshots into the SQLite index.
+The members of the snapshots which are already indexed and not changed are
+skipped. Then the index can be queried without the snapshots:
+
+# Which nodes have failed Puppet resources
+fuel_logs.py -i index.db -p --type err_line --count-by node
+# The records of the netconfig task on node-1
+fuel_logs.py -i index.db --node node-1 --task netconfig
 """
 
 import argparse
 from datetime import datetime
+import heapq
+import itertools
+import json
+import multiprocessing
 import os
+import pickle
 import re
+import shutil
+import sqlite3
 import sys
 import tarfile
+import tempfile
 
 
 class IO(object):
@@ -84,28 +132,56 @@ class IO(object):
         Extract the logs from the snapshots and process the logs
         :return:
         """
-        for snapshot in cls.args.snapshots:
+        snapshots = [snapshot for snapshot in cls.args.snapshots
+                     if os.path.isfile(snapshot)]
 
-            if not os.path.isfile(snapshot):
-                continue
+        if cls.args.jobs > 1 and len(snapshots) > 1:
+            for output in Jobs.map(Jobs.process_snapshot,
+                                   [(cls.args, snapshot)
+                                    for snapshot in snapshots],
+                                   cls.args.jobs):
+                cls.output_file(output)
+            return
 
-            with FuelSnapshot(snapshot) as fuel_snapshot:
+        for snapshot in snapshots:
+            cls.process_snapshot(snapshot)
 
-                if cls.args.astute:
-                    fuel_snapshot.parse_astute_log(
-                        show_mcagent=cls.args.mcagent,
-                        show_full=cls.args.full,
+    @classmethod
+    def process_snapshot(cls, snapshot):
+        """
+        Extract the logs from a single snapshot and process the logs
+        :param snapshot: path to the snapshot file
+        :type snapshot: str
+        :return:
+        """
+        with FuelSnapshot(snapshot) as fuel_snapshot:
 
-                    )
+            if cls.args.astute and cls.args.timeline:
+                fuel_snapshot.astute_timeline(
+                    output_format=cls.args.timeline_format,
+                    top=cls.args.top,
+                )
+            elif cls.args.astute:
+                fuel_snapshot.parse_astute_log(
+                    show_mcagent=cls.args.mcagent,
+                    show_full=cls.args.full,
 
-                cls.separator()
+                )
 
-                if cls.args.puppet:
-                    fuel_snapshot.parse_puppet_logs(
-                        enable_sort=cls.args.sort,
-                        show_evals=cls.args.evals,
-                        show_full=cls.args.full,
-                    )
+            cls.separator()
+
+            if cls.args.puppet and cls.args.profile:
+                fuel_snapshot.profile_puppet_logs(
+                    output_format=cls.args.profile_format,
+                    top=cls.args.top,
+                )
+            elif cls.args.puppet:
+                fuel_snapshot.parse_puppet_logs(
+                    enable_sort=cls.args.sort,
+                    show_evals=cls.args.evals,
+                    show_full=cls.args.full,
+                    jobs=cls.args.jobs,
+                )
 
     @classmethod
     def process_logs(cls):
@@ -117,6 +193,11 @@ class IO(object):
         if cls.args.astute:
             if cls.args.clear:
                 fuel_logs.clear_astute_logs()
+            elif cls.args.timeline:
+                fuel_logs.astute_timeline(
+                    output_format=cls.args.timeline_format,
+                    top=cls.args.top,
+                )
             else:
                 fuel_logs.parse_astute_logs(
                     show_mcagent=cls.args.mcagent,
@@ -128,13 +209,61 @@ class IO(object):
         if cls.args.puppet:
             if cls.args.clear:
                 fuel_logs.clear_puppet_logs()
+            elif cls.args.profile:
+                fuel_logs.profile_puppet_logs(
+                    output_format=cls.args.profile_format,
+                    top=cls.args.top,
+                )
             else:
                 fuel_logs.parse_puppet_logs(
                     enable_sort=cls.args.sort,
                     show_evals=cls.args.evals,
                     show_full=cls.args.full,
+                    jobs=cls.args.jobs,
                 )
 
+    @classmethod
+    def process_index(cls):
+        """
+        Ingest the snapshots into the log index and query it
+        :return:
+        """
+        snapshots = [snapshot for snapshot in cls.args.snapshots
+                     if os.path.isfile(snapshot)]
+        sources = []
+        if cls.args.astute:
+            sources.append('astute')
+        if cls.args.puppet:
+            sources.append('puppet')
+        filters = {
+            'source': sources,
+            'node': cls.args.node,
+            'type': cls.args.type,
+            'task': cls.args.task,
+            'grep': cls.args.grep,
+        }
+
+        with LogIndex(cls.args.index) as index:
+            for snapshot in snapshots:
+                with FuelSnapshot(snapshot) as fuel_snapshot:
+                    index.ingest(fuel_snapshot)
+
+            if snapshots and not any(filters[key] for key in filters
+                                     if key != 'source') \
+                    and not cls.args.count_by and not cls.args.limit:
+                return
+
+            if cls.args.count_by:
+                for row in index.aggregate(cls.args.count_by, filters,
+                                           cls.args.limit):
+                    value, count, first, last = row
+                    cls.output('%8d %s %s %s' % (count, first or '-',
+                                                 last or '-', value or '-'))
+            else:
+                for row in index.query(filters, cls.args.order,
+                                       cls.args.limit):
+                    cls.output(' '.join(field or '-' for field in row))
+
     @classmethod
     def main(cls):
         """
@@ -146,7 +275,9 @@ class IO(object):
         if cls.args.less:
             cls.open_pager()
 
-        if len(cls.args.snapshots) == 0:
+        if cls.args.index:
+            cls.process_index()
+        elif len(cls.args.snapshots) == 0:
             cls.process_logs()
         else:
             cls.process_snapshots()
@@ -188,6 +319,22 @@ class IO(object):
         else:
             cls.pipe.write(line)
 
+    @classmethod
+    def output_file(cls, path):
+        """
+        Output the content of a file made by a worker process
+        and remove the file
+        :param path: path to the file
+        :type path: str
+        :return:
+        """
+        try:
+            with open(path, 'r') as output:
+                for line in output:
+                    cls.output(line)
+        finally:
+            os.unlink(path)
+
     @classmethod
     def options(cls):
         """
@@ -227,6 +374,57 @@ class IO(object):
                             action="store_true",
                             default=False,
                             help='Full output without filters')
+        parser.add_argument("--jobs", "-j",
+                            metavar='N',
+                            type=int,
+                            default=1,
+                            help='Number of worker processes')
+        parser.add_argument("--profile",
+                            action="store_true",
+                            default=False,
+                            help='Profile Puppet resource evaluation instead '
+                                 'of the Puppet logs output')
+        parser.add_argument("--profile-format",
+                            choices=('text', 'json', 'flamegraph'),
+                            default='text',
+                            help='Profile: output format')
+        parser.add_argument("--timeline",
+                            action="store_true",
+                            default=False,
+                            help='Show Astute deployment tasks timeline '
+                                 'instead of the Astute log output')
+        parser.add_argument("--timeline-format",
+                            choices=('text', 'chrome'),
+                            default='text',
+                            help='Timeline: output format')
+        parser.add_argument("--top",
+                            metavar='N',
+                            type=int,
+                            default=10,
+                            help='Profile and timeline: number of the '
+                                 'slowest resources and tasks')
+        parser.add_argument("--index", "-i",
+                            metavar='FILE',
+                            help='Ingest the snapshots into this SQLite index '
+                                 'and query it instead of the output')
+        parser.add_argument("--node",
+                            help='Index query: records of this node')
+        parser.add_argument("--type",
+                            help='Index query: records caught by this rule')
+        parser.add_argument("--task",
+                            help='Index query: records of this task')
+        parser.add_argument("--grep",
+                            help='Index query: records with this text')
+        parser.add_argument("--order",
+                            choices=LogIndex.columns,
+                            default='time',
+                            help='Index query: sort the records by')
+        parser.add_argument("--count-by",
+                            choices=LogIndex.columns,
+                            help='Index query: count the records grouped by')
+        parser.add_argument("--limit",
+                            type=int,
+                            help='Index query: show only this number of rows')
         parser.add_argument('snapshots',
                             metavar='SNAPSHOT',
                             type=str,
@@ -240,6 +438,53 @@ class IO(object):
         return cls.args
 
 
+class MarkerTable(object):
+    """
+    The set of the record catching rules compiled to a single regexp.
+    Every rule is a tuple of the rule name, the list of include markers
+    and the list of exclude markers. A record is caught by the rule if any
+    of its include markers is found in the record and none of its exclude
+    markers is. Most of the records have no include markers at all and
+    are skipped after one regexp search instead of the substring scans
+    for every marker of every rule.
+    """
+
+    def __init__(self, rules):
+        self.rules = [(name, frozenset(include), frozenset(exclude or ()))
+                      for name, include, exclude in rules]
+        include_markers = set()
+        self.markers = set()
+        for _, include, exclude in self.rules:
+            include_markers |= include
+            self.markers |= include | exclude
+        self.regexp = re.compile('|'.join(
+            re.escape(marker) for marker in
+            sorted(include_markers, key=len, reverse=True)))
+
+    def extend(self, rules):
+        """
+        Make a new table with the additional rules
+        :param rules: list of rule tuples
+        :type rules: list
+        :rtype: MarkerTable
+        """
+        return MarkerTable(self.rules + list(rules))
+
+    def match(self, record):
+        """
+        Find the rules catching this record
+        :param record: log record
+        :type record: str
+        :return: list of the rule names
+        :rtype: list
+        """
+        if not self.regexp.search(record):
+            return []
+        found = {marker for marker in self.markers if marker in record}
+        return [name for name, include, exclude in self.rules
+                if include & found and not exclude & found]
+
+
 class AbstractLog(object):
     """
     The abstract log object with common methods
@@ -286,6 +531,19 @@ class AbstractLog(object):
         if match:
             self.add_record(record)
 
+    @staticmethod
+    def lines(content):
+        """
+        Iterate through the lines of the log content
+        :param content: the whole log content or an opened binary
+                        file object which is read line by line
+        :type content: bytes, file
+        :return: iter
+        """
+        if isinstance(content, bytes):
+            return iter(content.splitlines())
+        return (line.rstrip(b'\r\n') for line in content)
+
     def each_record(self):
         """
         Abstract record iterator that interates
@@ -295,24 +553,63 @@ class AbstractLog(object):
         for record in self.content:
             yield record.decode()
 
+    def process_record(self, record):
+        """
+        Abstract record processor that adds every record
+        :param record: log record
+        :type record: str
+        :return:
+        """
+        self.add_record(record)
+
     def parse(self, content):
         """
-        Abstract parser that adds every line
+        Parse the log content and collect the records
         :param content: Input log content
-        :type content: str
+        :type content: bytes, file
         :return:
         """
-        self.content = content.splitlines()
+        self.content = self.lines(content)
         for record in self.each_record():
-            self.add_record(record)
+            self.process_record(record)
+
+    def stream(self, content):
+        """
+        Parse the log content and yield the collected records one by one
+        without keeping them, so the memory usage does not depend
+        on the log size
+        :param content: Input log content
+        :type content: bytes, file
+        :return: iter
+        """
+        self.content = self.lines(content)
+        for record in self.each_record():
+            self.process_record(record)
+            while self.log:
+                yield self.log.pop(0)
+
+    def format_record(self, record):
+        """
+        Make the output line from the collected record
+        :param record: collected record
+        :return: line or None if the record should not be shown
+        :rtype: str
+        """
+        return record
 
-    def output(self):
+    def output(self, records=None):
         """
         Output the parsed log content
+        :param records: iterator of the records to output instead
+                        of the collected ones
         :return:
         """
-        for record in self.log:
-            IO.output(record)
+        if records is None:
+            records = self.log
+        for record in records:
+            line = self.format_record(record)
+            if line:
+                IO.output(line)
 
     @staticmethod
     def normalize_record(record):
@@ -347,120 +644,125 @@ class AstuteLog(AbstractLog):
         show_mcagent    enable or disable MCAgent debug strings
     """
 
+    markers = MarkerTable([
+        # RPC calls from Nailgun to Astute
+        ('rpc_call', ['Processing RPC call'], None),
+        # RPC casts from Astute to Nailgun
+        ('rpc_cast', ['Casting message to Nailgun'],
+         ['deploying', 'provisioning']),
+        # modular task status reports
+        ('task_status', ['Task'], ['deploying']),
+        # modular task run debug structures
+        ('task_run', ['run task'], None),
+        # Astute pre/post deploy hooks debug structures
+        ('hook_run', ['Run hook'], None),
+    ])
+
+    mcagent_markers = markers.extend([
+        # cmd execution debug reports
+        ('cmd_exec', ['cmd:', 'stdout:', 'stderr:'], None),
+        # MCAgent call traces
+        ('mc_agent_results', ['MC agent'], ['puppetd']),
+    ])
+
+    date_regexp = re.compile(r'\d+-\d+-\S+\s')
+
+    time_regexp = re.compile(r'(\d+-\d+-\d+)[T ](\d+:\d+:\d+(?:\.\d+)?)')
+
+    node_regexps = [
+        re.compile(r'"uids?"\s*(?:=>|:)\s*\[?\s*"(\d+)"'),
+        re.compile(r'\bnode[- ](\d+)\b'),
+    ]
+
+    task_regexps = [
+        re.compile(r'Task time summary: (\S+)'),
+        re.compile(r'"id"\s*(?:=>|:)\s*"([^"]+)"'),
+        re.compile(r'/modular/([^/]+)/[^/"]+\.pp'),
+    ]
+
     def __init__(self):
         self.show_mcagent = False
         self.show_full = False
         super(AstuteLog, self).__init__()
 
-    def parse(self, content):
-        """
-        Parse the string containing the log content
-        :param content: the log file content
-        :type content: str
-        :return:
-        """
-        self.content = content.splitlines()
-        for record in self.each_record():
-            if self.show_full:
-                self.add_record(record)
-            else:
-                self.rpc_call(record)
-                self.rpc_cast(record)
-                self.task_status(record)
-                self.task_run(record)
-                self.hook_run(record)
-                if self.show_mcagent:
-                    self.cmd_exec(record)
-                    self.mc_agent_results(record)
-
-    def each_record(self):
-        """
-        Iterates through the multi line records of the log file
-        :return: iter
-        """
-        record = ''
-        date_regexp = re.compile(r'^\d+-\d+-\S+\s')
-        for bline in self.content:
-            line = bline.decode()
-            if re.match(date_regexp, line):
-                yield record
-                record = line
-            else:
-                record += line
-        yield record
-
-    def rpc_call(self, record):
-        """
-        Catch the lines with RPC calls from Nailgun to Astute
-        :param record: log record
-        :type record: str
-        :return:
-        """
-        include_markers = ['Processing RPC call']
-        self.catch_record(record, include_markers)
-
-    def rpc_cast(self, record):
-        """
-        Catch the lines with RPC casts from Astute to Nailgun
-        :param record: log record
-        :type record: str
-        :return:
-        """
-        include_markers = ['Casting message to Nailgun']
-        exclude_markers = ['deploying', 'provisioning']
-        self.catch_record(record, include_markers, exclude_markers)
-
-    def task_status(self, record):
-        """
-        Catch the lines with modular task status reports
-        :param record: log record
-        :type record: str
-        :return:
-        """
-        include_markers = ['Task']
-        exclude_markers = ['deploying']
-        self.catch_record(record, include_markers, exclude_markers)
-
-    def task_run(self, record):
+    @staticmethod
+    def search(regexps, record):
         """
-        Catch the lines with modular task run debug structures
+        Find the first group of the first matching regexp
+        :param regexps: list of compiled regexps
+        :type regexps: list
         :param record: log record
         :type record: str
-        :return:
+        :rtype: str
         """
-        include_markers = ['run task']
-        self.catch_record(record, include_markers)
+        for regexp in regexps:
+            match = regexp.search(record)
+            if match:
+                return match.group(1)
 
-    def hook_run(self, record):
+    def index_records(self, content):
         """
-        Catch the lines with Astute pre/post deploy hooks debug structures
-        :param record: log record
-        :type record: str
-        :return:
-        """
-        include_markers = ['Run hook']
-        self.catch_record(record, include_markers)
-
-    def cmd_exec(self, record):
+        Parse the log content and yield the records for the log index,
+        one for every rule catching the record
+        :param content: Input log content
+        :type content: bytes, file
+        :return: iter of dicts
         """
-        Catch the lines with cmd execution debug reports
+        self.content = self.lines(content)
+        for record in self.each_record():
+            types = self.mcagent_markers.match(record)
+            if not types:
+                continue
+            line = self.normalize_record(record).rstrip('\n')
+            time = self.time_regexp.match(line)
+            if time:
+                time = '%sT%s' % time.groups()
+            node = self.search(self.node_regexps, line)
+            if node:
+                node = 'node-%s' % node
+            task = self.search(self.task_regexps, line)
+            for record_type in types:
+                yield {
+                    'time': time,
+                    'node': node,
+                    'type': record_type,
+                    'task': task,
+                    'line': line,
+                }
+
+    def process_record(self, record):
+        """
+        Collect the record if it is interesting.
+        The record is collected once for every rule catching it.
         :param record: log record
         :type record: str
         :return:
         """
-        include_markers = ['cmd:', 'stdout:', 'stderr:']
-        self.catch_record(record, include_markers)
+        if self.show_full:
+            self.add_record(record)
+            return
+        if self.show_mcagent:
+            markers = self.mcagent_markers
+        else:
+            markers = self.markers
+        for _ in markers.match(record):
+            self.add_record(record)
 
-    def mc_agent_results(self, record):
+    def each_record(self):
         """
-        Catch the lines with MCAgent call traces
-        :param record: log record
-        :type record: str
-        :return:
+        Iterates through the multi line records of the log file
+        :return: iter
         """
-        include_markers = ['MC agent']
-        exclude_markers = ['puppetd']
-        self.catch_record(record, include_markers, exclude_markers)
+        record = ['']
+        match = self.date_regexp.match
+        for bline in self.content:
+            line = bline.decode()
+            if line[:1].isdigit() and match(line):
+                yield ''.join(record)
+                record = [line]
+            else:
+                record.append(line)
+        yield ''.join(record)
 
 
 class PuppetLog(AbstractLog):
@@ -472,6 +774,25 @@ class PuppetLog(AbstractLog):
         enable_sort sorting log lines by event time
     """
 
+    markers = MarkerTable([
+        # lines that are marked as 'err:'
+        ('err_line', ['err:'], None),
+        # end of the catalog compilation and start of the catalog run
+        ('catalog_start', ['Compiled catalog for'], None),
+        # end of the catalog run
+        ('catalog_end', ['Finished catalog run'], None),
+        # MODULAR marker of the modular tasks
+        ('catalog_modular', ['MODULAR'], None),
+    ])
+
+    evals_markers = markers.extend([
+        # evaltrace lines marking every resource processing start and end
+        ('resource_evaluation',
+         ['Starting to evaluate the resource', 'Evaluated in'], None),
+    ])
+
+    modular_regexp = re.compile(r'MODULAR: (?:\S*/)?(\S+?)(?:\.pp)?(?:\s|$)')
+
     def __init__(self):
         self.log_name = None
         self.show_evals = False
@@ -479,24 +800,59 @@ class PuppetLog(AbstractLog):
         self.show_full = False
         super(PuppetLog, self).__init__()
 
-    def parse(self, content):
+    def process_record(self, record):
         """
-        Parse the sting with Puppet log content
-        :param content: Puppet log
-        :type content: str
+        Collect the Puppet log line if it is interesting
+        :param record: log line
+        :type record: str
         :return:
         """
-        self.content = content.splitlines()
-        for record in self.each_record():
-            if self.show_full:
-                self.add_record(record)
-            else:
-                self.err_line(record)
-                self.catalog_start(record)
-                self.catalog_end(record)
-                self.catalog_modular(record)
-                if self.show_evals:
-                    self.resource_evaluation(record)
+        if self.show_full:
+            self.add_record(record)
+            return
+        if self.show_evals:
+            markers = self.evals_markers
+        else:
+            markers = self.markers
+        for _ in markers.match(record):
+            self.add_record(record)
+
+    def copy(self, log_name):
+        """
+        Make a parser with the same options for another log file.
+        Every parser has its own log name, so several logs
+        can be streamed at once.
+        :param log_name: name of the log file
+        :type log_name: str
+        :rtype: PuppetLog
+        """
+        parser = PuppetLog()
+        parser.show_evals = self.show_evals
+        parser.enable_sort = self.enable_sort
+        parser.show_full = self.show_full
+        parser.log_name = log_name
+        return parser
+
+    @staticmethod
+    def record_time(record):
+        """
+        Sorting key of the collected records
+        :param record: collected record
+        :type record: dict
+        :rtype: datetime
+        """
+        return record.get('time', None)
+
+    @classmethod
+    def merge(cls, streams):
+        """
+        Merge the record streams of several log files, which
+        are already ordered by time, into a single ordered stream
+        :param streams: list of record iterators
+        :type streams: list
+        :return: iter
+        """
+        return heapq.merge(*streams, key=cls.record_time)
 
     @staticmethod
     def node_name(string):
@@ -512,30 +868,70 @@ class PuppetLog(AbstractLog):
         if match:
             return match.group(0)
 
-    def output(self):
+    def index_records(self, content):
+        """
+        Parse the Puppet log content and yield the records for the log
+        index, one for every rule catching the line. The records are
+        marked with the last modular task started before them.
+        :param content: Input log content
+        :type content: bytes, file
+        :return: iter of dicts
+        """
+        node = self.node_name(self.log_name or '')
+        task = None
+        self.content = self.lines(content)
+        for line in self.each_record():
+            types = self.evals_markers.match(line)
+            if not types:
+                continue
+            record = self.convert_record(line)
+            if not record:
+                continue
+            if 'catalog_modular' in types:
+                match = self.modular_regexp.search(record['line'])
+                if match:
+                    task = match.group(1)
+            for record_type in types:
+                yield {
+                    'time': record['time'].isoformat(),
+                    'node': node,
+                    'type': record_type,
+                    'task': task,
+                    'line': record['line'].rstrip('\n'),
+                }
+
+    def format_record(self, record):
+        """
+        Make the output line with the node name and the event time
+        :param record: collected record
+        :type record: dict
+        :rtype: str
+        """
+        log = record.get('log', None)
+        time = record.get('time', None)
+        line = record.get('line', None)
+        if not (log and time and line):
+            return
+        return "%s %s %s" % (self.node_name(log), time.isoformat(), line)
+
+    def output(self, records=None):
         """
         Output the collected log lines sorting
         them if enabled
+        :param records: iterator of the records to output instead
+                        of the collected ones
         :return:
         """
-        if self.enable_sort:
+        if records is None and self.enable_sort:
             self.sort_log()
-        for record in self.log:
-            log = record.get('log', None)
-            time = record.get('time', None)
-            line = record.get('line', None)
-            if not (log and time and line):
-                continue
-            IO.output("%s %s %s" % (self.node_name(log),
-                                    time.isoformat(), line))
+        super(PuppetLog, self).output(records)
 
     def sort_log(self):
         """
         Sort the collected log lines bu the event date and time
         :return:
         """
-        self.log = sorted(self.log,
-                          key=lambda record: record.get('time', None))
+        self.log = sorted(self.log, key=self.record_time)
 
     def convert_record(self, line):
         """
@@ -571,59 +967,479 @@ class PuppetLog(AbstractLog):
         if record:
             self.log.append(record)
 
-    def err_line(self, record):
+
+class TaskTimeline(object):
+    """
+    The runs of the deployment tasks on the nodes.
+    Every task run is a dict with 'node', 'task', 'start'
+    and 'end' keys, where 'start' and 'end' are datetime.
+    Attributes:
+        tasks   list of the task runs
+    """
+
+    def __init__(self):
+        self.tasks = []
+
+    @staticmethod
+    def seconds(delta):
+        """
+        Convert the timedelta to seconds
+        :type delta: timedelta
+        :rtype: float
+        """
+        return delta.days * 86400 + delta.seconds + delta.microseconds / 1e6
+
+    def task_duration(self, task):
         """
-        Catch lines that are marked as 'err:'
-        :param record: log line
-        :type record: str
-        :return:
+        Duration of the task run in seconds
+        :type task: dict
+        :rtype: float
         """
-        include_markers = ['err:']
-        self.catch_record(record, include_markers)
+        return self.seconds(task['end'] - task['start'])
 
-    def catalog_end(self, record):
+    def slowest_tasks(self, top=None):
         """
-        Catch the end of the catalog run
-        :param record: log line
-        :type record: str
+        The task runs sorted by the duration
+        :param top: number of the tasks to return
+        :type top: int
+        :rtype: list
+        """
+        return sorted(self.tasks, key=self.task_duration, reverse=True)[:top]
+
+    def critical_path(self):
+        """
+        Find the chain of the task runs which defines the
+        deployment time. It starts from the task which has finished last
+        and steps back to the task which has finished last before the
+        start of the current one on any node.
+        :return: list of the task runs in the order of time
+        :rtype: list
+        """
+        path = []
+        visited = set()
+        tasks = sorted(self.tasks, key=lambda task: task['end'])
+        current = tasks[-1] if tasks else None
+        while current:
+            path.append(current)
+            visited.add(id(current))
+            current = None
+            for task in reversed(tasks):
+                if task['end'] <= path[-1]['start'] and \
+                        id(task) not in visited:
+                    current = task
+                    break
+        return list(reversed(path))
+
+    def idle_gaps(self):
+        """
+        Find the time between the task runs on every node
+        :return: list of the gaps with 'node', 'after', 'before', 'start',
+                 'end' and 'duration' keys sorted by the duration
+        :rtype: list
+        """
+        gaps = []
+        nodes = {}
+        for task in self.tasks:
+            nodes.setdefault(task['node'], []).append(task)
+        for node, tasks in nodes.items():
+            tasks = sorted(tasks, key=lambda task: task['start'])
+            end = None
+            previous = None
+            for task in tasks:
+                if end is not None and task['start'] > end:
+                    gaps.append({
+                        'node': node,
+                        'after': previous['task'],
+                        'before': task['task'],
+                        'start': end,
+                        'end': task['start'],
+                        'duration': self.seconds(task['start'] - end),
+                    })
+                if end is None or task['end'] > end:
+                    end = task['end']
+                    previous = task
+        return sorted(gaps, key=lambda gap: gap['duration'], reverse=True)
+
+    def critical_path_duration(self, path):
+        """
+        Time from the start of the first task of the path
+        to the end of the last one in seconds
+        :param path: result of critical_path()
+        :type path: list
+        :rtype: float
+        """
+        if not path:
+            return 0
+        return self.seconds(path[-1]['end'] - path[0]['start'])
+
+    def task_report(self, task):
+        """
+        Make the JSON friendly report of the task run
+        :type task: dict
+        :rtype: dict
+        """
+        report = dict(task)
+        report['start'] = task['start'].isoformat()
+        report['end'] = task['end'].isoformat()
+        report['duration'] = self.task_duration(task)
+        return report
+
+
+class PuppetProfile(TaskTimeline):
+    """
+    Puppet evaltrace profiler. It pairs the start and the end evaltrace
+    lines of every resource on every node and finds the slowest
+    resources, the slowest modular tasks and the critical path of
+    the modular tasks across the nodes.
+    Attributes:
+        resources   list of the evaluated resources
+        tasks       list of the modular task runs
+    """
+
+    start_regexp = re.compile(r'\((.+)\) Starting to evaluate the resource')
+    end_regexp = re.compile(r'\((.+)\) Evaluated in ([\d.]+) seconds')
+    frame_regexp = re.compile(r'(?:[^/\[]|\[[^\]]*\])+')
+
+    def __init__(self):
+        super(PuppetProfile, self).__init__()
+        self.resources = []
+
+    def add_log(self, log_name, content):
+        """
+        Parse the Puppet log with evaltrace lines
+        :param log_name: name of the log file
+        :type log_name: str
+        :param content: Input log content
+        :type content: bytes, file
         :return:
         """
-        include_markers = ['Finished catalog run']
-        self.catch_record(record, include_markers)
+        parser = PuppetLog()
+        parser.show_evals = True
+        parser.log_name = log_name
+        node = parser.node_name(log_name) or log_name
+        started = {}
+        task = None
+        for record in parser.stream(content):
+            time = record['time']
+            line = record['line']
+            match = parser.modular_regexp.search(line)
+            if match:
+                task = {
+                    'node': node,
+                    'task': match.group(1),
+                    'start': time,
+                    'end': time,
+                    'resources': 0,
+                }
+                self.tasks.append(task)
+                continue
+            if task:
+                task['end'] = time
+            match = self.start_regexp.search(line)
+            if match:
+                started[match.group(1)] = time
+                continue
+            match = self.end_regexp.search(line)
+            if not match:
+                continue
+            resource = match.group(1)
+            start = started.pop(resource, None)
+            self.resources.append({
+                'node': node,
+                'task': task['task'] if task else None,
+                'resource': resource,
+                'start': start,
+                'end': time,
+                'duration': float(match.group(2)),
+            })
+            if task:
+                task['resources'] += 1
+
+    def slowest_resources(self, top=None):
+        """
+        The resources sorted by the evaluation time
+        :param top: number of the resources to return
+        :type top: int
+        :rtype: list
+        """
+        resources = sorted(self.resources,
+                           key=lambda resource: resource['duration'],
+                           reverse=True)
+        return resources[:top]
+
+    def frames(self, resource):
+        """
+        Make the flame graph stack frames of the resource
+        :type resource: dict
+        :rtype: list
+        """
+        frames = [resource['node'], resource['task'] or 'none']
+        frames.extend(self.frame_regexp.findall(resource['resource']))
+        return [frame.replace(';', ':').replace(' ', '_') for frame in frames]
+
+    def output_flamegraph(self):
+        """
+        Output the resource evaluation times in the collapsed stack format
+        of flamegraph.pl, the values are milliseconds
+        :return:
+        """
+        stacks = {}
+        for resource in self.resources:
+            stack = ';'.join(self.frames(resource))
+            stacks[stack] = stacks.get(stack, 0) + resource['duration']
+        for stack in sorted(stacks):
+            IO.output('%s %d' % (stack, round(stacks[stack] * 1000)))
 
-    def catalog_start(self, record):
+    def report(self, top):
         """
-        Catch the end of the catalog compilation and start of the catalog run
-        :param record: log line
-        :type record: str
+        Make the profile report structure
+        :param top: number of the slowest resources and tasks
+        :type top: int
+        :rtype: dict
+        """
+        def resource_report(resource):
+            report = dict(resource)
+            for key in ('start', 'end'):
+                if report[key]:
+                    report[key] = report[key].isoformat()
+            return report
+
+        path = self.critical_path()
+        return {
+            'resources': [resource_report(resource)
+                          for resource in self.slowest_resources(top)],
+            'tasks': [self.task_report(task)
+                      for task in self.slowest_tasks(top)],
+            'critical_path': {
+                'duration': self.critical_path_duration(path),
+                'tasks': [self.task_report(task) for task in path],
+            },
+        }
+
+    def output_json(self, top):
+        """
+        Output the profile report as JSON
+        :param top: number of the slowest resources and tasks
+        :type top: int
         :return:
         """
-        include_markers = ['Compiled catalog for']
-        self.catch_record(record, include_markers)
+        IO.output(json.dumps(self.report(top), indent=2, sort_keys=True))
 
-    def catalog_modular(self, record):
+    def output_text(self, top):
         """
-        Catch the MODULAR marker of the modular tasks
-        :param record: log line
-        :type record: str
+        Output the profile report as text
+        :param top: number of the slowest resources and tasks
+        :type top: int
         :return:
         """
-        include_markers = ['MODULAR']
-        self.catch_record(record, include_markers)
+        report = self.report(top)
+        IO.output('Slowest resources:')
+        for resource in report['resources']:
+            IO.output('%10.2f %s %s %s' % (
+                resource['duration'], resource['node'],
+                resource['task'] or '-', resource['resource']))
+        IO.output('Slowest modular tasks:')
+        for task in report['tasks']:
+            IO.output('%10.2f %s %s %d resources' % (
+                task['duration'], task['node'], task['task'],
+                task['resources']))
+        IO.output('Critical path: %.2f seconds' % (
+            report['critical_path']['duration']))
+        for task in report['critical_path']['tasks']:
+            IO.output('%10.2f %s %s %s %s' % (
+                task['duration'], task['start'], task['end'],
+                task['node'], task['task']))
+
+    def output(self, output_format='text', top=10):
+        """
+        Output the profile
+        :param output_format: 'text', 'json' or 'flamegraph'
+        :type output_format: str
+        :param top: number of the slowest resources and tasks
+        :type top: int
+        :return:
+        """
+        if output_format == 'json':
+            self.output_json(top)
+        elif output_format == 'flamegraph':
+            self.output_flamegraph()
+        else:
+            self.output_text(top)
+
+
+class AstuteTimeline(TaskTimeline):
+    """
+    Deployment tasks timeline rebuilt from the Astute log.
+    A task run starts with the 'run task' record for its nodes and
+    ends with the 'Task time summary' record for the node, or with
+    the start of the next task on the node if there is no summary.
+    Attributes:
+        calls   list of the RPC calls and casts
+    """
+
+    uids_regexp = re.compile(r'"uids?"\s*(?:=>|:)\s*\[([^\]]*)\]')
+    summary_regexp = re.compile(
+        r'Task time summary: (\S+) with status (\S+) on node (\d+)')
+    call_regexp = re.compile(r"Processing RPC call '?(\w+)")
+
+    def __init__(self):
+        super(AstuteTimeline, self).__init__()
+        self.calls = []
+
+    @staticmethod
+    def parse_time(time):
+        """
+        Parse the time of the Astute record
+        :param time: time in ISO format
+        :type time: str
+        :rtype: datetime
+        """
+        if '.' in time:
+            return datetime.strptime(time, "%Y-%m-%dT%H:%M:%S.%f")
+        return datetime.strptime(time, "%Y-%m-%dT%H:%M:%S")
 
-    def resource_evaluation(self, record):
+    def add_log(self, content):
         """
-        Catch the evaltrace lines marking every resource
-        processing start and end
-        :param record: log line
-        :type record: str
+        Parse the Astute log and add its task runs to the timeline
+        :param content: Input log content
+        :type content: bytes, file
         :return:
         """
-        include_markers = [
-            'Starting to evaluate the resource',
-            'Evaluated in',
-        ]
-        self.catch_record(record, include_markers)
+        running = {}
+        for record in AstuteLog().index_records(content):
+            if not record['time']:
+                continue
+            time = self.parse_time(record['time'])
+            line = record['line']
+            if record['type'] in ('rpc_call', 'rpc_cast'):
+                match = self.call_regexp.search(line)
+                self.calls.append({
+                    'time': time,
+                    'type': record['type'],
+                    'name': match.group(1) if match else record['type'],
+                })
+            elif record['type'] == 'task_run':
+                match = self.uids_regexp.search(line)
+                if match:
+                    nodes = re.findall(r'\d+', match.group(1))
+                elif record['node']:
+                    nodes = [record['node'].split('-')[-1]]
+                else:
+                    nodes = []
+                for uid in nodes:
+                    node = 'node-%s' % uid
+                    if node in running:
+                        running.pop(node)['end'] = time
+                    task = {
+                        'node': node,
+                        'task': record['task'] or 'unknown',
+                        'start': time,
+                        'end': time,
+                        'status': None,
+                    }
+                    running[node] = task
+                    self.tasks.append(task)
+            elif record['type'] == 'task_status':
+                match = self.summary_regexp.search(line)
+                if not match:
+                    continue
+                name, status, uid = match.groups()
+                node = 'node-%s' % uid
+                task = running.get(node)
+                if task and task['task'] in (name, 'unknown'):
+                    running.pop(node)
+                    task['task'] = name
+                    task['end'] = time
+                    task['status'] = status
+
+    def chrome_trace(self):
+        """
+        Make the timeline in the Chrome trace event format, which can
+        be loaded to chrome://tracing. Every node is a thread.
+        :rtype: dict
+        """
+        times = [task['start'] for task in self.tasks]
+        times.extend(call['time'] for call in self.calls)
+        if not times:
+            return {'traceEvents': []}
+        origin = min(times)
+
+        def microseconds(time):
+            return int(self.seconds(time - origin) * 1e6)
+
+        nodes = sorted({task['node'] for task in self.tasks},
+                       key=lambda node: int(node.split('-')[-1]))
+        threads = {node: number + 1 for number, node in enumerate(nodes)}
+        events = [{
+            'name': 'thread_name',
+            'ph': 'M',
+            'pid': 1,
+            'tid': threads[node],
+            'args': {'name': node},
+        } for node in nodes]
+        for task in self.tasks:
+            events.append({
+                'name': task['task'],
+                'cat': task['status'] or 'unknown',
+                'ph': 'X',
+                'pid': 1,
+                'tid': threads[task['node']],
+                'ts': microseconds(task['start']),
+                'dur': microseconds(task['end']) - microseconds(
+                    task['start']),
+                'args': {'status': task['status']},
+            })
+        for call in self.calls:
+            events.append({
+                'name': call['name'],
+                'cat': call['type'],
+                'ph': 'i',
+                's': 'g',
+                'pid': 1,
+                'tid': 0,
+                'ts': microseconds(call['time']),
+            })
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def output_text(self, top):
+        """
+        Output the timeline report as text
+        :param top: number of the slowest tasks and the longest gaps
+        :type top: int
+        :return:
+        """
+        IO.output('Slowest tasks:')
+        for task in self.slowest_tasks(top):
+            IO.output('%10.2f %s %s %s' % (
+                self.task_duration(task), task['node'], task['task'],
+                task['status'] or '-'))
+        IO.output('Longest idle gaps:')
+        for gap in self.idle_gaps()[:top]:
+            IO.output('%10.2f %s %s %s -> %s' % (
+                gap['duration'], gap['start'].isoformat(), gap['node'],
+                gap['after'], gap['before']))
+        path = self.critical_path()
+        IO.output('Critical path: %.2f seconds' % (
+            self.critical_path_duration(path)))
+        for task in path:
+            IO.output('%10.2f %s %s %s %s %s' % (
+                self.task_duration(task), task['start'].isoformat(),
+                task['end'].isoformat(), task['node'], task['task'],
+                task['status'] or '-'))
+
+    def output(self, output_format='text', top=10):
+        """
+        Output the timeline
+        :param output_format: 'text' or 'chrome'
+        :type output_format: str
+        :param top: number of the slowest tasks and the longest gaps
+        :type top: int
+        :return:
+        """
+        if output_format == 'chrome':
+            IO.output(json.dumps(self.chrome_trace(), sort_keys=True))
+        else:
+            self.output_text(top)
 
 
 class FuelSnapshot(object):
@@ -698,8 +1514,52 @@ class FuelSnapshot(object):
         :type parser PuppetLog, AstuteLog
         """
         log = self.snapshot.extractfile(log_file)
-        content = log.read()
-        parser.parse(content)
+        parser.parse(log)
+
+    def stream_log(self, log_file, parser):
+        """
+        Extract the log from the snapshot line by line
+        and yield the records found by the parser object
+        :param log_file Path to the log file in the archive
+        :type log_file str
+        :param parser Parser object
+        :type parser PuppetLog, AstuteLog
+        :return: iter
+        """
+        log = self.snapshot.extractfile(log_file)
+        for record in parser.stream(log):
+            yield record
+
+    def spool_log(self, log_file, parser):
+        """
+        Copy the log from the snapshot to a temporary file and yield
+        the records found by the parser object. Several spooled logs can
+        be read simultaneously without seeking inside the compressed
+        archive.
+        :param log_file Path to the log file in the archive
+        :type log_file str
+        :param parser Parser object
+        :type parser PuppetLog, AstuteLog
+        :return: iter
+        """
+        with tempfile.TemporaryFile() as spool:
+            shutil.copyfileobj(self.snapshot.extractfile(log_file), spool)
+            spool.seek(0)
+            for record in parser.stream(spool):
+                yield record
+
+    def extract_log(self, log_file):
+        """
+        Copy the log from the snapshot to a temporary file
+        which can be read by a worker process
+        :param log_file Path to the log file in the archive
+        :type log_file str
+        :return: path to the temporary file
+        :rtype: str
+        """
+        with tempfile.NamedTemporaryFile(delete=False) as log:
+            shutil.copyfileobj(self.snapshot.extractfile(log_file), log)
+        return log.name
 
     def parse_astute_log(self,
                          show_mcagent=False,
@@ -713,32 +1573,83 @@ class FuelSnapshot(object):
         astute_logs = AstuteLog()
         astute_logs.show_mcagent = show_mcagent
         astute_logs.show_full = show_full
+        astute_logs.output(itertools.chain.from_iterable(
+            self.stream_log(astute_log, astute_logs)
+            for astute_log in self.astute_logs()))
+
+    def astute_timeline(self, output_format='text', top=10):
+        """
+        Rebuild the deployment tasks timeline from
+        the Astute logs found inside the archive
+        :param output_format: 'text' or 'chrome'
+        :type output_format: str
+        :param top: number of the slowest tasks and the longest gaps
+        :type top: int
+        :return:
+        """
+        timeline = AstuteTimeline()
         for astute_log in self.astute_logs():
-            self.parse_log(astute_log, astute_logs)
-        astute_logs.output()
-        astute_logs.clear()
+            timeline.add_log(self.snapshot.extractfile(astute_log))
+        timeline.output(output_format, top)
 
     def parse_puppet_logs(self,
                           enable_sort=False,
                           show_evals=False,
-                          show_full=False):
+                          show_full=False,
+                          jobs=1):
         """
         Parse the Puppet logs found inside the archive
         :param enable_sort: enable sorting of logs by date
         :type enable_sort: bool
         :param show_evals: show evaltrace lines in the logs
         :type show_evals: bool
+        :param jobs: number of worker processes parsing the logs
+        :type jobs: int
         :return:
         """
         puppet_logs = PuppetLog()
         puppet_logs.show_evals = show_evals
         puppet_logs.enable_sort = enable_sort
         puppet_logs.show_full = show_full
+        if jobs > 1:
+            log_files = {}
+            try:
+                for puppet_log in self.puppet_logs():
+                    log_files[puppet_log.name] = self.extract_log(puppet_log)
+                streams = Jobs.parse_logs(puppet_logs, log_files, jobs)
+            finally:
+                for log_file in log_files.values():
+                    os.unlink(log_file)
+            if enable_sort:
+                records = puppet_logs.merge(streams)
+            else:
+                records = itertools.chain.from_iterable(streams)
+        elif enable_sort:
+            # k-way merge of the logs which are read at once
+            records = puppet_logs.merge([
+                self.spool_log(puppet_log, puppet_logs.copy(puppet_log.name))
+                for puppet_log in self.puppet_logs()])
+        else:
+            records = itertools.chain.from_iterable(
+                self.stream_log(puppet_log, puppet_logs.copy(puppet_log.name))
+                for puppet_log in self.puppet_logs())
+        puppet_logs.output(records)
+
+    def profile_puppet_logs(self, output_format='text', top=10):
+        """
+        Profile the resource evaluation in the Puppet logs
+        found inside the archive
+        :param output_format: 'text', 'json' or 'flamegraph'
+        :type output_format: str
+        :param top: number of the slowest resources and tasks
+        :type top: int
+        :return:
+        """
+        profile = PuppetProfile()
         for puppet_log in self.puppet_logs():
-            puppet_logs.log_name = puppet_log.name
-            self.parse_log(puppet_log, puppet_logs)
-        puppet_logs.output()
-        puppet_logs.clear()
+            profile.add_log(puppet_log.name,
+                            self.snapshot.extractfile(puppet_log))
+        profile.output(output_format, top)
 
 
 class FuelLogs(object):
@@ -801,8 +1712,22 @@ class FuelLogs(object):
         :param parser Parser object
         :type parser PuppetLog, AstuteLog
         """
-        content = log_file.read()
-        parser.parse(content)
+        parser.parse(log_file)
+
+    @staticmethod
+    def stream_log(log_path, parser):
+        """
+        Read the log file line by line and yield the records
+        found by the parser object
+        :param log_path Path to the log file
+        :type log_path str
+        :param parser Parser object
+        :type parser PuppetLog, AstuteLog
+        :return: iter
+        """
+        with open(log_path, 'rb') as log:
+            for record in parser.stream(log):
+                yield record
 
     def parse_astute_logs(self,
                           show_mcagent=False,
@@ -816,34 +1741,76 @@ class FuelLogs(object):
         astute_logs = AstuteLog()
         astute_logs.show_mcagent = show_mcagent
         astute_logs.show_full = show_full
+        astute_logs.output(itertools.chain.from_iterable(
+            self.stream_log(astute_log, astute_logs)
+            for astute_log in self.astute_logs()))
+
+    def astute_timeline(self, output_format='text', top=10):
+        """
+        Rebuild the deployment tasks timeline from
+        the Astute logs on the Fuel Master system
+        :param output_format: 'text' or 'chrome'
+        :type output_format: str
+        :param top: number of the slowest tasks and the longest gaps
+        :type top: int
+        :return:
+        """
+        timeline = AstuteTimeline()
         for astute_log in self.astute_logs():
-            with open(astute_log, 'r') as log:
-                self.parse_log(log, astute_logs)
-        astute_logs.output()
-        astute_logs.clear()
+            with open(astute_log, 'rb') as log:
+                timeline.add_log(log)
+        timeline.output(output_format, top)
 
     def parse_puppet_logs(self,
                           enable_sort=False,
                           show_evals=False,
-                          show_full=False):
+                          show_full=False,
+                          jobs=1):
         """
         Parse Puppet logs on the Fuel Master system
         :param enable_sort: sort log files by date
         :type enable_sort: bool
         :param show_evals: show evaltrace lines
         :type show_evals: bool
+        :param jobs: number of worker processes parsing the logs
+        :type jobs: int
         :return:
         """
         puppet_logs = PuppetLog()
         puppet_logs.show_evals = show_evals
         puppet_logs.enable_sort = enable_sort
         puppet_logs.show_full = show_full
+        if jobs > 1:
+            streams = Jobs.parse_logs(
+                puppet_logs,
+                {puppet_log: puppet_log
+                 for puppet_log in self.puppet_logs()},
+                jobs)
+        else:
+            streams = [self.stream_log(puppet_log,
+                                       puppet_logs.copy(puppet_log))
+                       for puppet_log in self.puppet_logs()]
+        if enable_sort:
+            records = puppet_logs.merge(streams)
+        else:
+            records = itertools.chain.from_iterable(streams)
+        puppet_logs.output(records)
+
+    def profile_puppet_logs(self, output_format='text', top=10):
+        """
+        Profile the resource evaluation in the Puppet logs
+        on the Fuel Master system
+        :param output_format: 'text', 'json' or 'flamegraph'
+        :type output_format: str
+        :param top: number of the slowest resources and tasks
+        :type top: int
+        :return:
+        """
+        profile = PuppetProfile()
         for puppet_log in self.puppet_logs():
-            with open(puppet_log, 'r') as log:
-                puppet_logs.log_name = puppet_log
-                self.parse_log(log, puppet_logs)
-        puppet_logs.output()
-        puppet_logs.clear()
+            with open(puppet_log, 'rb') as log:
+                profile.add_log(puppet_log, log)
+        profile.output(output_format, top)
 
     def clear_logs(self, iterator):
         """
@@ -868,6 +1835,327 @@ class FuelLogs(object):
         """
         self.clear_logs(self.puppet_logs())
 
+
+class LogIndex(object):
+    """
+    SQLite index of the records found in the Fuel log snapshots.
+    The snapshot is parsed once and the questions are answered
+    by the queries to the index. The members of the snapshot are
+    not parsed again unless their size or mtime are changed.
+    """
+
+    columns = ('time', 'node', 'source', 'type', 'task')
+
+    schema = """
+        CREATE TABLE IF NOT EXISTS members (
+            snapshot TEXT NOT NULL,
+            member TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            mtime INTEGER NOT NULL,
+            PRIMARY KEY (snapshot, member)
+        );
+        CREATE TABLE IF NOT EXISTS records (
+            snapshot TEXT NOT NULL,
+            member TEXT NOT NULL,
+            source TEXT NOT NULL,
+            time TEXT,
+            node TEXT,
+            type TEXT,
+            task TEXT,
+            line TEXT
+        );
+        CREATE INDEX IF NOT EXISTS records_member
+            ON records (snapshot, member);
+        CREATE INDEX IF NOT EXISTS records_time ON records (time);
+        CREATE INDEX IF NOT EXISTS records_node ON records (node, time);
+        CREATE INDEX IF NOT EXISTS records_type ON records (type, time);
+        CREATE INDEX IF NOT EXISTS records_task ON records (task, time);
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.db = None
+
+    def __enter__(self):
+        """
+        Enter the context manager
+        """
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        """
+        Exit the context manager
+        """
+        self.close()
+
+    def open(self):
+        """
+        Open the index database creating the tables if needed
+        :return:
+        """
+        self.db = sqlite3.connect(self.path)
+        self.db.executescript(self.schema)
+
+    def close(self):
+        """
+        Close the index database
+        :return:
+        """
+        if self.db:
+            self.db.close()
+            self.db = None
+
+    def is_actual(self, snapshot, member):
+        """
+        Check if the member of the snapshot is already indexed
+        and is not changed since then
+        :param snapshot: snapshot name
+        :type snapshot: str
+        :param member: log file inside the snapshot
+        :type member: TarInfo
+        :rtype: bool
+        """
+        row = self.db.execute(
+            'SELECT size, mtime FROM members '
+            'WHERE snapshot = ? AND member = ?',
+            (snapshot, member.name)).fetchone()
+        return row == (member.size, int(member.mtime))
+
+    def ingest_member(self, snapshot, member, source, records):
+        """
+        Replace the indexed records of the snapshot member
+        :param snapshot: snapshot name
+        :type snapshot: str
+        :param member: log file inside the snapshot
+        :type member: TarInfo
+        :param source: 'astute' or 'puppet'
+        :type source: str
+        :param records: iterator of the records from index_records()
+        :return: the number of the indexed records
+        :rtype: int
+        """
+        rows = [(snapshot, member.name, source, record['time'],
+                 record['node'], record['type'], record['task'],
+                 record['line'])
+                for record in records]
+        with self.db:
+            self.db.execute(
+                'DELETE FROM records WHERE snapshot = ? AND member = ?',
+                (snapshot, member.name))
+            self.db.executemany(
+                'INSERT INTO records (snapshot, member, source, time, node, '
+                'type, task, line) VALUES (?, ?, ?, ?, ?, ?, ?, ?)', rows)
+            self.db.execute(
+                'INSERT OR REPLACE INTO members (snapshot, member, size, '
+                'mtime) VALUES (?, ?, ?, ?)',
+                (snapshot, member.name, member.size, int(member.mtime)))
+        return len(rows)
+
+    def ingest(self, fuel_snapshot):
+        """
+        Parse the logs of the opened snapshot into the index
+        :param fuel_snapshot: opened snapshot
+        :type fuel_snapshot: FuelSnapshot
+        :return:
+        """
+        snapshot = os.path.basename(fuel_snapshot.snapshot.name)
+        logs = [
+            ('astute', AstuteLog, fuel_snapshot.astute_logs()),
+            ('puppet', PuppetLog, fuel_snapshot.puppet_logs()),
+        ]
+        for source, parser_class, members in logs:
+            for member in members:
+                if self.is_actual(snapshot, member):
+                    IO.output('Unchanged: %s' % member.name)
+                    continue
+                parser = parser_class()
+                parser.log_name = member.name
+                count = self.ingest_member(
+                    snapshot, member, source, parser.index_records(
+                        fuel_snapshot.snapshot.extractfile(member)))
+                IO.output('Indexed: %s %d records' % (member.name, count))
+
+    @classmethod
+    def conditions(cls, filters):
+        """
+        Make the WHERE clause from the filters
+        :param filters: dict of the column names and the values, the value
+                        can be a list of the allowed values. The 'grep' key
+                        filters the lines by a substring.
+        :type filters: dict
+        :return: the clause and its parameters
+        :rtype: tuple
+        """
+        clauses = []
+        params = []
+        for column, value in sorted(filters.items()):
+            if value is None:
+                continue
+            if column == 'grep':
+                clauses.append('line LIKE ?')
+                params.append('%' + value + '%')
+                continue
+            if column not in cls.columns:
+                raise ValueError('Unknown column: %s' % column)
+            if isinstance(value, (list, tuple)):
+                clauses.append('%s IN (%s)' % (
+                    column, ', '.join('?' * len(value))))
+                params.extend(value)
+            else:
+                clauses.append('%s = ?' % column)
+                params.append(value)
+        if not clauses:
+            return '', params
+        return ' WHERE ' + ' AND '.join(clauses), params
+
+    def query(self, filters, order='time', limit=None):
+        """
+        Find the indexed records
+        :param filters: see conditions()
+        :type filters: dict
+        :param order: column to sort the records by
+        :type order: str
+        :param limit: maximal number of the records
+        :type limit: int
+        :return: iterator of the rows with the columns and the line
+        """
+        if order not in self.columns:
+            raise ValueError('Unknown column: %s' % order)
+        where, params = self.conditions(filters)
+        sql = 'SELECT %s, line FROM records%s ORDER BY %s, rowid' % (
+            ', '.join(self.columns), where, order)
+        if limit:
+            sql += ' LIMIT %d' % limit
+        return self.db.execute(sql, params)
+
+    def aggregate(self, column, filters, limit=None):
+        """
+        Count the indexed records grouped by the column
+        :param column: column to group the records by
+        :type column: str
+        :param filters: see conditions()
+        :type filters: dict
+        :param limit: maximal number of the groups
+        :type limit: int
+        :return: iterator of the rows with the value, the record count,
+                 the first and the last record times
+        """
+        if column not in self.columns:
+            raise ValueError('Unknown column: %s' % column)
+        where, params = self.conditions(filters)
+        sql = ('SELECT %s, COUNT(*), MIN(time), MAX(time) FROM records%s '
+               'GROUP BY %s ORDER BY COUNT(*) DESC, %s' % (
+                   column, where, column, column))
+        if limit:
+            sql += ' LIMIT %d' % limit
+        return self.db.execute(sql, params)
+
+
+class Jobs(object):
+    """
+    Runs the parsing in the pool of worker processes.
+    Workers write their results to temporary files,
+    which are read back in the order of the jobs.
+    """
+
+    @staticmethod
+    def map(function, arguments, jobs):
+        """
+        Call the function with every argument tuple in the worker processes
+        :param function: module level function or static method
+        :param arguments: list of argument tuples
+        :type arguments: list
+        :param jobs: number of worker processes
+        :type jobs: int
+        :return: list of results in the order of the arguments
+        :rtype: list
+        """
+        if not arguments:
+            return []
+        pool = multiprocessing.Pool(min(jobs, len(arguments)))
+        try:
+            return pool.starmap(function, arguments)
+        finally:
+            pool.close()
+            pool.join()
+
+    @staticmethod
+    def process_snapshot(args, snapshot):
+        """
+        Process the snapshot in a worker process
+        :param args: parsed command line options
+        :param snapshot: path to the snapshot file
+        :type snapshot: str
+        :return: path to the temporary file with the output
+        :rtype: str
+        """
+        IO.args = args
+        IO.args.jobs = 1
+        with tempfile.NamedTemporaryFile('w', delete=False) as output:
+            IO.pipe = output
+            try:
+                IO.process_snapshot(snapshot)
+            finally:
+                IO.pipe = None
+        return output.name
+
+    @staticmethod
+    def spool_records(parser, log_path):
+        """
+        Parse the log file in a worker process and save
+        the found records to a temporary file
+        :param parser: parser object for this log file
+        :type parser: AbstractLog
+        :param log_path: path to the log file
+        :type log_path: str
+        :return: path to the temporary file with the records
+        :rtype: str
+        """
+        with open(log_path, 'rb') as log, \
+                tempfile.NamedTemporaryFile(delete=False) as spool:
+            for record in parser.stream(log):
+                pickle.dump(record, spool)
+        return spool.name
+
+    @staticmethod
+    def load_records(spool_path):
+        """
+        Read the records saved by a worker process
+        and remove the temporary file
+        :param spool_path: path to the temporary file with the records
+        :type spool_path: str
+        :return: iter
+        """
+        try:
+            with open(spool_path, 'rb') as spool:
+                while True:
+                    try:
+                        yield pickle.load(spool)
+                    except EOFError:
+                        break
+        finally:
+            os.unlink(spool_path)
+
+    @classmethod
+    def parse_logs(cls, parser, log_files, jobs):
+        """
+        Parse several log files in the worker processes
+        :param parser: parser object with the options to use
+        :type parser: PuppetLog
+        :param log_files: dict of the log names and the paths to the files
+        :type log_files: dict
+        :param jobs: number of worker processes
+        :type jobs: int
+        :return: list of record iterators in the order of the log names
+        :rtype: list
+        """
+        spools = cls.map(cls.spool_records,
+                         [(parser.copy(log_name), log_path)
+                          for log_name, log_path in log_files.items()],
+                         jobs)
+        return [cls.load_records(spool) for spool in spools]
+
 ##############################################################################
 
 if __name__ == '__main__':
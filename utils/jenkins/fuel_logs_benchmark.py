@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+
+# Copyright 2015 Mirantis, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+"""
+Compare the Astute log parsing throughput of the compiled marker table
+with the per-marker substring scans used by fuel_logs.py before.
+
+usage: fuel_logs_benchmark.py [-h] [--size MB] [--mcagent] [LOG]
+
+A synthetic Astute log of the given size (1 GB by default) is generated
+unless the path to the existing log is given.
+"""
+
+import argparse
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fuel_logs import AstuteLog  # noqa
+
+
+class LegacyAstuteLog(AstuteLog):
+    """
+    Astute log parser checking every rule with its own catch_record call
+    and joining multi line records by string concatenation
+    """
+
+    def process_record(self, record):
+        if self.show_mcagent:
+            markers = self.mcagent_markers
+        else:
+            markers = self.markers
+        for _, include, exclude in markers.rules:
+            self.catch_record(record, include, exclude)
+
+    def each_record(self):
+        record = ''
+        date_regexp = re.compile(r'^\d+-\d+-\S+\s')
+        for bline in self.content:
+            line = bline.decode()
+            if re.match(date_regexp, line):
+                yield record
+                record = line
+            else:
+                record += line
+        yield record
+
+
+# Records caught by the parser
+CAUGHT = [
+    "{date} DEBUG [1234] Processing RPC call 'deploy' for task {uid}",
+    "{date} INFO [1234] Casting message to Nailgun: {{'method': "
+    "'deploy_resp', 'args': {{'task_uuid': '{uid}', 'status': 'ready'}}}}",
+    "{date} DEBUG [1234] Task time summary: deploy_legacy with status "
+    "successful on node {node} took 00:03:12",
+    "{date} INFO [1234] {uid}: run task '{{\"type\": \"puppet\"}}' "
+    "on node {node}",
+    "{date} DEBUG [1234] Run hook ---\npriority: 100\ntype: upload_file\n"
+    "uids:\n- '{node}'\n",
+    "{date} DEBUG [1234] {uid}: cmd: puppet apply site.pp\n"
+    "stdout: Notice: Finished catalog run\nstderr: \n",
+    "{date} DEBUG [1234] {uid}: MC agent 'execute_shell_command', method "
+    "'execute', results: {{:sender=>\"{node}\", :statuscode=>0}}",
+    "{date} DEBUG [1234] {uid}: MC agent 'puppetd', method 'last_run_summary'"
+    ", results: {{:sender=>\"{node}\", :data=>{{:status=>\"running\"}}}}",
+]
+
+# Records skipped by the parser, most of the real log consists of them
+SKIPPED = [
+    "{date} DEBUG [1234] {uid}: Got progress for nodes: "
+    "[{{'uid': '{node}', 'progress': 42}}]",
+    "{date} DEBUG [1234] {uid}: Data received by DeploymentProxyReporter "
+    "to report it up: {{'nodes': [{{'uid': '{node}', "
+    "'status': 'deploying', 'progress': 42}}]}}",
+    "{date} DEBUG [1234] Nodes statuses: {{'succeed': [], 'error': [], "
+    "'running': ['{node}']}}",
+    "{date} DEBUG [1234] {uid}: Node {node} has status: running, "
+    "retries left: 120",
+]
+
+
+def generate_log(path, size, skipped=0.8):
+    """
+    Write the synthetic Astute log of the given size
+    :param path: path to the log file
+    :type path: str
+    :param size: size in bytes
+    :type size: int
+    :param skipped: share of the records not caught by the parser
+    :type skipped: float
+    :return:
+    """
+    written = 0
+    rand = random.Random(42)
+    with open(path, 'w') as log:
+        while written < size:
+            if rand.random() < skipped:
+                samples = SKIPPED
+            else:
+                samples = CAUGHT
+            record = rand.choice(samples).format(
+                date='2015-02-20T20:35:18',
+                uid='a7f3c8e2-6b41-4b0c-9f3e-1d2a5e6f7b8c',
+                node=rand.randint(1, 100),
+            ) + '\n'
+            log.write(record)
+            written += len(record)
+
+
+def measure(parser_class, path, show_mcagent):
+    """
+    Parse the log and measure the time spent
+    :param parser_class: Astute log parser class
+    :param path: path to the log file
+    :type path: str
+    :param show_mcagent: enable MCAgent rules
+    :type show_mcagent: bool
+    :return: the number of the found records and the spent time
+    :rtype: tuple
+    """
+    parser = parser_class()
+    parser.show_mcagent = show_mcagent
+    start = time.time()
+    with open(path, 'rb') as log:
+        records = sum(1 for _ in parser.stream(log))
+    return records, time.time() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size",
+                        metavar='MB',
+                        type=int,
+                        default=1024,
+                        help='Size of the synthetic log')
+    parser.add_argument("--mcagent", "-m",
+                        action="store_true",
+                        default=False,
+                        help='Enable Astute MCAgent rules')
+    parser.add_argument('log',
+                        metavar='LOG',
+                        nargs='?',
+                        help='Use this log instead of the synthetic one')
+    args = parser.parse_args()
+
+    path = args.log
+    if not path:
+        fd, path = tempfile.mkstemp(suffix='-astute.log')
+        os.close(fd)
+        print('Generating %d MB log: %s' % (args.size, path))
+        generate_log(path, args.size * 1024 * 1024)
+    size = os.path.getsize(path) / 1024.0 / 1024.0
+
+    try:
+        results = {}
+        for parser_class in (LegacyAstuteLog, AstuteLog):
+            records, spent = measure(parser_class, path, args.mcagent)
+            results[parser_class] = records
+            print('%-16s %10d records %8.2f sec %8.2f MB/s' % (
+                parser_class.__name__, records, spent, size / spent))
+        if results[LegacyAstuteLog] != results[AstuteLog]:
+            print('The parsers have found different records!')
+            return 1
+    finally:
+        if not args.log:
+            os.unlink(path)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())